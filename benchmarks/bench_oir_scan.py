@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""Benchmark the XML section scanner of ImageDataOIR against the old one.
+
+A synthetic OIR file of the requested size is generated, consisting of the
+OIR magic, random (i.e. "pixel") data and the two XML blocks required for
+parsing the dimensions. The XML blocks are placed at the very end of the
+file, so the whole file has to be scanned (worst case).
+
+Example
+-------
+$ python benchmarks/bench_oir_scan.py --size 2048 /tmp/synthetic.oir
+"""
+
+import argparse
+import os
+import string    # bug #2481 pylint: disable=deprecated-module
+import sys
+import time
+
+from micrometa.dataset import ImageDataOIR
+
+# the synthetic files are generated by the helpers of the test suite:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'tests'))
+
+from synthetic import (  # noqa: E402 pylint: disable=wrong-import-position
+    FRAME_PROPS, IMAGE_PROPS, NS_BASE, xml_block)
+
+
+def write_synthetic_oir(fname, size_mib, dims=(512, 512, 10, 12)):
+    """Write a synthetic OIR file of (roughly) the given size in MiB."""
+    values = {'ns': NS_BASE, 'x': dims[0], 'y': dims[1],
+              'z': dims[2], 'b': dims[3]}
+    chunk = os.urandom(1048576)
+    with open(fname, 'wb') as fout:
+        fout.write('OLYMPUSRAWFORMAT')
+        for _ in range(size_mib):
+            fout.write(chunk)
+        fout.write(xml_block(FRAME_PROPS % values))
+        fout.write(xml_block(IMAGE_PROPS % values))
+
+
+def legacy_get_xml_sections(fname, min_len=100):
+    """The char-by-char scanner used by ImageDataOIR before (for reference)."""
+    size = 1048576
+    collected = ''
+    found = dict()
+    search_tags = [
+        'lsmframe:frameProperties',
+        'lsmimage:imageProperties',
+    ]
+    with open(fname, 'rb') as fin:
+        while True:
+            chunk = fin.read(size)
+            if not chunk:
+                raise ValueError("Couldn't find all requested XML blocks!")
+            for char in chunk:
+                if char in string.printable:
+                    collected += char
+                    continue
+                if len(collected) < min_len or '<?xml' not in collected:
+                    collected = ''
+                    continue
+                for tag in search_tags:
+                    if '<' + tag in collected:
+                        xml_close = collected.rfind('>') + 1
+                        found[tag] = collected[:xml_close]
+                        if len(found) == len(search_tags):
+                            return found
+                collected = ''
+
+
+def timed(func, *args):
+    """Call a function and return its result and the wall time it took."""
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
+
+def main():
+    """Generate the synthetic file (if necessary) and run the benchmark."""
+    argp = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argp.add_argument('fname', help='the (synthetic) OIR file to use')
+    argp.add_argument('--size', type=int, default=2048,
+                      help='size of the synthetic file in MiB [2048]')
+    argp.add_argument('--skip-legacy', action='store_true',
+                      help="don't run the (slow) legacy scanner")
+    args = argp.parse_args()
+
+    if not os.path.exists(args.fname):
+        print('Writing synthetic OIR (%s MiB): %s' % (args.size, args.fname))
+        write_synthetic_oir(args.fname, args.size)
+    fsize = os.path.getsize(args.fname) / 1048576.0
+
+    # metadata is loaded lazily, so the scan is triggered by prefetch():
+    dset, t_new = timed(lambda fname: ImageDataOIR(fname).prefetch(),
+                        args.fname)
+    print('ImageDataOIR (scan + parse): %8.2fs (%.1f MiB/s)' %
+          (t_new, fsize / t_new))
+    print('Parsed dimensions: %s' % dset.get_dimensions())
+    if args.skip_legacy:
+        return
+
+    found, t_old = timed(legacy_get_xml_sections, args.fname)
+    print('Legacy scanner:              %8.2fs (%.1f MiB/s)' %
+          (t_old, fsize / t_old))
+    print('Speedup: %.1fx' % (t_old / t_new))
+    if found != dset._xml:  # pylint: disable=protected-access
+        raise ValueError('Legacy and current scanner results differ!')
+
+
+if __name__ == '__main__':
+    main()
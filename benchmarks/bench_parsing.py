@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+"""Measure how parsing and macro generation scale with the number of tiles.
+
+For each tile format (OIR, OIF, OIB) and each size of the sweep, a synthetic
+project is written (see tests/synthetic.py) and the following phases are
+measured:
+
+- parse: FluoView3kMosaic / FluoViewMosaic (reading all tile metadata)
+- tile_config: imagej.gen_tile_config for all mosaics
+- macro: imagej.gen_stitching_macro_code
+
+Every size is measured in a separate (forked) process, reporting per phase
+the wall time, the bytes read through read() calls (from /proc/self/io, zero
+if unavailable) and the peak memory allocated (tracemalloc, if available). In
+addition the peak RSS of the whole process is reported (the interpreter and
+the modules make up a constant part of it).
+
+The scaling of each phase is estimated from consecutive sizes of the sweep as
+the exponent k of time ~ tiles^k, phases exceeding --max-exponent are flagged
+as SUPER-LINEAR. Very short phases (below --min-time) are not judged, as
+their timings are dominated by noise.
+
+Example
+-------
+$ python benchmarks/bench_parsing.py --tiles 16 64 256 --size 256 2>/dev/null
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2 without the pytracemalloc backport
+    tracemalloc = None
+
+from micrometa import fluoview, imagej
+
+# the synthetic projects are generated by the helpers of the test suite:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'tests'))
+
+from synthetic import (  # noqa: E402 pylint: disable=wrong-import-position
+    write_fv1000_project, write_fv3k_project)
+
+
+PHASES = ('parse', 'tile_config', 'macro')
+
+
+def read_chars():
+    """The number of bytes read by the process so far (0 if unknown)."""
+    try:
+        with open('/proc/self/io') as fin:
+            for line in fin:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return 0
+
+
+def measure(func, *args):
+    """Call func(*args), returns its result and a dict of measurements."""
+    if tracemalloc is not None:
+        tracemalloc.start()
+    rchar = read_chars()
+    start = time.time()
+    result = func(*args)
+    stats = {
+        'time': time.time() - start,
+        'bytes': read_chars() - rchar,
+        'peak': None,
+    }
+    if tracemalloc is not None:
+        stats['peak'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, stats
+
+
+def run_phases(fmt, project, workers):
+    """Run (and measure) all phases on a project, in the current process."""
+    results = dict()
+    if fmt == 'oir':
+        experiment_class = fluoview.FluoView3kMosaic
+    else:
+        experiment_class = fluoview.FluoViewMosaic
+    experiment, results['parse'] = measure(
+        lambda: experiment_class(project, prefetch=True,
+                                 max_workers=workers))
+    _, results['tile_config'] = measure(
+        lambda: [imagej.gen_tile_config(mosaic) for mosaic in experiment])
+    _, results['macro'] = measure(
+        imagej.gen_stitching_macro_code, experiment, 'stitching')
+    return results
+
+
+def run_forked(fmt, project, workers):
+    """Run the phases in a child process to isolate its (peak) memory."""
+    if not hasattr(os, 'fork'):
+        results = run_phases(fmt, project, workers)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return results, rss
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # the child
+        os.close(rfd)
+        status = 0
+        try:
+            data = json.dumps(run_phases(fmt, project, workers))
+            os.write(wfd, data.encode('ascii'))
+        except Exception:  # pylint: disable=broad-except
+            import traceback
+            traceback.print_exc()
+            status = 1
+        os.close(wfd)
+        os._exit(status)  # pylint: disable=protected-access
+    os.close(wfd)
+    chunks = list()
+    while True:
+        chunk = os.read(rfd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(rfd)
+    _, status, usage = os.wait4(pid, 0)
+    if status != 0:
+        raise RuntimeError('Benchmark of %s failed (see above).' % project)
+    return json.loads(b''.join(chunks).decode('ascii')), usage.ru_maxrss
+
+
+def write_project(fmt, dname, tiles, args):
+    """Write a synthetic project with (about) 'tiles' tiles per mosaic."""
+    tiles_x = int(math.ceil(math.sqrt(tiles)))
+    tiles_y = int(math.ceil(float(tiles) / tiles_x))
+    if fmt == 'oir':
+        project = write_fv3k_project(dname, args.mosaics, tiles_x, tiles_y,
+                                     args.size, args.slices)
+    else:
+        project = write_fv1000_project(dname, args.mosaics, tiles_x, tiles_y,
+                                       args.size, args.slices, fmt=fmt)
+    return project, tiles_x * tiles_y * args.mosaics
+
+
+def scaling(sweep, phase, min_time):
+    """The exponents k of time ~ tiles^k between consecutive sizes."""
+    exponents = list()
+    for (tiles_a, res_a), (tiles_b, res_b) in zip(sweep, sweep[1:]):
+        time_a, time_b = res_a[phase]['time'], res_b[phase]['time']
+        if min(time_a, time_b) < min_time or tiles_a == tiles_b:
+            exponents.append(None)
+            continue
+        exponents.append(math.log(time_b / time_a) /
+                         math.log(float(tiles_b) / tiles_a))
+    return exponents
+
+
+def report(fmt, sweep, args):
+    """Print the measurements of a format, returns the flagged phases."""
+    print('\n=== %s (%s x %s px, %s slices) ===' %
+          (fmt.upper(), args.size, args.size, args.slices))
+    print('%7s  %-12s %10s %12s %12s %10s' %
+          ('tiles', 'phase', 'time [s]', 'read [KiB]', 'peak [KiB]',
+           'RSS [MiB]'))
+    for tiles, results in sweep:
+        for phase in PHASES:
+            stats = results[phase]
+            peak = '-' if stats['peak'] is None else \
+                '%.0f' % (stats['peak'] / 1024.0)
+            print('%7s  %-12s %10.4f %12.0f %12s %10.1f' %
+                  (tiles, phase, stats['time'], stats['bytes'] / 1024.0, peak,
+                   results['rss'] / 1024.0))
+    flagged = list()
+    for phase in PHASES:
+        exponents = scaling(sweep, phase, args.min_time)
+        text = ', '.join('-' if exp is None else '%.2f' % exp
+                         for exp in exponents)
+        worst = max([exp for exp in exponents if exp is not None] or [0])
+        flag = ''
+        if worst > args.max_exponent:
+            flag = '  <-- SUPER-LINEAR'
+            flagged.append('%s/%s' % (fmt, phase))
+        print('  scaling exponent %-12s %s%s' % (phase, text, flag))
+    return flagged
+
+
+def main():
+    """Run the sweep and report the results."""
+    argp = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argp.add_argument('--tiles', type=int, nargs='+', default=[16, 64, 256],
+                      help='the tiles per mosaic to sweep [16 64 256]')
+    argp.add_argument('--mosaics', type=int, default=2,
+                      help='the number of mosaics per project [2]')
+    argp.add_argument('--size', type=int, default=256,
+                      help='the tile size (width and height) in pixels [256]')
+    argp.add_argument('--slices', type=int, default=1,
+                      help='the number of z-slices per tile [1]')
+    argp.add_argument('--formats', nargs='+', default=['oir', 'oif', 'oib'],
+                      choices=('oir', 'oif', 'oib'),
+                      help='the tile formats to benchmark [oir oif oib]')
+    argp.add_argument('--workers', type=int, default=None,
+                      help='the number of workers for parsing the tiles')
+    argp.add_argument('--max-exponent', type=float, default=1.2,
+                      help='flag phases scaling worse than this [1.2]')
+    argp.add_argument('--min-time', type=float, default=0.01,
+                      help='ignore phases shorter than this for scaling '
+                      '[0.01 s]')
+    argp.add_argument('--keep', action='store_true',
+                      help='keep the synthetic projects')
+    args = argp.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='micrometa-bench-')
+    flagged = list()
+    try:
+        for fmt in args.formats:
+            sweep = list()
+            for tiles in sorted(args.tiles):
+                dname = os.path.join(tmpdir, '%s_%05i' % (fmt, tiles))
+                project, total = write_project(fmt, dname, tiles, args)
+                results, rss = run_forked(fmt, project, args.workers)
+                results['rss'] = rss
+                sweep.append((total, results))
+            flagged += report(fmt, sweep, args)
+    finally:
+        if args.keep:
+            print('\nSynthetic projects kept in: %s' % tmpdir)
+        else:
+            shutil.rmtree(tmpdir)
+
+    if flagged:
+        print('\nSuper-linear scaling: %s' % ', '.join(flagged))
+        sys.exit(1)
+    print('\nAll phases scale (at most) linearly.')
+
+
+if __name__ == '__main__':
+    main()
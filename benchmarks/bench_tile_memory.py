@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+"""Measure the memory required per tile (ImageData object) of a mosaic.
+
+A number of (empty) OIF tiles is created in a temporary directory and set up
+as placeholders the way FluoViewMosaic does it with prefetch=False, i.e. the
+measurement covers the dataset objects with their positions and parsed paths
+but not the metadata read from the files.
+
+As a baseline, the same tiles are converted to objects keeping all their
+attributes in a __dict__, with plain dicts for the parsed paths and the
+positions, i.e. the layout of the dataset objects before they used __slots__.
+
+The memory is measured in two ways:
+
+- tracemalloc (Python 3.4+ or the pytracemalloc backport, if available): the
+  memory allocated while creating the objects, including allocator overhead
+- deep size: sys.getsizeof() of the objects and everything they refer to
+  (attributes in __slots__ and __dict__, dict and sequence items), counting
+  objects shared by several tiles (e.g. dict keys) only once
+
+Example
+-------
+$ python benchmarks/bench_tile_memory.py --tiles 100000
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2 without the pytracemalloc backport
+    tracemalloc = None
+
+from micrometa.dataset import ImageDataOIF, Position
+from micrometa.pathtools import ParsedPath, parse_path
+
+
+def deep_sizeof(obj, seen=None):
+    """Sum up sys.getsizeof() of an object and all objects it refers to."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(obj.__dict__, seen)
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(obj, name):
+                size += deep_sizeof(getattr(obj, name), seen)
+    return size
+
+
+def make_tile(fname, index, grid_x, grid_y):
+    """Set up a tile like FluoViewMosaic does with prefetch=False."""
+    tile = ImageDataOIF(fname)
+    tile.set_stagecoords((grid_x * 512.0, grid_y * 512.0))
+    tile.set_tilenumbers(grid_x, grid_y)
+    tile.set_relpos(10.0)
+    tile.supplement['index'] = index
+    return tile
+
+
+class DictTile(object):  # pylint: disable=too-few-public-methods
+
+    """A tile keeping its attributes in a __dict__ (the baseline layout)."""
+
+
+def as_dict(value):
+    """Convert a ParsedPath or a Position to a plain dict."""
+    if isinstance(value, ParsedPath):
+        return dict(value.items())
+    if isinstance(value, Position):
+        return dict(value)  # the values, without computing deferred ones
+    return value
+
+
+def make_dict_tile(fname, index, grid_x, grid_y):
+    """Set up a tile and convert it to the dict-based layout.
+
+    The deferred values of the positions are kept in an extra attribute, so
+    the baseline holds the same data as the slotted tile.
+    """
+    tile = make_tile(fname, index, grid_x, grid_y)
+    baseline = DictTile()
+    for cls in type(tile).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(tile, name):
+                setattr(baseline, name, as_dict(getattr(tile, name)))
+    baseline.deferred = dict(tile.position.deferred)
+    return baseline
+
+
+def measure(func, count):
+    """Call func(i) for i in range(count) and measure the memory per call.
+
+    Returns
+    -------
+    traced : float or None
+        The bytes per call allocated according to tracemalloc, None if it is
+        not available.
+    deep : float
+        The deep size per call in bytes, see deep_sizeof().
+    """
+    gc.collect()
+    traced = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+    items = [func(i) for i in range(count)]
+    if tracemalloc is not None:
+        traced = float(tracemalloc.get_traced_memory()[0] - before) / count
+        tracemalloc.stop()
+    seen = set([id(items)])
+    deep = float(sum(deep_sizeof(item, seen) for item in items)) / count
+    return traced, deep
+
+
+def main():
+    """Create the tiles and report their memory footprint."""
+    argp = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argp.add_argument('--tiles', type=int, default=10000,
+                      help='the number of tiles to create [10000]')
+    args = argp.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='micrometa-bench-')
+    try:
+        side = int(args.tiles ** 0.5) + 1
+        fnames = list()
+        for i in range(args.tiles):
+            fname = os.path.join(tmpdir, 'Tile%06i_01.oif' % i)
+            open(fname, 'w').close()
+            fnames.append(fname)
+
+        results = [
+            ('parse_path() (dict)',
+             measure(lambda i: dict(parse_path(fnames[i]).items()),
+                     args.tiles)),
+            ('parse_path()',
+             measure(lambda i: parse_path(fnames[i]), args.tiles)),
+            ('ImageDataOIF (dicts)',
+             measure(lambda i: make_dict_tile(fnames[i], i, i % side,
+                                              i // side), args.tiles)),
+            ('ImageDataOIF',
+             measure(lambda i: make_tile(fnames[i], i, i % side, i // side),
+                     args.tiles)),
+        ]
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print('Memory per object in bytes, %s tiles:' % args.tiles)
+    print('  %-22s %12s %12s' % ('', 'tracemalloc', 'deep size'))
+    for name, (traced, deep) in results:
+        traced = '-' if traced is None else '%.0f' % traced
+        print('  %-22s %12s %12.0f' % (name, traced, deep))
+    (_, (traced_base, deep_base)), (_, (traced, deep)) = results[2:]
+    print('Tiles (slotted vs. dicts): %.1f vs. %.1f MiB (deep size), '
+          'saving %.0f%%' % (deep * args.tiles / 1048576.0,
+                             deep_base * args.tiles / 1048576.0,
+                             100.0 * (1 - deep / deep_base)))
+    if traced is not None:
+        print('Tiles (slotted vs. dicts): %.1f vs. %.1f MiB (tracemalloc), '
+              'saving %.0f%%' % (traced * args.tiles / 1048576.0,
+                                 traced_base * args.tiles / 1048576.0,
+                                 100.0 * (1 - traced / traced_base)))
+
+
+if __name__ == '__main__':
+    main()
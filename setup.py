@@ -73,5 +73,9 @@ setup(
         # eg:
         #   'rst': ['docutils>=0.11'],
         #   ':python_version=="2.6"': ['argparse'],
+        # reading pixel data (ImageData.read) and the tile table:
+        'pixels': ['numpy'],
+        # the OIB index relies on the sector tables of olefile (see oib.py):
+        'oib': ['olefile>=0.44,<0.48'],
     },
 )
@@ -0,0 +1,269 @@
+#!/usr/bin/python
+
+"""Persistent cache for metadata parsed from image files.
+
+Parsing the metadata of a large number of tiles (e.g. OIR files that have to
+be scanned for their XML blocks) is expensive, although the files themselves
+usually don't change between runs. The cache stores the parsed metadata in a
+SQLite database, keyed by the absolute path of a file together with its size
+and modification time. Entries of files that have changed since are considered
+stale and dropped, the number of entries is bounded by evicting the least
+recently used ones.
+
+Example
+-------
+>>> from micrometa.cache import MetadataCache
+>>> cache = MetadataCache('/tmp/metadata.sqlite')
+>>> mosaic = fv.FluoView3kMosaic('matl.omp2info', cache=cache)
+"""
+
+import ConfigParser
+import json
+import os
+import threading
+import time
+
+from log import log
+
+
+# the cache objects of this process for unpickled caches, by (pid, file):
+_SHARED = dict()
+_SHARED_LOCK = threading.Lock()
+
+
+def default_cache_file():
+    """Location of the cache file in the user's cache directory."""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME',
+                              os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'micrometa', 'metadata.sqlite')
+
+
+def import_sqlite3():
+    """Import 'sqlite3' on first use (only if caching), None if unavailable."""
+    try:
+        import sqlite3
+    except ImportError:  # e.g. in Jython (Fiji)
+        sqlite3 = None
+    return sqlite3
+
+
+def get_cache(cache):
+    """Set up a metadata cache from the various accepted specifications.
+
+    Parameters
+    ----------
+    cache : MetadataCache, str, bool or None
+        An existing cache object (returned unchanged), the path to a cache
+        file, True for using the default cache file (see default_cache_file)
+        or None / False to disable caching.
+
+    Returns
+    -------
+    cache : MetadataCache or None
+        None if caching is disabled or not available on this platform.
+    """
+    if cache is None or cache is False or isinstance(cache, MetadataCache):
+        return cache or None
+    if import_sqlite3() is None:
+        log.warn('WARNING: sqlite3 is unavailable, metadata cache disabled!')
+        return None
+    if cache is True:
+        return MetadataCache()
+    return MetadataCache(cache)
+
+
+def shared_cache(fname, max_entries=100000, commit_every=200):
+    """Get the cache object of the current process for a cache file.
+
+    A pickled MetadataCache (e.g. passed to the workers of a process pool with
+    every task) is unpickled by this, so each process opens only a single
+    connection per cache file instead of one per task. The connection is
+    closed (committing pending changes) when the process exits.
+
+    Parameters
+    ----------
+    fname, max_entries, commit_every : see MetadataCache
+
+    Returns
+    -------
+    cache : MetadataCache
+    """
+    key = (os.getpid(), fname)
+    with _SHARED_LOCK:
+        cache = _SHARED.get(key)
+        if cache is None:
+            cache = MetadataCache(fname, max_entries, commit_every)
+            _SHARED[key] = cache
+            # unlike atexit, this is run by the workers of a pool, too:
+            from multiprocessing.util import Finalize
+            Finalize(cache, cache.close, exitpriority=10)
+    return cache
+
+
+def ini_to_dict(parser):
+    """Convert the sections of a ConfigParser object into a (nested) dict."""
+    return dict((sec, dict(parser.items(sec))) for sec in parser.sections())
+
+
+def dict_to_ini(sections):
+    """Set up a ConfigParser object from a dict created by ini_to_dict()."""
+    parser = ConfigParser.RawConfigParser()
+    for sec, items in sections.items():
+        parser.add_section(sec)
+        for option, value in items.items():
+            parser.set(sec, option, value)
+    return parser
+
+
+class MetadataCache(object):
+
+    """A persistent, size-bounded cache for metadata of image files."""
+
+    def __init__(self, fname=None, max_entries=100000, commit_every=200):
+        """Open (or create) the cache database.
+
+        Parameters
+        ----------
+        fname : str, optional
+            The cache file, by default it is placed in the user's cache
+            directory (see default_cache_file).
+        max_entries : int
+            The maximum number of entries, least recently used ones are
+            evicted once this is exceeded.
+        commit_every : int
+            Number of modifications after which changes are written to disk.
+            Modifications are queued in memory until then and written in a
+            single transaction, so the database is only locked briefly (which
+            matters if several processes use it). Remaining ones are written
+            by flush() / close().
+
+        Instance Variables
+        ------------------
+        hits, misses : int
+            Counters for the lookups done through this object.
+        """
+        if fname is None:
+            fname = default_cache_file()
+        dname = os.path.dirname(fname)
+        if dname and not os.path.isdir(dname):
+            os.makedirs(dname)
+        log.info('Using metadata cache: %s', fname)
+        self.fname = fname
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self._connect()
+
+    def __reduce__(self):
+        """Pickle the settings only (e.g. for running in a process pool).
+
+        The unpickled object is the one shared by all unpickled caches of the
+        same file in a process, see shared_cache().
+        """
+        return (shared_cache,
+                (self.fname, self.max_entries, self.commit_every))
+
+    def _connect(self):
+        """Connect to the database and set up the table (if necessary)."""
+        # the queued modifications as (sql, parameters), and the records
+        # among them by path (with their size and mtime):
+        self._queue = list()
+        self._queued = dict()
+        self._lock = threading.Lock()
+        sqlite3 = import_sqlite3()
+        # be patient with locks, multiple processes might use the cache file:
+        self._db = sqlite3.connect(self.fname, timeout=60,
+                                   check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS metadata ('
+            ' path TEXT PRIMARY KEY,'
+            ' size INTEGER,'
+            ' mtime REAL,'
+            ' atime REAL,'
+            ' record TEXT)')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS metadata_atime ON metadata (atime)')
+        self._db.commit()
+
+    @staticmethod
+    def _key(path):
+        """Assemble the (absolute path, size, mtime) key for a file."""
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+    def _modify(self, sql, params):
+        """Queue a modification, write them if enough have accumulated."""
+        self._queue.append((sql, params))
+        if len(self._queue) >= self.commit_every:
+            self._write()
+
+    def _write(self):
+        """Write the queued modifications in a single transaction."""
+        if not self._queue:
+            return
+        for sql, params in self._queue:
+            self._db.execute(sql, params)
+        self._db.execute(
+            'DELETE FROM metadata WHERE path IN (SELECT path FROM metadata'
+            ' ORDER BY atime DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        self._db.commit()
+        self._queue = list()
+        self._queued = dict()
+
+    def get(self, path):
+        """Look up the cached metadata record of a file.
+
+        Returns
+        -------
+        record : dict or None
+            None if the file is not cached or the entry is stale.
+        """
+        path, size, mtime = self._key(path)
+        with self._lock:
+            row = self._queued.get(path)
+            if row is None:
+                row = self._db.execute(
+                    'SELECT size, mtime, record FROM metadata WHERE path = ?',
+                    (path,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[0] != size or row[1] != mtime:
+                log.debug('Dropping stale cache entry for %s', path)
+                self._queued.pop(path, None)
+                self._modify('DELETE FROM metadata WHERE path = ?', (path,))
+                self.misses += 1
+                return None
+            self._modify('UPDATE metadata SET atime = ? WHERE path = ?',
+                         (time.time(), path))
+            self.hits += 1
+        log.debug('Using cached metadata for %s', path)
+        return json.loads(row[2])
+
+    def put(self, path, record):
+        """Store the metadata record (a JSON-serializable dict) of a file."""
+        path, size, mtime = self._key(path)
+        record = json.dumps(record)
+        with self._lock:
+            self._queued[path] = (size, mtime, record)
+            self._modify(
+                'INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?)',
+                (path, size, mtime, time.time(), record))
+
+    def flush(self):
+        """Write all queued changes to disk."""
+        with self._lock:
+            self._write()
+        log.info('Metadata cache: %s hits, %s misses.', self.hits, self.misses)
+
+    def close(self):
+        """Write queued changes and close the database."""
+        if self._db is None:
+            return
+        self.flush()
+        self._db.close()
+        self._db = None
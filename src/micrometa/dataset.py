@@ -2,21 +2,165 @@
 
 """Classes to handle various types of datasets."""
 
-import codecs
-import string    # bug #2481 pylint: disable=deprecated-module
 import ConfigParser
+import os
+import re
 import xml.etree.ElementTree as etree
-from io import StringIO
-
-import olefile
+from itertools import product
 
 from log import log
+from . import metrics
+from .cache import ini_to_dict, dict_to_ini
+from .ini import read_ini_sections
+from .mapfile import HANDLES
+from .oir import OIRContainer, OIRBlock
 from .pathtools import parse_path, exists
 
 
+# the TIFF planes of OIF / OIB datasets, e.g. 's_C001Z005T002.tif':
+PLANE_NAME = re.compile(r's_(?:C(\d+))?(?:Z(\d+))?(?:T(\d+))?\.tif$', re.I)
+
+
+class Position(dict):
+
+    """A dict for spatial information with deferred computation of values.
+
+    Values can be registered to be computed by a function on first access
+    (see defer()), which allows for postponing expensive operations like
+    reading the image dimensions from disk until they are actually required.
+
+    Coordinates can also be bound to a row of an array (see bind()), e.g. the
+    'relative' column of a mosaic's tile table. The array is then the only
+    copy of the value, reading and setting the key goes through to it.
+    """
+
+    __slots__ = ('deferred', 'bound')
+
+    def __init__(self, *args, **kwargs):
+        super(Position, self).__init__(*args, **kwargs)
+        self.deferred = {}
+        self.bound = {}
+
+    def __getitem__(self, key):
+        if key in self.deferred:
+            func, args = self.deferred.pop(key)
+            self[key] = func(*args)
+        if key in self.bound:
+            column, idx = self.bound[key]
+            values = column[idx].tolist()
+            # unknown (NaN) trailing coordinates, e.g. z of 2D positions:
+            while values and values[-1] != values[-1]:
+                values.pop()
+            return tuple(values) or None
+        return super(Position, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        # a value set explicitly replaces a deferred one:
+        self.deferred.pop(key, None)
+        if key in self.bound:
+            column, idx = self.bound[key]
+            values = () if value is None else tuple(value)
+            column[idx] = values + (float('nan'),) * (column.shape[1] -
+                                                      len(values))
+            return
+        super(Position, self).__setitem__(key, value)
+
+    def __contains__(self, key):
+        return key in self.bound or super(Position, self).__contains__(key)
+
+    def __reduce__(self):
+        # bound methods can't be pickled, store them as (object, name):
+        deferred = dict((key, (func.__self__, func.__name__, args))
+                        for key, (func, args) in self.deferred.items())
+        # bound values are pickled as plain ones:
+        values = dict(self)
+        for key in self.bound:
+            values[key] = self[key]
+        return (Position, (values,), deferred)
+
+    def __setstate__(self, deferred):
+        self.deferred = dict((key, (getattr(obj, name), args))
+                             for key, (obj, name, args) in deferred.items())
+
+    def get(self, key, default=None):
+        """Like dict.get(), computing deferred values if required."""
+        if key in self:
+            return self[key]
+        return default
+
+    def defer(self, key, func, *args):
+        """Register 'key' to be set to 'func(*args)' on first access.
+
+        Parameters
+        ----------
+        key : str
+        func : instancemethod
+            A bound method (required for pickling), e.g. ds.calc_relpos.
+        args : list
+            The arguments passed to 'func'.
+
+        A bound value is computed right away instead, as the array it is bound
+        to holds the values themselves.
+        """
+        if key in self.bound:
+            self[key] = func(*args)
+            return
+        self.deferred[key] = (func, args)
+
+    def resolve(self):
+        """Compute all deferred values."""
+        for key in list(self.deferred):
+            self[key]  # pylint: disable=pointless-statement
+
+    def bind(self, key, column, idx):
+        """Keep the value of 'key' in row 'idx' of a (2D) array from now on.
+
+        The current value is dropped, the row is expected to hold it already
+        (or a value replacing it). Unknown coordinates are stored as NaN.
+
+        Parameters
+        ----------
+        key : str
+        column : np.ndarray (N, M)
+            E.g. the 'relative' column of a tile table (see TileTable.rows).
+        idx : int
+            The row of the array holding the value.
+        """
+        self.deferred.pop(key, None)
+        dict.pop(self, key, None)
+        self.bound[key] = (column, idx)
+
+    def unbind(self):
+        """Copy the bound values back into the dict, see bind()."""
+        for key in list(self.bound):
+            value = self[key]
+            del self.bound[key]
+            self[key] = value
+
+
 class DataSet(object):  # pylint: disable=too-few-public-methods
 
-    """The most generic dataset object, to be subclassed and specialized."""
+    """The most generic dataset object, to be subclassed and specialized.
+
+    The dataset classes use __slots__ instead of a per-instance __dict__ to
+    keep the memory footprint of large numbers of tiles small, i.e. every
+    instance variable has to be listed in the __slots__ of its class.
+    """
+
+    __slots__ = ('ds_type', 'storage', 'supplement')
+
+    def __getstate__(self):
+        # slotted objects without a __dict__ need this for (any) pickling:
+        state = dict()
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
 
     def __init__(self, ds_type, st_type, st_path):
         """Prepare the dataset object.
@@ -38,7 +182,7 @@ class DataSet(object):  # pylint: disable=too-few-public-methods
         Instance Variables
         ------------------
         ds_type : str
-        storage : pathtools.parse_path
+        storage : pathtools.ParsedPath
         """
         log.debug("Creating a 'Dataset' object.")
         ds_type_allowed = ('mosaic', 'stack', 'single')
@@ -48,8 +192,7 @@ class DataSet(object):  # pylint: disable=too-few-public-methods
         if not st_type in st_type_allowed:
             raise TypeError("Illegal storage type: %s." % st_type)
         self.ds_type = ds_type
-        self.storage = parse_path(st_path)
-        self.storage['type'] = st_type
+        self.storage = parse_path(st_path, st_type)
         if st_type == 'single' and self.storage['fname'] == '':
             raise TypeError("File name missing for storage type 'single'.")
         self.supplement = {}
@@ -59,6 +202,8 @@ class ImageData(DataSet):
 
     """Specific DataSet class for images, 2D to 5D."""
 
+    __slots__ = ('_dim', 'position')
+
     def __init__(self, ds_type, st_type, st_path):
         """Set up the image dataset object.
 
@@ -84,7 +229,7 @@ class ImageData(DataSet):
             'Y': int,
             'Z': int
         }
-        position : dict
+        position : Position
             Spatial information for multi-image datasets:
             {
                 'stage' : (float, float),    # raw stage coords
@@ -103,10 +248,10 @@ class ImageData(DataSet):
             'Y': 0,
             'Z': 0
         }
-        self.position = {      # spatial information for multi-image datasets
+        self.position = Position({  # spatial info for multi-image datasets
             'stage': None,    # raw stage coordinates
             'relative': None  # relative coordinates in pixel values (float)
-        }
+        })
 
     def set_stagecoords(self, coords):
         """Set the stageinfo coordinates for this object."""
@@ -127,29 +272,71 @@ class ImageData(DataSet):
         """Lazy parsing of the image dimensions."""
         raise NotImplementedError('get_dimensions() not implemented!')
 
+    def get_pixelsize(self):
+        """Lazy parsing of the pixel size (x, y) in micrometers."""
+        raise NotImplementedError('get_pixelsize() not implemented!')
+
+    def read(self, z=None, c=None, t=None):
+        """Read the pixel data into a numpy array."""
+        raise NotImplementedError('read() not implemented!')
+
+    def read_region(self, x0, x1, y0, y1, z=None, c=None, t=None):
+        """Read a rectangular region of the pixel data into a numpy array."""
+        raise NotImplementedError('read_region() not implemented!')
+
+    def prefetch(self):
+        """Eagerly load all lazily parsed information of this dataset."""
+        self.get_dimensions()
+        self.position.resolve()
+        return self
+
+    materialize = prefetch
+
 
 class ImageDataOlympus(ImageData):
 
     """Meta DataSet class for images in one of the Olympus file formats."""
 
-    def __init__(self, st_path):
+    __slots__ = ('parser', '_planes', 'cache')
+
+    # the INI sections required by parse_dimensions():
+    ini_sections = (
+        u'Reference Image Parameter',
+        u'Axis 2 Parameters Common',
+        u'Axis 3 Parameters Common',
+        u'Axis 4 Parameters Common',
+    )
+
+    def __init__(self, st_path, cache=None, resolver=None):
         """Set up the image dataset object.
 
         Parameters
         ----------
         st_path : str
             The full path to the dataset file.
+        cache : cache.MetadataCache, optional
+            A persistent cache to fetch / store the parsed metadata.
+        resolver : pathtools.PathResolver, optional
+            The resolver used for locating the file (see validate_filepath).
 
         Instance Variables
         ------------------
+        cache : cache.MetadataCache or None
         For inherited variables, see ImageData.
+
+        Note that the metadata is not read from the file until it is required
+        (e.g. by calling get_dimensions() or accessing position['relative']),
+        use prefetch() (or its alias materialize()) to load it eagerly.
         """
         super(ImageDataOlympus, self).__init__('stack', 'tree', st_path)
-        self.storage = self.validate_filepath()
+        self.storage = self.validate_filepath(resolver)
         self.parser = None  # needs to be done in the subclass
         self._dim = None  # override _dim to mark it as not yet known
+        self._planes = None
+        self.cache = cache
 
-    def validate_filepath(self):
+    @metrics.timed('dataset.resolve_path')
+    def validate_filepath(self, resolver=None):
         """Fix the broken filenames in FluoView experiment files.
 
         The FluoView software usually stores corrupted filenames in its
@@ -165,18 +352,44 @@ class ImageDataOlympus(ImageData):
         actually existing and trying the default suffix if not. Raises an
         IOError exception if no corresponding file can be found.
 
+        Parameters
+        ----------
+        resolver : pathtools.PathResolver, optional
+            If given, the file is looked up in its (cached) directory listing
+            instead of checking each of the file names on disk.
+
         Returns
         -------
-        storage : pathtools.parse_path
+        storage : pathtools.ParsedPath
+        """
+        check = exists if resolver is None else resolver.exists
+        return self.locate_file(self.storage, check)
+
+    @staticmethod
+    def locate_file(fpath, check=exists):
+        """Locate the file of a path from a FluoView experiment file.
+
+        Parameters
+        ----------
+        fpath : pathtools.ParsedPath
+            The path as given in the experiment file.
+        check : function, optional
+            The function checking if a path exists, e.g. PathResolver.exists.
+
+        Returns
+        -------
+        fpath : pathtools.ParsedPath
+            The path of the existing file, see validate_filepath for details.
         """
-        fpath = self.storage
         ext = fpath['ext']
         log.debug("Validating file path: %s", fpath)
-        if not exists(fpath['full']):
-            fpath = parse_path(fpath['orig'].replace(ext, '_01' + ext))
+        if not check(fpath['full']):
+            fpath = parse_path(fpath['orig'].replace(ext, '_01' + ext),
+                               fpath['type'])
             log.debug("Trying next path: %s", fpath['full'])
-        if not exists(fpath['full']):
-            raise IOError("Can't find file: %s" % fpath)
+            metrics.count('dataset.path_fallbacks')
+        if not check(fpath['full']):
+            raise IOError("Can't find file: %s" % fpath['full'])
         return fpath
 
     def parse_dimensions(self):
@@ -229,19 +442,228 @@ class ImageDataOlympus(ImageData):
         log.info('Parsed image dimensions: %s', dim)
         return dim
 
+    def load_metadata(self):
+        """Read the metadata from the file (or the cache).
+
+        To be implemented by the subclasses, has to set self._dim.
+        """
+        raise NotImplementedError('load_metadata() not implemented!')
+
     def get_dimensions(self):
         """Lazy parsing of the image dimensions."""
         if self._dim is None:
-            self._dim = self.parse_dimensions()
+            with metrics.span('dataset.load_metadata'):
+                self.load_metadata()
         return self._dim
 
+    def get_pixelsize(self):
+        """Lazy parsing of the pixel size from the metadata.
+
+        Returns
+        -------
+        (size_x, size_y) : (float, float)
+            The pixel size in micrometers.
+        """
+        self.get_dimensions()
+        get = self.parser.get
+        try:
+            unit_x = get(u'Reference Image Parameter', u'WidthUnit')
+            unit_y = get(u'Reference Image Parameter', u'HeightUnit')
+            size_x = get(u'Reference Image Parameter', u'WidthConvertValue')
+            size_y = get(u'Reference Image Parameter', u'HeightConvertValue')
+        except ConfigParser.NoOptionError as err:
+            raise ValueError("Error parsing pixel size from %s: %s" %
+                             (self.storage['full'], err))
+        if unit_x != u'"um"' or unit_y != u'"um"':
+            raise ValueError("Unsupported pixel size units: %s / %s" %
+                             (unit_x, unit_y))
+        return (float(size_x), float(size_y))
+
+    def cache_lookup(self):
+        """Fetch the cached metadata record of this dataset.
+
+        Returns
+        -------
+        record : dict or None
+            None if no cache is used or it has no (valid) entry for the file.
+        """
+        if self.cache is None:
+            return None
+        record = self.cache.get(self.storage['full'])
+        if record is None:
+            metrics.count('dataset.cache_misses')
+        else:
+            metrics.count('dataset.cache_hits')
+            # JSON turns all str into unicode, use plain keys for the dims:
+            record['dim'] = dict((str(k), v) for k, v in record['dim'].items())
+        return record
+
+    def cache_store(self, **record):
+        """Store a metadata record (with the image dimensions) in the cache."""
+        if self.cache is None:
+            return
+        record['dim'] = self._dim
+        self.cache.put(self.storage['full'], record)
+
     def set_relpos(self, overlap):
+        """Set the relative coordinates to be calculated from the tile overlap.
+
+        As the image dimensions are required for this, the calculation is
+        deferred until the coordinates are accessed (see calc_relpos).
+
+        Parameters
+        ----------
+        overlap : float
+            The overlap between tiles in percent.
+        """
+        self.position.defer('relative', self.calc_relpos, overlap)
+
+    def plane_index(self):
+        """Lazy lookup of the plane locations (see find_planes)."""
+        if self._planes is None:
+            self._planes = self.find_planes()
+        return self._planes
+
+    def find_planes(self):
+        """Locate the planes of this dataset.
+
+        To be implemented by the subclasses.
+
+        Returns
+        -------
+        planes : dict((int, int, int): str)
+            The location of each plane (to be passed on to read_plane), by
+            their (zero-based) channel, slice and timepoint indices.
+        """
+        raise NotImplementedError('find_planes() not implemented!')
+
+    def read_plane(self, location):
+        """Read a single plane (from a location given by plane_index)."""
+        raise NotImplementedError('read_plane() not implemented!')
+
+    def read_plane_region(self, location, bounds):
+        """Read the region (y0, y1, x0, x1) of a single plane."""
+        raise NotImplementedError('read_plane_region() not implemented!')
+
+    def read(self, z=None, c=None, t=None):
+        """Read the pixel data into a numpy array.
+
+        Requires numpy (the 'pixels' extra). Supported for OIF and OIB
+        datasets, reading the pixel data of OIR files raises an IOError.
+
+        Parameters
+        ----------
+        z, c, t : int, optional
+            The (zero-based) index of the slice, channel and timepoint to read,
+            all of them are read if an index is omitted.
+
+        Returns
+        -------
+        pixels : np.ndarray
+            The axes are ordered as (T, C, Z, Y, X), leaving out the ones an
+            index was given for. A single plane is returned as a (read-only)
+            memory map of the file if its pixels are stored in one piece.
+        """
+        return self.read_planes(self.read_plane, z, c, t)
+
+    def read_region(self, x0, x1, y0, y1, z=None, c=None, t=None):
+        """Read a rectangular region of the pixel data into a numpy array.
+
+        Only the requested part of each plane is read from disk, which makes
+        this considerably cheaper than read() for small regions like the
+        overlap of neighbouring tiles.
+
+        Parameters
+        ----------
+        x0, x1, y0, y1 : int
+            The region to read (end-exclusive).
+        z, c, t : int, optional
+            See read().
+
+        Returns
+        -------
+        pixels : np.ndarray
+            See read(), with the Y and X axes cropped to the region.
+        """
+        bounds = (y0, y1, x0, x1)
+        return self.read_planes(
+            lambda location: self.read_plane_region(location, bounds),
+            z, c, t)
+
+    def read_planes(self, read_func, z=None, c=None, t=None):
+        """Read the requested planes using the given function for each.
+
+        Parameters
+        ----------
+        read_func : callable
+            A function reading a plane given its location (see plane_index).
+        z, c, t : int, optional
+            See read().
+        """
+        # numpy is only imported once pixel data is read:
+        try:
+            import numpy as np
+        except ImportError:  # e.g. in Jython (Fiji)
+            raise ImportError('Reading pixel data requires numpy!')
+        dim = self.get_dimensions()
+        planes = self.plane_index()
+        ranges = list()
+        for axis, idx in zip('TCZ', (t, c, z)):
+            size = max(dim[axis], 1)
+            if idx is None:
+                ranges.append(range(size))
+            elif 0 <= idx < size:
+                ranges.append([idx])
+            else:
+                raise IndexError('%s index out of range: %s' % (axis, idx))
+        shape = tuple(len(rng) for rng, idx in zip(ranges, (t, c, z))
+                      if idx is None)
+        pixels = None
+        for num, (i_t, i_c, i_z) in enumerate(product(*ranges)):
+            try:
+                location = planes[(i_c, i_z, i_t)]
+            except KeyError:
+                raise IOError('Missing plane (C=%s, Z=%s, T=%s) in %s' %
+                              (i_c, i_z, i_t, self.storage['full']))
+            plane = read_func(location)
+            if not shape:
+                return plane
+            if pixels is None:
+                pixels = np.empty(shape + plane.shape, dtype=plane.dtype)
+                flat = pixels.reshape((-1,) + plane.shape)
+            flat[num] = plane
+        return pixels
+
+    @staticmethod
+    def match_planes(names):
+        """Map (c, z, t) indices to the given TIFF plane names.
+
+        Parameters
+        ----------
+        names : dict(str: str)
+            The locations of the planes, by their file names.
+        """
+        planes = dict()
+        for name, location in names.items():
+            match = PLANE_NAME.search(name)
+            if match is None:
+                continue
+            idx = tuple(int(num) - 1 if num else 0 for num in match.groups())
+            planes[idx] = location
+        log.debug('Found %s image planes.', len(planes))
+        return planes
+
+    def calc_relpos(self, overlap):
         """Calculate the relative coordinates from the tile overlap.
 
         Parameters
         ----------
         overlap : float
             The overlap between tiles in percent.
+
+        Returns
+        -------
+        (pos_x, pos_y) : (float, float)
         """
         ratio = (100.0 - overlap) / 100
         size_x = self.get_dimensions()['X']
@@ -251,79 +673,152 @@ class ImageDataOlympus(ImageData):
         pos_x = size_x * ratio * tileno_x
         pos_y = size_y * ratio * tileno_y
         log.info("Setting relative coordinates: %s, %s.", pos_x, pos_y)
-        self.position['relative'] = (pos_x, pos_y)
+        return (pos_x, pos_y)
 
 
 class ImageDataOIF(ImageDataOlympus):
 
     """Specific DataSet class for images in Olympus OIF format."""
 
-    def __init__(self, st_path):
+    __slots__ = ()
+
+    def __init__(self, st_path, cache=None, resolver=None):
         """Set up the image dataset object.
 
         Parameters
         ----------
         st_path : str
             The full path to the .OIF file.
+        cache : cache.MetadataCache, optional
+            A persistent cache to fetch / store the parsed metadata.
+        resolver : pathtools.PathResolver, optional
+            The resolver used for locating the file.
 
         Instance Variables
         ------------------
         For inherited variables, see ImageData.
         """
         log.debug("ImageDataOIF(%s)", st_path)
-        super(ImageDataOIF, self).__init__(st_path)
-        self.parser = self.setup_parser()
-        self._dim = None  # override _dim to mark it as not yet known
+        super(ImageDataOIF, self).__init__(st_path, cache, resolver)
+
+    def load_metadata(self):
+        """Set up the parser and dimensions from the file (or the cache)."""
+        record = self.cache_lookup()
+        if record is None:
+            self.parser = self.setup_parser()
+            self._dim = self.parse_dimensions()
+            self.cache_store(ini=ini_to_dict(self.parser))
+        else:
+            self.parser = dict_to_ini(record['ini'])
+            self._dim = record['dim']
 
     def setup_parser(self):
         """Set up the ConfigParser object for this .oif file.
 
-        Use the 'codecs' package to set up a ConfigParser object that can
-        properly handle the UTF-16 encoded .oif files.
+        The UTF-16 encoded .oif file is decoded incrementally and only the
+        sections listed in 'ini_sections' are read (see read_ini_sections).
         """
-        # TODO: investigate usage of 'io' package instead of 'codecs'
         oif = self.storage['full']
         log.info('Parsing OIF file: %s', oif)
         try:
-            conv = codecs.open(oif, "r", "utf16")
+            fin = open(oif, 'rb')
         except IOError:
             raise IOError("Error parsing OIF file (does it exist?): %s" % oif)
-        parser = ConfigParser.RawConfigParser()
-        parser.readfp(conv)
-        conv.close()
+        metrics.count('dataset.files_opened')
+        with fin, metrics.span('dataset.ini_decode'):
+            parser = read_ini_sections(fin, self.ini_sections)
         log.debug('Finished parsing OIF file.')
         return parser
 
+    def find_planes(self):
+        """Locate the TIFF planes in the ".oif.files" directory."""
+        planedir = self.storage['full'] + '.files'
+        try:
+            names = os.listdir(planedir)
+        except OSError:
+            raise IOError("Can't find OIF planes directory: %s" % planedir)
+        return self.match_planes(
+            dict((name, os.path.join(planedir, name)) for name in names))
+
+    def read_plane(self, location):
+        """Read a TIFF plane (memory-mapped if possible)."""
+        # the tiff module (and numpy) is only imported for reading pixels:
+        from .tiff import read_tiff_file
+        return read_tiff_file(location)
+
+    def read_plane_region(self, location, bounds):
+        """Read the region (y0, y1, x0, x1) of a TIFF plane."""
+        from .tiff import read_tiff_region
+        with HANDLES.handle(location) as handle:
+            return read_tiff_region(handle.read, bounds)
+
 
 class ImageDataOIB(ImageDataOlympus):
 
     """Specific DataSet class for images in Olympus OIB format."""
 
-    def __init__(self, st_path):
+    __slots__ = ('container',)
+
+    def __init__(self, st_path, cache=None, resolver=None):
         """Set up the image dataset object.
 
         Parameters
         ----------
         st_path : str
             The full path to the .OIB file.
+        cache : cache.MetadataCache, optional
+            A persistent cache to fetch / store the parsed metadata.
+        resolver : pathtools.PathResolver, optional
+            The resolver used for locating the file.
 
         Instance Variables
         ------------------
+        container : oib.OIBContainer or None
+            The indexed OIB container, set up on first access to the file (see
+            get_container) and shared by all subsequent reads.
         For inherited variables, see ImageDataOlympus (and ImageData).
         """
         log.debug("ImageDataOIB(%s)", st_path)
-        super(ImageDataOIB, self).__init__(st_path)
-        self.parser = self.setup_parser()
+        super(ImageDataOIB, self).__init__(st_path, cache, resolver)
+        self.container = None
+
+    def get_container(self):
+        """Lazy indexing of the OIB container.
+
+        The oib module (and olefile) is only imported once the first OIB
+        container is opened.
+        """
+        if self.container is None:
+            from .oib import OIBContainer
+            oib = self.storage['full']
+            metrics.count('dataset.files_opened')
+            try:
+                with metrics.span('dataset.oib_index'):
+                    self.container = OIBContainer(oib)
+            except IOError as err:
+                raise IOError("Error parsing OIB file: %s" % err)
+        return self.container
+
+    def load_metadata(self):
+        """Set up the parser and dimensions from the file (or the cache)."""
+        record = self.cache_lookup()
+        if record is None:
+            self.parser = self.setup_parser()
+            self._dim = self.parse_dimensions()
+            self.cache_store(ini=ini_to_dict(self.parser))
+        else:
+            self.parser = dict_to_ini(record['ini'])
+            self._dim = record['dim']
 
     def setup_parser(self):
         """Set up the ConfigParser object for this .oib file.
 
-        Use the 'olefile' package to open the OIB container file, read in
-        the description file (using the 'codecs' package to properly handle the
-        UTF-16 encoding). Some minor checks on the description file are done
-        where also the "main" file of the OIB container (containing all the
-        metadata like dimensions, channels, etc.) is identified and eventually
-        the parser is set up for this file.
+        Use the (indexed) OIB container to read in the UTF-16 encoded
+        description file. Some minor checks on the
+        description file are done where also the "main" file of the OIB
+        container (containing all the metadata like dimensions, channels, etc.)
+        is identified and eventually the parser is set up for the sections of
+        this file listed in 'ini_sections' (see read_ini_sections).
 
         Jython Debugging
         ================
@@ -331,33 +826,22 @@ class ImageDataOIB(ImageDataOlympus):
         package, it is sometimes necessary to do some manual debugging:
 
         >>> import sys
-        >>> import codecs
         >>> sys.path.insert(0, PATH_TO_OLEFILE_PACKAGE)
         >>> import olefile
         >>> ole = olefile.OleFileIO(PATH_TO_OIB_FILE)
         >>> ole = olefile.OleFileIO(PATH_TO_OIB_FILE, debug=True)
         """
         oibinfo = 'OibInfo.txt'
-        encoding = 'utf16'
         expected_version = '2.0.0.0'
-        # TODO: investigate usage of 'io' package instead of 'codecs'
-        oib = self.storage['full']
-        log.info('Parsing OIB file: %s', oib)
-        try:
-            ole = olefile.OleFileIO(oib)
-        except IOError as err:
-            raise IOError("Error parsing OIB file: %s" % err)
+        log.info('Parsing OIB file: %s', self.storage['full'])
+        container = self.get_container()
         log.info('Parsing OIB description file "%s".', oibinfo)
         try:
-            stream = ole.openstream([oibinfo])
+            stream = container.open(oibinfo)
         except IOError as err:
             raise IOError("OIB description (%s) missing: %s" % (oibinfo, err))
-        try:
-            conv = codecs.decode(stream.read(), encoding)
-        except UnicodeDecodeError as err:
-            raise UnicodeDecodeError("OIB has unexpected encoding: %s" % err)
-        parser = ConfigParser.RawConfigParser()
-        parser.readfp(StringIO(conv))
+        with stream, metrics.span('dataset.ini_decode'):
+            parser = read_ini_sections(stream, [u'OibSaveInfo'])
         oibver = parser.get(u'OibSaveInfo', u'Version')
         mainfile = parser.get(u'OibSaveInfo', u'MainFileName')
         if oibver != expected_version:
@@ -365,56 +849,145 @@ class ImageDataOIB(ImageDataOlympus):
         else:
             log.info('OIB Format Version: %s', oibver)
         log.debug('Main File Name: %s', mainfile)
-        stream.close()
         log.info('Finished parsing OIB description file.')
         # replace stream and parser with the mainfile:
-        stream = ole.openstream([mainfile])
-        conv = codecs.decode(stream.read(), encoding)
-        parser.readfp(StringIO(conv))
-        # clean up and return the parser:
+        with container.open(mainfile) as stream, \
+                metrics.span('dataset.ini_decode'):
+            parser = read_ini_sections(stream, self.ini_sections)
         log.debug('Finished parsing OIB file.')
-        stream.close()
-        ole.close()
         return parser
 
+    def find_planes(self):
+        """Locate the TIFF plane streams using the OIB description file.
+
+        The description file maps the streams of the container (e.g. option
+        'Stream00001' in section 'Storage00001') to the original file names.
+        """
+        container = self.get_container()
+        with container.open('OibInfo.txt') as stream:
+            parser = read_ini_sections(stream)
+        # options are lower-cased by the parser, so match case-insensitively:
+        streams = dict((name.lower(), name) for name in container.streams)
+        names = dict()
+        for section in parser.sections():
+            for option, fname in parser.items(section):
+                stream = streams.get(('%s/%s' % (section, option)).lower())
+                if stream is not None:
+                    names[fname.strip('"')] = stream
+        return self.match_planes(names)
+
+    def read_plane(self, location):
+        """Read a TIFF plane stream (memory-mapped if possible)."""
+        from .tiff import read_tiff_file, read_tiff_buffer
+        container = self.get_container()
+        extents = container.stream(location).extents
+        if extents is not None and len(extents) == 1:
+            with container.handle() as handle:
+                if handle.mapped:
+                    return read_tiff_file(container.fname, extents[0][0],
+                                          handle)
+        return read_tiff_buffer(container.read(location))
+
+    def read_plane_region(self, location, bounds):
+        """Read the region (y0, y1, x0, x1) of a TIFF plane stream."""
+        from .tiff import read_tiff_region
+        container = self.get_container()
+        return read_tiff_region(
+            lambda offset, size: container.read_at(location, offset, size),
+            bounds)
+
 
 class ImageDataOIR(ImageDataOlympus):
 
-    """Dataset class for the Olympus OIR format."""
+    """Dataset class for the Olympus OIR format.
+
+    Only the metadata is read from OIR files. Reading their pixel data (see
+    ImageData.read) is NOT supported and raises an IOError, as the layout of
+    the pixel blocks is not known (they are treated as opaque data, see
+    oir.OIRContainer). Neither is the pixel size parsed (see get_pixelsize).
+    """
+
+    __slots__ = ('blocks', '_xml')
+
+    # XML namespace definitions required for parsers:
+    _xmlns = {
+        'base': 'http://www.olympus.co.jp/hpf/model/base',
+        'commonframe': 'http://www.olympus.co.jp/hpf/model/commonframe',
+        'commonimage': 'http://www.olympus.co.jp/hpf/model/commonimage',
+        'commonparam': 'http://www.olympus.co.jp/hpf/model/commonparam',
+    }
 
-    def __init__(self, st_path):
+    def __init__(self, st_path, cache=None, resolver=None):
         """Set up the image dataset object.
 
         Parameters
         ----------
         st_path : str
             The full path to the .OIR file.
+        cache : cache.MetadataCache, optional
+            A persistent cache to fetch / store the parsed metadata.
+        resolver : pathtools.PathResolver, optional
+            The resolver used for locating the file.
 
         Instance Variables
         ------------------
+        blocks : list(oir.OIRBlock)
+            The index of the blocks of the OIR file (offset, size, type), as
+            far as it was required to locate the metadata.
+
         For inherited variables, see ImageDataOlympus (and ImageData).
         """
         log.debug("ImageDataOIR(%s)", st_path)
-        super(ImageDataOIR, self).__init__(st_path)
-        # XML namespace definitions required for parsers:
-        ns_base = 'http://www.olympus.co.jp/hpf'
-        self._xmlns = {
-            'base': '%s/model/base' % ns_base,
-            'commonframe': '%s/model/commonframe' % ns_base,
-            'commonimage': '%s/model/commonimage' % ns_base,
-            'commonparam': '%s/model/commonparam' % ns_base,
-        }
-        self._xml = self.get_xml_sections()
-        self.parse_dimensions()
+        super(ImageDataOIR, self).__init__(st_path, cache, resolver)
+        self.blocks = None
+        self._xml = None
         ### self.parser = self.setup_parser()
 
+    def load_metadata(self):
+        """Read the XML sections and dimensions from the file or the cache."""
+        record = self.cache_lookup()
+        if record is None:
+            self._xml = self.get_xml_sections()
+            self.parse_dimensions()
+            self.cache_store(xml=self._xml,
+                             blocks=[tuple(blk) for blk in self.blocks])
+        else:
+            self._xml = dict((tag, xml.encode('utf-8'))
+                             for tag, xml in record['xml'].items())
+            self.blocks = [OIRBlock(*blk) for blk in record['blocks']]
+            self._dim = record['dim']
+
+    def get_pixelsize(self):
+        """Not supported, the pixel size is not parsed from OIR files.
+
+        Raises
+        ------
+        ValueError
+            Always, like for the other formats if the pixel size is unknown.
+        """
+        raise ValueError('Parsing the pixel size of OIR files is not '
+                         'supported: %s' % self.storage['full'])
+
+    def find_planes(self):
+        """Not supported, the pixel data of OIR files is not read.
+
+        Raises
+        ------
+        IOError
+            Always, i.e. on any attempt to read pixel data (see read).
+        """
+        raise IOError('Reading pixel data of OIR files is not supported: %s' %
+                      self.storage['full'])
+
+    @metrics.timed('dataset.oir_scan')
     def get_xml_sections(self, min_len=100):
-        """Scan the OIR file for strings containing specific XML structures.
+        """Read the XML blocks containing specific structures from the OIR.
 
-        Read in the file (in chunks of a defined size, to save memory) and scan
-        for sequences of printable chars. If a sequence exceeds a given minimum
-        length, check if it is an XML structure with a specific substring. Add
-        all sections found to a dict and return it.
+        Unless the block index of the file is already known, it is built by
+        walking the XML blocks of the file (see oir.OIRContainer.index) until
+        all requested blocks were found. Note that this still searches the
+        pixel data in between the XML blocks. With a known index, the
+        requested XML blocks are read directly at their position.
 
         Parameters
         ----------
@@ -426,54 +999,26 @@ class ImageDataOIR(ImageDataOlympus):
         found : dict
             A dict containing the found XML sections in one string per key.
         """
-        count = 0
-        size = 1048576  # set chunk size to be 1 MiB
-        collected = ''
         found = dict()
         search_tags = [
             'lsmframe:frameProperties',
             'lsmimage:imageProperties',
         ]
-
-        with open(self.storage['full'], 'rb') as fin:
-            while True:
-                chunk = fin.read(size)
-                # raise an exception if we reach EOF and haven't found all tags:
-                if not chunk:
-                    log.debug("Read %s bytes in %s chunks.", count*size, count)
-                    raise ValueError("Couldn't find all requested XML blocks!")
-                count += 1
-
-                for char in chunk:
-                    # collect sequences of printable chars:
-                    if char in string.printable:
-                        collected += char
-                        continue
-
-                    # if the sequence is below a minimum length or it doesn't
-                    # contain an XML block discard it and proceed with next:
-                    if len(collected) < min_len or '<?xml' not in collected:
-                        collected = ''
-                        continue
-
-                    # check if sequence contains any of the searched XML tags:
-                    for tag in search_tags:
-                        if '<' + tag in collected:
-                            log.debug('Found <%s> XML section.', tag)
-                            xml_close = collected.rfind('>') + 1
-                            if len(collected) - xml_close > 0:
-                                log.debug('Stripping %s trailing chars: "%s"',
-                                          len(collected) - xml_close,
-                                          collected[xml_close:])
-                            found[tag] = collected[:xml_close]
-                            # stop once all searched tags were found:
-                            if len(found) == len(search_tags):
-                                log.debug('Stopping after %s bytes.',
-                                          count * size)
-                                return found
-
-                    # reset collected chars for next round:
-                    collected = ''
+        metrics.count('dataset.files_opened')
+        with OIRContainer(self.storage['full']) as oir:
+            if self.blocks is None:
+                self.blocks = oir.index(search_tags, min_len)
+                scanned = sum(b.size for b in self.blocks)
+                log.debug('Indexed %s blocks, stopped after %s bytes.',
+                          len(self.blocks), scanned)
+                metrics.count('dataset.oir_bytes_scanned', scanned)
+            for block in self.blocks:
+                if block.type in search_tags:
+                    log.debug('Found <%s> XML section.', block.type)
+                    found[block.type] = oir.read_xml(block)
+        if len(found) != len(search_tags):
+            raise ValueError("Couldn't find all requested XML blocks!")
+        return found
 
     def parse_dimensions(self):
         """Wrapper to call the various specialized XML parsers."""
@@ -547,6 +1092,8 @@ class MosaicData(DataSet):
 
     """Special DataSet class for mosaic / tiling datasets."""
 
+    __slots__ = ('subvol',)
+
     def __init__(self, st_type, st_path):
         """Set up the mosaic dataset object.
 
@@ -577,6 +1124,8 @@ class MosaicDataCuboid(MosaicData):
 
     """Special case of a full cuboid mosaic volume."""
 
+    __slots__ = ('dim', 'overlap', 'overlap_units', '_table')
+
     def __init__(self, st_type, st_path, dim):
         """Set up the mosaic dataset object.
 
@@ -600,6 +1149,127 @@ class MosaicDataCuboid(MosaicData):
         self.dim = {'X': dim[0], 'Y': dim[1], 'Z': dim[2]}
         self.overlap = 0
         self.overlap_units = 'px'
+        self._table = None
+
+    def __getstate__(self):
+        # the table is rebuilt (and the positions bound) after unpickling:
+        state = super(MosaicDataCuboid, self).__getstate__()
+        state['_table'] = None
+        return state
+
+    def add_subvol(self, img_ds):
+        """Add a subvolume to this dataset (see MosaicData.add_subvol)."""
+        super(MosaicDataCuboid, self).add_subvol(img_ds)
+        self._drop_table()
+
+    def tile_table(self, rebuild=False):
+        """Lazy setup of the columnar table of the subvolumes.
+
+        The table is built on first access and kept until a subvolume is
+        added. Positions that are still to be computed (see set_relpos) are
+        filled in from the tile grid while building it, for all of those
+        subvolumes at once.
+
+        From then on the table holds the relative positions of the mosaic:
+        position['relative'] of the subvolumes is bound to their row (see
+        Position.bind), so reading or setting it goes to the table, and
+        positions computed for the whole mosaic at once (see
+        compute_positions) are seen by the subvolumes as well. Positions
+        that were removed (set to None) are placed on the grid again when
+        using 'rebuild'.
+
+        Parameters
+        ----------
+        rebuild : bool, optional
+            Whether to discard an existing table and build it again.
+
+        Returns
+        -------
+        table : tiletable.TileTable
+        """
+        if self._table is None or rebuild:
+            from .tiletable import TileTable
+            self._drop_table()
+            self._table = TileTable(
+                self.subvol, (self.dim['X'], self.dim['Y'], self.dim['Z']))
+            self._fill_from_grid()
+            column = self._table.rows['relative']
+            for idx, tile in enumerate(self.subvol):
+                tile.position.bind('relative', column, idx)
+        return self._table
+
+    def _drop_table(self):
+        """Discard the tile table, keeping the positions in the subvolumes."""
+        if self._table is not None:
+            for tile in self.subvol:
+                tile.position.unbind()
+        self._table = None
+
+    def _fill_from_grid(self):
+        """Set the unknown positions in the tile table from the tile grid."""
+        import numpy as np
+        rows = self._table.rows
+        missing = np.isnan(rows['relative'][:, :2]).any(axis=1)
+        if missing.any():
+            rows['relative'][missing, :2] = self._calc_positions(
+                rows[missing], 'grid')
+
+    def compute_positions(self, mode='grid', stage_factor=(1.0, 1.0)):
+        """Calculate the relative coordinates of all subvolumes at once.
+
+        Parameters
+        ----------
+        mode : str, optional
+            'grid' : from the tile grid indices and the overlap (in percent),
+                     like ImageDataOlympus.calc_relpos does for single tiles
+            'stage' : from the raw stage coordinates (e.g. 'XPos' / 'YPos' of
+                      FluoView mosaics) and the pixel size of the subvolumes,
+                      the tile with the lowest coordinates is placed at zero
+        stage_factor : (float, float), optional
+            The factors converting the stage coordinates to micrometers, a
+            negative factor flips the direction of the axis.
+
+        The result is stored in the tile table, i.e. it becomes the
+        position['relative'] of the subvolumes.
+
+        Returns
+        -------
+        positions : np.ndarray (N, 2)
+            The (x, y) relative coordinates in pixels.
+        """
+        rows = self.tile_table().rows
+        positions = self._calc_positions(rows, mode, stage_factor)
+        log.info('Computed %s relative positions (%s).', len(rows), mode)
+        rows['relative'][:, :2] = positions
+        return positions
+
+    def _calc_positions(self, rows, mode, stage_factor=(1.0, 1.0)):
+        """Calculate the (x, y) positions of rows of the tile table.
+
+        See compute_positions for the parameters.
+        """
+        import numpy as np
+        size = np.column_stack((rows['dim']['X'], rows['dim']['Y']))
+        if mode == 'grid':
+            ratio = (100.0 - self.get_overlap('pct')) / 100
+            return size * ratio * rows['tileno'][:, :2]
+        elif mode == 'stage':
+            stage = rows['stage'] * stage_factor
+            if np.isnan(stage).any() or np.isnan(rows['pixelsize']).any():
+                raise ValueError('Stage coordinates or pixel sizes missing!')
+            return (stage - stage.min(axis=0)) / rows['pixelsize']
+        raise TypeError('Unknown positioning mode: %s' % mode)
+
+    def relative_positions(self):
+        """The relative coordinates of all subvolumes from the tile table.
+
+        Returns
+        -------
+        positions : np.ndarray (N, 3)
+            A copy of the (x, y, z) coordinates in pixels, z is NaN where
+            unknown.
+        """
+        return self.tile_table().rows['relative'].copy()
 
     def set_overlap(self, value, units='px'):
         """Set the overlap amount and unit."""
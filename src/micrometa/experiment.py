@@ -3,7 +3,8 @@
 """Tools to process microscopy experiment data."""
 
 from log import log
-from .pathtools import parse_path
+from .cache import get_cache
+from .pathtools import parse_path, PathResolver
 
 
 class Experiment(list):
@@ -38,22 +39,85 @@ class MosaicExperiment(Experiment):
 
     """Abstract class for mosaic / tiling experiments."""
 
-    def __init__(self, infile):
+    def __init__(self, infile, cache=None, executor=None, max_workers=None,
+                 prefetch=False):
         """Set up the common experiment properties.
 
         Parameters
         ----------
         infile : str
             The experiment file or folder.
+        cache : cache.MetadataCache, str or bool, optional
+            The persistent metadata cache to use for the subvolumes, see
+            cache.get_cache() for details.
+        executor : str, optional
+            The type of executor used for parsing the subvolumes, one of
+            'serial' (the default), 'thread' or 'process'.
+        max_workers : int, optional
+            The maximum number of workers used by the executor.
+        prefetch : bool, optional
+            Whether to read the metadata of the subvolumes while parsing the
+            experiment or only once it is required (the default), see
+            materialize().
 
         Instance Variables
         ------------------
         supplement : dict
             Keeps supplementary information specific to the mosaic type.
+        cache : cache.MetadataCache or None
+        executor : str or None
+        max_workers : int or None
+        prefetch : bool
+        resolver : pathtools.PathResolver
+            The directory listings shared by all subvolumes for locating
+            their files, see tile_resolver().
         """
         super(MosaicExperiment, self).__init__(infile)
         self.supplement = {}
+        self.cache = get_cache(cache)
+        self.executor = executor
+        self.max_workers = max_workers
+        self.prefetch = prefetch
+        self.resolver = PathResolver()
+
+    def tile_resolver(self):
+        """The path resolver to be handed over to the subvolume loaders.
+
+        Returns
+        -------
+        resolver : pathtools.PathResolver or None
+            None when using a process pool, as every task would get its own
+            (empty) copy of the resolver, re-listing the directories for
+            every single subvolume.
+        """
+        if self.executor == 'process':
+            return None
+        return self.resolver
 
     def add_mosaics(self):
         """Abstract method to add mosaics to this experiment."""
         raise NotImplementedError('add_mosaics() not implemented!')
+
+    def materialize(self):
+        """Load the metadata of all subvolumes, dropping broken mosaics.
+
+        Subvolumes are set up as placeholders unless the experiment was created
+        with prefetch=True, so a broken subvolume is only noticed once its
+        metadata is read. This reads all of them and removes every mosaic that
+        has a subvolume failing to parse.
+
+        Returns
+        -------
+        self : MosaicExperiment
+        """
+        for mosaic_ds in list(self):
+            try:
+                for subvol_ds in mosaic_ds.subvol:
+                    subvol_ds.prefetch()
+            except Exception as err:  # pylint: disable=broad-except
+                # like when loading the subvolumes right away, any parsing
+                # error (e.g. a ParseError or ConfigParser.Error) counts:
+                log.warn('Mosaic %s has broken image data, SKIPPING: %s',
+                         mosaic_ds.supplement['index'], err)
+                self.remove(mosaic_ds)
+        return self
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+
+"""Run ImageJ macros in parallel headless Fiji processes.
+
+Every macro (e.g. one of the stitching shards generated by
+imagej.gen_stitching_macro_shards) is run by its own Fiji process, using a
+bounded number of concurrent jobs. Each job gets its own log file (collecting
+the output of all its attempts), failed jobs are retried and the Java heap of
+each process can be limited.
+
+Example
+-------
+>>> macros = imagej.gen_stitching_macro_shards(mosaic, 'stitching', 4)
+>>> fnames = imagej.write_stitching_macros(macros, 'stitch.ijm', dname)
+>>> jobs = fiji.run_macros(fnames, '/opt/Fiji.app/ImageJ-linux64',
+...                        max_jobs=2, mem='8G', retries=1)
+>>> [job.macro for job in jobs if job.returncode != 0]
+"""
+
+import os
+import subprocess
+import time
+from collections import namedtuple
+
+from log import log
+from .parallel import get_executor, wait_all
+
+
+class MacroJob(namedtuple('MacroJob', ['macro', 'returncode', 'attempts',
+                                       'logfile', 'duration'])):
+
+    """The result of running a macro.
+
+    Attributes
+    ----------
+    macro : str
+        The macro file.
+    returncode : int
+        The exit code of the last attempt (zero on success).
+    attempts : int
+        The number of times the macro was run.
+    logfile : str
+        The file containing the output of all attempts.
+    duration : float
+        The overall wall time of all attempts in seconds.
+    """
+
+    __slots__ = ()
+
+
+def fiji_command(fiji, macro, mem=None):
+    """Assemble the command line to run a macro in a headless Fiji.
+
+    Parameters
+    ----------
+    fiji : str or list(str)
+        The Fiji launcher executable (e.g. "ImageJ-linux64"), or a command as
+        a list (e.g. [sys.executable, 'fake_fiji.py']).
+    macro : str
+        The macro file.
+    mem : str, optional
+        The maximum Java heap size, e.g. '4G' or '8000m'.
+
+    Returns
+    -------
+    cmd : list(str)
+    """
+    cmd = list(fiji) if isinstance(fiji, (list, tuple)) else [fiji]
+    if mem is not None:
+        cmd.append('--mem=%s' % mem)
+    cmd += ['--headless', '--console', '-macro', macro]
+    return cmd
+
+
+def run_macro(fiji, macro, logfile, mem=None, retries=0, delay=0):
+    """Run a macro in a headless Fiji, retrying in case it fails.
+
+    Parameters
+    ----------
+    fiji, macro, mem : see fiji_command
+    logfile : str
+        The file to write the output of Fiji to (appending all attempts).
+    retries : int
+        The number of times a failing macro is run again.
+    delay : float
+        The number of seconds to wait before a retry.
+
+    Returns
+    -------
+    job : MacroJob
+    """
+    cmd = fiji_command(fiji, macro, mem)
+    start = time.time()
+    for attempt in range(1, retries + 2):
+        if attempt > 1:
+            time.sleep(delay)
+        with open(logfile, 'a') as log_out:
+            log_out.write('=== attempt %s: %s\n' % (attempt, ' '.join(cmd)))
+            log_out.flush()
+            try:
+                returncode = subprocess.call(cmd, stdout=log_out,
+                                             stderr=subprocess.STDOUT)
+            except OSError as err:
+                log_out.write('=== failed to start Fiji: %s\n' % err)
+                returncode = -1
+            log_out.write('=== attempt %s: exit code %s\n' %
+                          (attempt, returncode))
+        if returncode == 0:
+            break
+        log.warn('Macro "%s" failed (attempt %s, exit code %s).',
+                 macro, attempt, returncode)
+    return MacroJob(macro, returncode, attempt, logfile, time.time() - start)
+
+
+def run_macros(macros, fiji, max_jobs=2, mem=None, retries=1, delay=0,
+               logdir=None):
+    """Run a number of macros in parallel headless Fiji processes.
+
+    Parameters
+    ----------
+    macros : list(str)
+        The macro files to run.
+    fiji : str or list(str)
+        The Fiji launcher, see fiji_command.
+    max_jobs : int
+        The maximum number of concurrently running Fiji processes.
+    mem : str, optional
+        The maximum Java heap size of each process, see fiji_command.
+    retries, delay : see run_macro
+    logdir : str, optional
+        The directory for the log files (named after the macros), by default
+        the log of each macro is placed next to it.
+
+    Returns
+    -------
+    jobs : list(MacroJob)
+        The results of the macros, in the given order. Failed jobs are
+        reported by their (non-zero) return code, no exception is raised.
+    """
+    pool = get_executor('thread', max_jobs)
+    pending = list()
+    for macro in macros:
+        logfile = os.path.splitext(macro)[0] + '.log'
+        if logdir is not None:
+            logfile = os.path.join(logdir, os.path.basename(logfile))
+        pending.append(pool.submit(run_macro, fiji, macro, logfile, mem,
+                                   retries, delay))
+    log.info('Running %s macros (max. %s at once).', len(macros), max_jobs)
+    failed = wait_all(pending)
+    pool.shutdown()
+    if failed is not None:
+        raise pending[failed].exception()
+    jobs = [fut.result() for fut in pending]
+    failures = [job for job in jobs if job.returncode != 0]
+    if failures:
+        log.error('%s of %s macros failed: %s', len(failures), len(jobs),
+                  ', '.join(job.macro for job in failures))
+    else:
+        log.warn('Finished running %s macros.', len(jobs))
+    return jobs
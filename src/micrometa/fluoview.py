@@ -5,8 +5,139 @@
 import xml.etree.ElementTree as etree
 from log import log
 
+from . import formats, metrics
 from .experiment import MosaicExperiment
-from .dataset import MosaicDataCuboid, ImageDataOIF, ImageDataOIB, ImageDataOIR
+from .dataset import MosaicDataCuboid, ImageDataOlympus
+from .parallel import SerialExecutor, get_executor, submit_ahead, wait_all
+from .pathtools import parse_path
+
+
+# the number of mosaics submitted for parsing ahead of the one being collected:
+SUBMIT_AHEAD = 4
+
+
+def iter_xml_children(fname):
+    """Parse an XML file incrementally, yielding the children of its root.
+
+    The root element is yielded first, as soon as its start tag is parsed (so
+    it carries its attributes, but no children). After that, every direct
+    child of the root is yielded once it is complete. The children are
+    detached from the root, so a child is freed as soon as the caller drops
+    it and the memory used does not grow with the number of children.
+
+    Parameters
+    ----------
+    fname : str
+
+    Yields
+    ------
+    elem : xml.etree.ElementTree.Element
+    """
+    with open(fname, 'rb') as fin:
+        depth = 0
+        root = None
+        for event, elem in etree.iterparse(fin, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    root = elem
+                    yield root
+                continue
+            depth -= 1
+            if depth == 1:
+                root.clear()
+                yield elem
+
+
+@metrics.timed('fluoview.load_tile')
+def load_oir_tile(fname, grid_x, grid_y, overlap, cache=None, prefetch=False,
+                  resolver=None):
+    """Create the ImageDataOIR object for a tile of a FluoView 3000 mosaic.
+
+    This is a module-level function so it can be run by a process pool.
+
+    Parameters
+    ----------
+    fname : str
+        The full path to the .OIR file.
+    grid_x, grid_y : int
+        The tile's position in the mosaic grid.
+    overlap : float
+        The overlap between tiles in percent.
+    cache : cache.MetadataCache, optional
+    prefetch : bool, optional
+        Whether to read the metadata now or only once it is required.
+    resolver : pathtools.PathResolver, optional
+        The resolver used for locating the file.
+
+    Returns
+    -------
+    subvol_ds : ImageDataOIR
+        The sub-volume dataset (with its cache being detached).
+    """
+    try:
+        subvol_ds = formats.get_reader('oir')(fname, cache, resolver)
+        # we don't have the stage coordinates anywhere, so set them to None:
+        subvol_ds.set_stagecoords((None, None))
+        subvol_ds.set_tilenumbers(grid_x, grid_y)
+        subvol_ds.set_relpos(overlap)
+        if prefetch:
+            subvol_ds.prefetch()
+    except Exception as err:
+        log.error('Error parsing XML from OIR: %s', err)
+        raise IOError(err)
+    # the cache object would be pickled when run in a process pool:
+    subvol_ds.cache = None
+
+    if prefetch:
+        log.warn('Parsed area "%s", position: %s',
+                 fname, subvol_ds.position['relative'])
+    return subvol_ds
+
+
+@metrics.timed('fluoview.load_tile')
+def load_olympus_tile(reader, fname, stagecoords, tileno, overlap, index,
+                      cache=None, prefetch=False, resolver=None):
+    """Create the ImageData object for a tile of a FluoView mosaic.
+
+    This is a module-level function so it can be run by a process pool.
+
+    Parameters
+    ----------
+    reader : class
+        The ImageData class to use, e.g. ImageDataOIF or ImageDataOIB (see
+        formats.reader_for).
+    fname : str
+        The full path to the image file.
+    stagecoords : (float, float)
+        The raw stage coordinates of the tile.
+    tileno : (int, int)
+        The tile's position in the mosaic grid.
+    overlap : float
+        The overlap between tiles in percent.
+    index : int
+        The tile's index number in the mosaic.
+    cache : cache.MetadataCache, optional
+    prefetch : bool, optional
+        Whether to read the metadata now or only once it is required.
+    resolver : pathtools.PathResolver, optional
+        The resolver used for locating the file.
+
+    Returns
+    -------
+    subvol_ds : ImageDataOlympus
+        The sub-volume dataset (with its cache being detached).
+    """
+    subvol_ds = reader(fname, cache, resolver)
+    subvol_ds.set_stagecoords(stagecoords)
+    subvol_ds.set_tilenumbers(*tileno)
+    subvol_ds.set_relpos(overlap)
+    subvol_ds.supplement['index'] = index
+    if prefetch:
+        subvol_ds.prefetch()
+    # the cache object would be pickled when run in a process pool:
+    subvol_ds.cache = None
+    return subvol_ds
 
 
 class FluoView3kMosaic(MosaicExperiment):
@@ -27,6 +158,11 @@ class FluoView3kMosaic(MosaicExperiment):
     Please note that multiple mosaics ("groups") are contained in these project
     files and each of the mosaics might have different properties.
 
+    The tiles are only set up as placeholders by default, their OIR files are
+    read once their metadata is required. Unlike before, a mosaic with a
+    broken tile is therefore NOT skipped while parsing the project, but only
+    by materialize() (or right away when using prefetch=True).
+
     Example
     -------
     >>> import microscopy.fluoview
@@ -35,9 +171,29 @@ class FluoView3kMosaic(MosaicExperiment):
     >>> mos3k = microscopy.fluoview.FluoView3kMosaic('matl.omp2info')
     """
 
-    def __init__(self, infile):
+    def __init__(self, infile, runparser=True, cache=None, executor=None,
+                 max_workers=None, prefetch=False):
         """Initialize the object from a "matl.omp2info" XML file.
 
+        Parameters
+        ----------
+        runparser : bool, optional
+            Determines whether the mosaics should be parsed immediately, use
+            iter_mosaics() for processing them one by one otherwise.
+        cache : cache.MetadataCache, str or bool, optional
+            The persistent metadata cache to use, see cache.get_cache().
+        executor : str, optional
+            The executor used for parsing the tiles, one of 'serial' (the
+            default), 'thread' or 'process', see parallel.get_executor().
+        max_workers : int, optional
+            The maximum number of workers for parsing the tiles.
+        prefetch : bool, optional
+            If True, the metadata of all tiles is read while parsing the
+            project and mosaics with broken tiles are skipped right away.
+            Otherwise (the default) the tiles are set up as placeholders that
+            read their metadata once it is required, use materialize() to
+            load it and drop mosaics with broken tiles at that point.
+
         Instance Variables
         ------------------
         ns_base : str
@@ -46,10 +202,13 @@ class FluoView3kMosaic(MosaicExperiment):
             The XML Schema Instance.
         xmlns : dict
             A dict with the namespaces prefixes required to parse the XML.
-        tree : xml.etree.ElementTree
-            The parsed XML element tree.
+
+        Note that the XML file is not kept in memory, it is parsed
+        incrementally whenever the mosaics are processed (see
+        find_matrix_roi_groups).
         """
-        super(FluoView3kMosaic, self).__init__(infile)
+        super(FluoView3kMosaic, self).__init__(infile, cache, executor,
+                                               max_workers, prefetch)
         # define the XML namespaces / prefix map:
         self.ns_base = 'http://www.olympus.co.jp/hpf'
         self.xsi = '{http://www.w3.org/2001/XMLSchema-instance}'
@@ -57,27 +216,36 @@ class FluoView3kMosaic(MosaicExperiment):
             'matl': '%s/protocol/matl/model/matl' % self.ns_base,
             'marker': '%s/model/marker' % self.ns_base
         }
-        self.tree = self.validate_xml()
-        self.mosaictrees = self.find_matrix_roi_groups()
-        self.add_mosaics()
+        self.validate_xml()
+        if runparser:
+            self.add_mosaics()
 
+    @metrics.timed('fluoview.validate_xml')
     def validate_xml(self):
         """Check XML for being a valid FluoView 3000 mosaic experiment.
 
-        Evaluate the XML tree for known elements like the root tag and some of
-        the direct children to make sure the parsed file is in fact a FluoView
-        Multi Area Time Lapse XML file. Raises exceptions in case something
-        expected can't be found in the tree.
-
-        Returns
-        -------
-        tree : xml.etree.ElementTree
+        Evaluate the XML for known elements like the root tag and the stage
+        section to make sure the parsed file is in fact a FluoView Multi Area
+        Time Lapse XML file. Raises exceptions in case something expected
+        can't be found. Only the beginning of the file is parsed for this (up
+        to the first mosaic), the same checks are done on the fly whenever the
+        mosaics are processed (see find_matrix_roi_groups).
         """
+        log.info('Validating FluoView 3000 MATL XML (%s)', self.infile['full'])
+        # close the generator explicitly, releasing the file right away:
+        groups = self.find_matrix_roi_groups()
+        next(groups, None)
+        groups.close()
+        log.info('Finished validating XML.')
+
+    def check_root(self, root):
+        """Check the root element of the XML (with its attributes only).
 
+        Parameters
+        ----------
+        root : xml.etree.ElementTree.Element
+        """
         rt_expected = '{%s/protocol/matl/model/matl}properties' % self.ns_base
-        log.info('Validating FluoView 3000 MATL XML (%s)', self.infile['full'])
-        tree = etree.parse(self.infile['full'])
-        root = tree.getroot()
         log.debug('Checking XML root tag to be "%s"', rt_expected)
         if not root.tag == rt_expected:
             raise TypeError('Invalid XML root tag: %s' % root.tag)
@@ -90,7 +258,13 @@ class FluoView3kMosaic(MosaicExperiment):
         if not root.attrib['version'] == '2.2':
             raise ValueError('Unknown properties version: %s' % att['version'])
 
-        stage = root.find('matl:stage', self.xmlns)
+    def check_stage(self, stage):
+        """Check the "matl:stage" section and read the tile overlap from it.
+
+        Parameters
+        ----------
+        stage : xml.etree.ElementTree.Element
+        """
         stage_name = stage.find('matl:name', self.xmlns).text
         if not stage_name == 'PRIOR,H101F':
             raise ValueError('Unknown stage found: %s' % stage_name)
@@ -99,42 +273,98 @@ class FluoView3kMosaic(MosaicExperiment):
         log.debug('Found stage overlap to be %s.', overlap)
         self.supplement['overlap'] = overlap
 
-        log.info('Finished validating XML.')
-        return tree
-
     def find_matrix_roi_groups(self):
-        """Locate potential 'MatrixROI' trees within the XML.
+        """Generator yielding the 'MatrixROI' trees of the XML.
 
         A tiled dataset is defined as a 'matl:group' of type
         'matl:DefineMatrixROI' in the omp2info file.
-        """
-        matrix_groups = list()
 
+        The file is parsed incrementally: the root and the stage section are
+        checked as soon as they are read (see check_root and check_stage) and
+        each group is yielded once it is complete. The groups are not kept
+        by the parser, so the memory required doesn't grow with their number.
+
+        Yields
+        ------
+        group : xml.etree.ElementTree.Element
+        """
+        matl = '{%s}' % self.xmlns['matl']
         log.debug('Looking for Matrix ROI groups (tiling datasets).')
-        root = self.tree.getroot()
-        groups = root.findall('matl:group', self.xmlns)
-        for grp in groups:
-            grp_type = grp.attrib[self.xsi + 'type']
+        elements = iter_xml_children(self.infile['full'])
+        self.check_root(next(elements))
+        stage_found = False
+        count = 0
+        for elem in elements:
+            if elem.tag == matl + 'stage':
+                self.check_stage(elem)
+                stage_found = True
+                continue
+            if elem.tag != matl + 'group':
+                continue
+            if not stage_found:
+                raise ValueError('No stage found before the first group!')
+            grp_type = elem.attrib[self.xsi + 'type']
             if grp_type == 'matl:DefineMatrixROI':
-                log.debug('Group %s is a Matrix ROI.', grp.attrib['objectId'])
-                matrix_groups.append(grp)
-            if grp_type == 'matl:MosaicROI':
-                log.debug('Group %s is a Mosaic ROI.', grp.attrib['objectId'])
-                matrix_groups.append(grp)
+                log.debug('Group %s is a Matrix ROI.', elem.attrib['objectId'])
+            elif grp_type == 'matl:MosaicROI':
+                log.debug('Group %s is a Mosaic ROI.', elem.attrib['objectId'])
+            else:
+                continue
+            count += 1
+            yield elem
+        if not stage_found:
+            raise ValueError('No stage found in XML!')
 
-        log.warn("Found %i Matrix ROIs (tiling datasets).", len(matrix_groups))
-        return matrix_groups
+        log.warn("Found %i Matrix ROIs (tiling datasets).", count)
 
     def add_mosaics(self):
         """Run the parser for all relevant XML subtrees."""
-        for i, tree in enumerate(self.mosaictrees):
-            mosaic_ds = self.parse_mosaic(tree)
-            if mosaic_ds is None:
-                log.warn('Error parsing mosaic from group %s, SKIPPING!', i)
-                continue
+        with metrics.span('fluoview.add_mosaics'):
+            for mosaic_ds in self.iter_mosaics():
+                self.add_dataset(mosaic_ds)
+        metrics.report('Loaded %s mosaics from %s' %
+                       (len(self), self.infile['full']))
+
+    def iter_mosaics(self):
+        """Generator yielding the mosaics as soon as their tiles are parsed.
+
+        The XML is parsed incrementally and the tiles of each mosaic are
+        submitted to the executor as soon as its group is read, up to
+        SUBMIT_AHEAD mosaics ahead of the one being collected, so they can be
+        parsed concurrently. The results are collected mosaic by mosaic, in
+        the original order. Note that the mosaics are NOT added to this
+        experiment object (add_mosaics() takes care of that).
+
+        Example
+        -------
+        >>> mos3k = FluoView3kMosaic('matl.omp2info', runparser=False)
+        >>> imagej.write_all_tile_configs(mos3k.iter_mosaics())
 
-            mosaic_ds.supplement['index'] = i
-            self.add_dataset(mosaic_ds)
+        Yields
+        ------
+        mosaic_ds : MosaicDataCuboid
+        """
+        executor = get_executor(self.executor, self.max_workers)
+        submit = lambda tree: self.submit_mosaic(tree, executor)
+        try:
+            submitted = submit_ahead(self.find_matrix_roi_groups(), submit,
+                                     SUBMIT_AHEAD)
+            for i, (_, pending) in enumerate(submitted):
+                mosaic_ds = None
+                if pending is not None:
+                    mosaic_ds = self.collect_mosaic(*pending)
+                if mosaic_ds is None:
+                    log.warn('Error parsing mosaic from group %s, SKIPPING!',
+                             i)
+                    metrics.count('fluoview.mosaics_skipped')
+                    continue
+
+                mosaic_ds.supplement['index'] = i
+                yield mosaic_ds
+        finally:
+            executor.shutdown()
+            if self.cache is not None:
+                self.cache.flush()
 
     def parse_mosaic(self, tree):
         """Parse an XML subtree and create a MosaicDataset from it.
@@ -148,6 +378,26 @@ class FluoView3kMosaic(MosaicExperiment):
         mosaic_ds : MosaicDataCuboid
             The mosaic dataset object for this project.
         """
+        pending = self.submit_mosaic(tree, SerialExecutor())
+        if pending is None:
+            return None
+        return self.collect_mosaic(*pending)
+
+    def submit_mosaic(self, tree, executor):
+        """Parse an XML subtree and submit parsing its tiles to an executor.
+
+        Parameters
+        ----------
+        tree : xml.etree.ElementTree.Element
+        executor : concurrent.futures.Executor or parallel.SerialExecutor
+
+        Returns
+        -------
+        (mosaic_ds, areas, futures) : (MosaicDataCuboid, list, list)
+            The (still empty) mosaic dataset object, the "matl:area" subtrees
+            and the corresponding futures of the tiles. None in case the
+            mosaic is to be skipped.
+        """
         # lambda functions for tree.find().text and int/float conversions:
         tft = lambda t, p: t.find(p, self.xmlns).text
         tfi = lambda t, p: int(tft(t, p))
@@ -193,22 +443,47 @@ class FluoView3kMosaic(MosaicExperiment):
 
         areas = tree.findall('matl:area', self.xmlns)
         log.info('Found %s area sections (i.e. tiles).', len(areas))
+        futures = list()
         for area in areas:
             try:
-                mosaic_ds.add_subvol(self.parse_area(area))
+                futures.append(self.submit_area(area, executor))
             except IOError as err:
                 log.info('Group "%s" has broken image data: %s', oid, err)
                 log.info('Corresponding XML section:\n----\n%s\n----',
                          etree.tostring(area, 'utf-8'))
+                for fut in futures:
+                    fut.cancel()
                 return None
-            except Exception as err:  # pylint: disable=broad-except
-                # catching all other *exceptions* like this is fine since we
-                # anyway just skip this mosaic entirely in that case:
-                log.info('Unexpected error parsing group "%s": %s', oid, err)
-                log.info('Corresponding XML section:\n----\n%s\n----',
-                         etree.tostring(area, 'utf-8'))
-                return None
 
+        return (mosaic_ds, areas, futures)
+
+    @metrics.timed('fluoview.collect_mosaic')
+    def collect_mosaic(self, mosaic_ds, areas, futures):
+        """Wait for the tiles of a mosaic and add them to the dataset.
+
+        Parameters
+        ----------
+        mosaic_ds, areas, futures : see submit_mosaic()
+
+        Returns
+        -------
+        mosaic_ds : MosaicDataCuboid
+            The mosaic dataset object, None if any of the tiles is broken (in
+            which case parsing the remaining ones is cancelled).
+        """
+        failed = wait_all(futures)
+        if failed is not None:
+            log.info('Group "%s" has broken image data: %s',
+                     mosaic_ds.supplement['oid'], futures[failed].exception())
+            log.info('Corresponding XML section:\n----\n%s\n----',
+                     etree.tostring(areas[failed], 'utf-8'))
+            return None
+
+        for fut in futures:
+            subvol_ds = fut.result()
+            subvol_ds.cache = self.cache
+            mosaic_ds.add_subvol(subvol_ds)
+        metrics.count('fluoview.tiles', len(futures))
         return mosaic_ds
 
     def parse_area(self, tree):
@@ -225,6 +500,24 @@ class FluoView3kMosaic(MosaicExperiment):
             A sub-volume dataset built from the information found in the parsed
             XML and the related image file specified therein.
         """
+        subvol_ds = self.submit_area(tree, SerialExecutor()).result()
+        subvol_ds.cache = self.cache
+        return subvol_ds
+
+    def submit_area(self, tree, executor):
+        """Parse a "matl:area" XML tree and submit loading its tile.
+
+        Parameters
+        ----------
+        tree : xml.etree.ElementTree.Element
+            A "matl:area" subtree from a "matl.omp2info" XML file.
+        executor : concurrent.futures.Executor or parallel.SerialExecutor
+
+        Returns
+        -------
+        future : concurrent.futures.Future or parallel.DeferredFuture
+            The future for the ImageDataOIR object, see load_oir_tile().
+        """
         # lambda functions for tree.find().text and int/float conversions:
         tft = lambda t, p: t.find(p, self.xmlns).text
         tfi = lambda t, p: int(tft(t, p))
@@ -234,19 +527,14 @@ class FluoView3kMosaic(MosaicExperiment):
             fname = tft(tree, 'matl:image')
             grid_x = tfi(tree, 'matl:xIndex')
             grid_y = tfi(tree, 'matl:yIndex')
-            log.info('File "%s" grid position: %s / %s', fname, grid_x, grid_y)
-            subvol_ds = ImageDataOIR(self.infile['path'] + fname)
-            # we don't have the stage coordinates anywhere, so set them to None:
-            subvol_ds.set_stagecoords((None, None))
-            subvol_ds.set_tilenumbers(grid_x, grid_y)
-            subvol_ds.set_relpos(self.supplement['overlap'])
         except Exception as err:
             log.error('Error parsing XML from OIR: %s', err)
             raise IOError(err)
-
-        log.warn('Parsed area "%s", position: %s',
-                 fname, subvol_ds.position['relative'])
-        return subvol_ds
+        log.info('File "%s" grid position: %s / %s', fname, grid_x, grid_y)
+        return executor.submit(load_oir_tile, self.infile['path'] + fname,
+                               grid_x, grid_y, self.supplement['overlap'],
+                               self.cache, self.prefetch,
+                               self.tile_resolver())
 
 
 class FluoViewMosaic(MosaicExperiment):
@@ -264,6 +552,12 @@ class FluoViewMosaic(MosaicExperiment):
     Please note that multiple mosaics are contained in these project files and
     each of the mosaics can have different properties.
 
+    The subvolumes are only set up as placeholders by default, their metadata
+    is read once it is required. Unlike before, a mosaic with a subvolume
+    whose metadata can't be parsed is therefore NOT skipped while parsing the
+    project, but only by materialize() (or right away when using
+    prefetch=True). Missing files are still detected right away.
+
     Example
     -------
     >>> import microscopy.fluoview as fv
@@ -287,12 +581,12 @@ class FluoViewMosaic(MosaicExperiment):
     >>> ij.write_stitching_macro(code, 'stitch_all.ijm', dname)
     """
 
-    def __init__(self, infile, runparser=True):
+    def __init__(self, infile, runparser=True, cache=None, executor=None,
+                 max_workers=None, prefetch=False):
         """Parse all required values from the XML file.
 
         Instance Variables
         ------------------
-        tree : xml.etree.ElementTree
         supplement : {'mcount': int, # highest index reported by FluoView
                       'xdir': str,   # X axis direction
                       'ydir': str    # Y axis direction
@@ -302,35 +596,63 @@ class FluoViewMosaic(MosaicExperiment):
         ----------
         runparser : bool (optional)
             Determines whether the tree should be parsed immediately.
+        cache : cache.MetadataCache, str or bool, optional
+            The persistent metadata cache to use, see cache.get_cache().
+        executor : str, optional
+            The executor used for loading the subvolumes, one of 'serial' (the
+            default), 'thread' or 'process', see parallel.get_executor().
+        max_workers : int, optional
+            The maximum number of workers for loading the subvolumes.
+        prefetch : bool, optional
+            If True, the metadata of all subvolumes is read while parsing the
+            project and mosaics with broken subvolumes are skipped. Otherwise
+            (the default) they are set up as placeholders that read their
+            metadata once it is required, see materialize(). In both cases
+            the files are identified by their content (see find_readers), so
+            missing, truncated and unrecognised ones are detected right away.
+
+        Note that the XML file is not kept in memory, it is parsed
+        incrementally whenever the mosaics are processed (see
+        find_mosaictrees).
         """
-        super(FluoViewMosaic, self).__init__(infile)
-        self.tree = self.validate_xml()
-        self.mosaictrees = self.find_mosaictrees()
+        super(FluoViewMosaic, self).__init__(infile, cache, executor,
+                                             max_workers, prefetch)
+        self.validate_xml()
         if runparser:
             self.add_mosaics()
 
+    @metrics.timed('fluoview.validate_xml')
     def validate_xml(self):
         """Parse and check XML for being a valid FluoView mosaic experiment.
 
-        Evaluate the XML tree for known elements like the root tag (expected to
-        be "XYStage", and some of the direct children to make sure the parsed
+        Evaluate the XML for known elements like the root tag (expected to be
+        "XYStage", and some of the direct children to make sure the parsed
         file is in fact a FluoView mosaic XML file. Raises exceptions in case
-        something expected can't be found in the tree.
-
-        Returns
-        -------
-        tree : xml.etree.ElementTree
+        something expected can't be found. Only the beginning of the file is
+        parsed for this (up to the first mosaic), the same checks are done on
+        the fly whenever the mosaics are processed (see find_mosaictrees).
         """
         log.info('Validating FluoView Mosaic XML...')
-        tree = etree.parse(self.infile['full'])
-        root = tree.getroot()
-        if not root.tag == 'XYStage':
-            raise TypeError('Unexpected value: %s' % root.tag)
-        # find() raises an AttributeError if no such element is found:
-        xdir = root.find('XAxisDirection').text
-        ydir = root.find('YAxisDirection').text
+        # close the generator explicitly, releasing the file right away:
+        mosaictrees = self.find_mosaictrees()
+        next(mosaictrees, None)
+        mosaictrees.close()
+        log.info('Finished validating XML.')
+
+    def check_settings(self, settings):
+        """Check the general settings preceding the mosaics in the XML.
+
+        Parameters
+        ----------
+        settings : dict
+            The text of the root's children (before the first mosaic), by
+            their tag.
+        """
+        # a KeyError is raised if no such element was found:
+        xdir = settings['XAxisDirection']
+        ydir = settings['YAxisDirection']
         # WARNING: 'mcount' is the HIGHEST INDEX number, not the total count!
-        mcount = int(root.find('NumberOfMosaics').text)
+        mcount = int(settings['NumberOfMosaics'])
         # currently we only support LTR and TTB experiments:
         if xdir != 'LeftToRight' or ydir != 'TopToBottom':
             raise TypeError('Unsupported Axis configuration')
@@ -339,19 +661,74 @@ class FluoViewMosaic(MosaicExperiment):
             'ydir': ydir,
             'mcount': mcount
         }
-        log.info('Finished validating XML.')
-        return tree
 
     def find_mosaictrees(self):
-        """Locate potential mosaics within the XML tree."""
-        trees = self.tree.getroot().findall('Mosaic')
-        log.warn("Found %i potential mosaics in XML.", len(trees))
-        return trees
+        """Generator yielding the potential mosaics of the XML.
+
+        The file is parsed incrementally: the general settings are checked
+        once they are read (see check_settings) and each mosaic is yielded
+        as soon as it is complete. The mosaics are not kept by the parser, so
+        the memory required doesn't grow with their number.
+
+        Yields
+        ------
+        mosaic : xml.etree.ElementTree.Element
+        """
+        elements = iter_xml_children(self.infile['full'])
+        root = next(elements)
+        if not root.tag == 'XYStage':
+            raise TypeError('Unexpected value: %s' % root.tag)
+        settings = dict()
+        count = 0
+        for elem in elements:
+            if elem.tag != 'Mosaic':
+                settings[elem.tag] = elem.text
+                continue
+            if count == 0:
+                self.check_settings(settings)
+            count += 1
+            yield elem
+        if count == 0:
+            self.check_settings(settings)
+        log.warn("Found %i potential mosaics in XML.", count)
 
     def add_mosaics(self):
         """Run the parser for all relevant XML subtrees."""
-        for tree in self.mosaictrees:
-            self.add_mosaic(tree)
+        with metrics.span('fluoview.add_mosaics'):
+            for mosaic_ds in self.iter_mosaics():
+                self.add_dataset(mosaic_ds)
+        metrics.report('Loaded %s mosaics from %s' %
+                       (len(self), self.infile['full']))
+
+    def iter_mosaics(self):
+        """Generator yielding the mosaics as soon as their subvolumes are read.
+
+        The XML is parsed incrementally and the subvolumes of each mosaic are
+        submitted to the executor as soon as it is read, up to SUBMIT_AHEAD
+        mosaics ahead of the one being collected, so they can be loaded
+        concurrently. The results are collected mosaic by mosaic, in the
+        original order. Note that the mosaics are NOT added to this
+        experiment object (add_mosaics() takes care of that).
+
+        Yields
+        ------
+        mosaic_ds : MosaicDataCuboid
+        """
+        executor = get_executor(self.executor, self.max_workers)
+        submit = lambda tree: self.submit_mosaic(tree, executor)
+        try:
+            submitted = submit_ahead(self.find_mosaictrees(), submit,
+                                     SUBMIT_AHEAD)
+            for _, pending in submitted:
+                if pending is None:
+                    continue
+                mosaic_ds = self.collect_mosaic(*pending)
+                if mosaic_ds is not None:
+                    yield mosaic_ds
+        finally:
+            executor.shutdown()
+            if self.cache is not None:
+                self.cache.flush()
 
     def add_mosaic(self, tree):
         """Parse an XML subtree and create a MosaicDataset from it.
@@ -360,6 +737,28 @@ class FluoViewMosaic(MosaicExperiment):
         ----------
         tree : xml.etree.ElementTree.Element
         """
+        pending = self.submit_mosaic(tree, SerialExecutor())
+        if pending is None:
+            return
+        mosaic_ds = self.collect_mosaic(*pending)
+        if mosaic_ds is not None:
+            self.add_dataset(mosaic_ds)
+
+    def submit_mosaic(self, tree, executor):
+        """Parse an XML subtree and submit loading its subvolumes.
+
+        Parameters
+        ----------
+        tree : xml.etree.ElementTree.Element
+        executor : concurrent.futures.Executor or parallel.SerialExecutor
+
+        Returns
+        -------
+        (mosaic_ds, fnames, futures) : (MosaicDataCuboid, list, list)
+            The (still empty) mosaic dataset object, the subvolume file names
+            and the corresponding futures, see load_olympus_tile(). None in
+            case the mosaic is to be skipped (see find_readers).
+        """
         # lambda functions for tree.find().text and int/float conversions:
         tft = lambda p: tree.find(p).text
         tfi = lambda p: int(tft(p))
@@ -376,37 +775,101 @@ class FluoViewMosaic(MosaicExperiment):
         mosaic_ds.set_overlap(100.0 - tff('IndexRatio'), 'pct')
         mosaic_ds.supplement['index'] = idx
 
-        # Parsing and assembling the ImageData section should be considered
-        # to be moved into a separate method.
         # ImageData section:
+        images = list()
         for img in tree.findall('ImageInfo'):
             tft = lambda p: img.find(p).text
             tfi = lambda p: int(img.find(p).text)
             tff = lambda p: float(img.find(p).text)
-            subvol_fname = tft('Filename')
-            if subvol_fname[-3:] == 'oif':
-                subvol_reader = ImageDataOIF
-            elif subvol_fname[-3:] == 'oib':
-                subvol_reader = ImageDataOIB
-            else:
-                raise IOError('Unknown dataset type: %s.' % subvol_fname)
-            try:
-                subvol_ds = subvol_reader(self.infile['path'] + subvol_fname)
-                subvol_ds.set_stagecoords((tff('XPos'), tff('YPos')))
-                subvol_ds.set_tilenumbers(tfi('Xno'), tfi('Yno'))
-                subvol_ds.set_relpos(mosaic_ds.get_overlap('pct'))
-                subvol_ds.supplement['index'] = tfi('No')
-                mosaic_ds.add_subvol(subvol_ds)
-            except IOError as err:
-                log.info('Broken/missing image data: %s', err)
-                # this subvolume is broken, so we entirely cancel this mosaic:
-                mosaic_ds = None
-                break
-        if mosaic_ds is not None:
-            self.add_dataset(mosaic_ds)
-        else:
+            images.append((tft('Filename'), (tff('XPos'), tff('YPos')),
+                           (tfi('Xno'), tfi('Yno')), tfi('No')))
+        fnames = [image[0] for image in images]
+        try:
+            readers = self.find_readers(fnames)
+        except IOError as err:
+            log.info('Broken/missing image data: %s', err)
             log.warn('Mosaic %s: incomplete subvolumes, SKIPPING!', idx)
-            log.warn('First incomplete/missing subvolume: %s', subvol_fname)
+            metrics.count('fluoview.mosaics_skipped')
+            return None
+
+        futures = list()
+        for (fname, stagecoords, tileno, index), subvol_reader in zip(images,
+                                                                      readers):
+            futures.append(executor.submit(
+                load_olympus_tile, subvol_reader, self.infile['path'] + fname,
+                stagecoords, tileno, mosaic_ds.get_overlap('pct'), index,
+                self.cache, self.prefetch, self.tile_resolver()))
+        return (mosaic_ds, fnames, futures)
+
+    def find_readers(self, fnames):
+        """Determine the readers for the subvolumes of a mosaic.
+
+        The files are identified by their content in a single pass over all
+        of them (see formats.sniff_files), reading HEADER_SIZE bytes of each:
+        a missing, truncated or unknown file causes the whole mosaic to be
+        skipped before any of its subvolumes is parsed, mislabelled files are
+        read with the reader matching their content (the file name extension
+        is only used for warning about them).
+
+        Parameters
+        ----------
+        fnames : list(str)
+            The file names of the subvolumes as given in the XML.
+
+        Returns
+        -------
+        readers : list(class)
+            The ImageData class for each of the subvolumes, an IOError is
+            raised if any of them is missing or broken.
+        """
+        paths = [ImageDataOlympus.locate_file(
+            parse_path(self.infile['path'] + fname),
+            self.resolver.exists)['full'] for fname in fnames]
+        readers = list()
+        for path, name in zip(paths, formats.sniff_files(paths)):
+            if name is None:
+                raise IOError('Broken or unknown subvolume: %s' % path)
+            if path.lower().endswith(formats.BACKENDS[name].extensions):
+                log.debug('Subvolume %s contains %s data.', path, name.upper())
+            else:
+                log.warn('Subvolume %s contains %s data (wrong suffix)!', path,
+                         name.upper())
+            readers.append(formats.get_reader(name))
+        return readers
+
+    @metrics.timed('fluoview.collect_mosaic')
+    def collect_mosaic(self, mosaic_ds, fnames, futures):
+        """Wait for the subvolumes of a mosaic and add them to the dataset.
+
+        Parameters
+        ----------
+        mosaic_ds, fnames, futures : see submit_mosaic()
+
+        Returns
+        -------
+        mosaic_ds : MosaicDataCuboid
+            The mosaic dataset object, None if any of the subvolumes is broken
+            or missing (in which case loading the remaining ones is cancelled).
+        """
+        failed = wait_all(futures)
+        if failed is not None:
+            err = futures[failed].exception()
+            if not isinstance(err, IOError):
+                raise err
+            log.info('Broken/missing image data: %s', err)
+            # this subvolume is broken, so we entirely cancel this mosaic:
+            log.warn('Mosaic %s: incomplete subvolumes, SKIPPING!',
+                     mosaic_ds.supplement['index'])
+            log.warn('First incomplete/missing subvolume: %s', fnames[failed])
+            metrics.count('fluoview.mosaics_skipped')
+            return None
+
+        for fut in futures:
+            subvol_ds = fut.result()
+            subvol_ds.cache = self.cache
+            mosaic_ds.add_subvol(subvol_ds)
+        metrics.count('fluoview.tiles', len(futures))
+        return mosaic_ds
 
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+#!/usr/bin/python
+
+"""Registry of the image format backends (readers).
+
+A backend is registered with the file name extensions and the magic bytes
+identifying its files, together with the module and class name of its reader
+(an ImageData subclass). The reader is only imported once it is requested for
+the first time, so format specific dependencies (e.g. olefile for OIB) are
+not loaded by runs that don't touch the format. Further backends can be
+registered by other packages the same way the built-in ones are.
+
+The magic bytes allow for identifying the format of files by their content
+(see sniff_files), so mislabelled files are read by the correct reader and
+files that are truncated (e.g. partially copied) or of an unknown type are
+rejected before any attempt to parse them.
+
+Example
+-------
+>>> reader = formats.reader_for('Slide1sec001/Slide1sec001_01.oib')
+>>> reader.__name__
+'ImageDataOIB'
+>>> formats.sniff_files(['tile_01.oib', 'empty.oif'])
+['oib', None]
+>>> formats.register('lsm', ['.lsm'], 'mypackage.zeiss', 'ImageDataLSM',
+...                  magic=['II*\\x00'])
+"""
+
+import codecs
+import importlib
+import re
+import threading
+from collections import namedtuple
+from os.path import splitext
+
+from log import log
+from . import metrics
+
+
+class Backend(namedtuple('Backend', ['name', 'extensions', 'magic',
+                                     'module', 'attr'])):
+
+    """A registered format backend.
+
+    Attributes
+    ----------
+    name : str
+        The (unique) name of the format, e.g. 'oib'.
+    extensions : tuple(str)
+        The (lower case) file name extensions, including the dot.
+    magic : tuple(str or re.RegexObject)
+        The byte sequences a file of the format starts with, or patterns to
+        be matched against the beginning of its files (see HEADER_SIZE).
+    module : str
+        The module providing the reader, relative to this package if it
+        starts with a dot.
+    attr : str
+        The name of the reader class in the module.
+    """
+
+    __slots__ = ()
+
+
+# the registered backends by their name, in order of registration:
+BACKENDS = dict()
+ORDER = list()
+
+# the number of bytes read from each file for identifying its format:
+HEADER_SIZE = 512
+
+# relative module names of the backends are resolved in this package:
+PACKAGE = __name__.rpartition('.')[0]
+
+# the readers imported so far, by the name of their backend:
+_READERS = dict()
+_LOCK = threading.Lock()
+
+
+def register(name, extensions, module, attr, magic=()):
+    """Register (or replace) a format backend.
+
+    Parameters
+    ----------
+    name : str
+        The name of the format.
+    extensions : list(str)
+        The file name extensions, e.g. ['.oib'].
+    module : str
+        The module of the reader, e.g. '.dataset' or 'mypackage.reader'.
+    attr : str
+        The class name of the reader in the module.
+    magic : list(str or re.RegexObject), optional
+        The byte sequences a file of the format starts with, or compiled
+        patterns to be matched against the first HEADER_SIZE bytes of it.
+    """
+    backend = Backend(name, tuple(ext.lower() for ext in extensions),
+                      tuple(magic), module, attr)
+    with _LOCK:
+        if name not in BACKENDS:
+            ORDER.append(name)
+        BACKENDS[name] = backend
+        _READERS.pop(name, None)
+    log.debug('Registered format backend: %s', backend)
+
+
+def get_reader(name):
+    """Get the reader of a format, importing it on first use.
+
+    Parameters
+    ----------
+    name : str
+        The name of the format, e.g. 'oir'.
+
+    Returns
+    -------
+    reader : class
+    """
+    reader = _READERS.get(name)
+    if reader is not None:
+        return reader
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise IOError('Unknown dataset type: %s.' % name)
+    log.debug('Importing reader for format "%s" (%s).', name, backend.module)
+    module = importlib.import_module(backend.module, PACKAGE)
+    reader = getattr(module, backend.attr)
+    _READERS[name] = reader
+    return reader
+
+
+def format_for(fname):
+    """Determine the format of a file by its name.
+
+    Returns
+    -------
+    name : str
+        The name of the backend, raises an IOError if none matches.
+    """
+    ext = splitext(fname)[1].lower()
+    for name in ORDER:
+        if ext in BACKENDS[name].extensions:
+            return name
+    raise IOError('Unknown dataset type: %s.' % fname)
+
+
+def reader_for(fname):
+    """Get the reader for a file, determined by its name (see format_for)."""
+    return get_reader(format_for(fname))
+
+
+def match_magic(header):
+    """Determine the format of a file from its first bytes.
+
+    Parameters
+    ----------
+    header : str
+        The beginning of the file (HEADER_SIZE bytes, unless it is shorter).
+
+    Returns
+    -------
+    name : str or None
+        The name of the backend, None if the magic bytes don't match any.
+    """
+    for name in ORDER:
+        for magic in BACKENDS[name].magic:
+            if isinstance(magic, str):
+                if header.startswith(magic):
+                    return name
+            elif magic.match(header):
+                return name
+    return None
+
+
+def read_header(fname, size):
+    """Read the first 'size' bytes of a file.
+
+    Returns
+    -------
+    header : str or None
+        None if the file can't be read.
+    """
+    try:
+        with open(fname, 'rb') as fin:
+            return fin.read(size)
+    except IOError as err:
+        log.debug('Reading the header of %s failed: %s', fname, err)
+        return None
+
+
+@metrics.timed('formats.sniff')
+def sniff_files(fnames):
+    """Identify the formats of a batch of files by their first bytes.
+
+    The first HEADER_SIZE bytes are read from each file, in a single pass
+    over all files (e.g. the tiles of a mosaic) before any of them is parsed.
+
+    Parameters
+    ----------
+    fnames : list(str)
+
+    Returns
+    -------
+    names : list(str or None)
+        The names of the backends, None for files that are missing, too short
+        or whose magic bytes don't match any of the backends.
+    """
+    names = list()
+    for fname in fnames:
+        header = read_header(fname, HEADER_SIZE)
+        metrics.count('formats.headers_read')
+        names.append(None if header is None else match_magic(header))
+    return names
+
+
+# OIF: UTF-16 (little endian) INI, starting with a complete section header
+register('oif', ['.oif'], '.dataset', 'ImageDataOIF', magic=[re.compile(
+    re.escape(codecs.BOM_UTF16_LE) + r'\[\x00(?:[^\]\r\n]\x00)+\]\x00')])
+# OIB: OLE2 signature, the major version (3 or 4) and the byte order mark
+register('oib', ['.oib'], '.dataset', 'ImageDataOIB', magic=[re.compile(
+    r'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1.{18}[\x03\x04]\x00\xfe\xff', re.S)])
+register('oir', ['.oir'], '.dataset', 'ImageDataOIR',
+         magic=['OLYMPUSRAWFORMAT'])
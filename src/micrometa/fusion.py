@@ -0,0 +1,193 @@
+#!/usr/bin/python
+
+"""Out-of-core fusion of mosaics using linear blending.
+
+The fused volume is written to a NumPy (.npy) file, which is filled block by
+block. Each block is fused one z-slice at a time from the tiles overlapping it,
+reading only the parts of the tiles actually covered by the block from disk
+(see ImageData.read_region). The blocks are independent of each other and can
+be processed concurrently (see parallel.get_executor).
+
+Example
+-------
+>>> from micrometa import fluoview, fusion
+>>> mosaic = fluoview.FluoViewMosaic('MATL_Mosaic.log')[0]
+>>> fusion.fuse_mosaic(mosaic, '/tmp/fused.npy', c=0)
+>>> fused = numpy.load('/tmp/fused.npy', mmap_mode='r')
+"""
+
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # e.g. in Jython (Fiji)
+    np = None
+
+from log import log
+from .parallel import get_executor, wait_all
+
+
+class Placement(namedtuple('Placement',
+                           ['tile', 'x', 'y', 'z', 'width', 'height',
+                            'depth'])):
+
+    """A tile and its (integer) position and extent in the fused volume."""
+
+    __slots__ = ()
+
+
+def place_tiles(mosaic_ds):
+    """Determine the placement of all tiles of a mosaic in the fused volume.
+
+    The (rounded) relative tile positions are shifted such that the fused
+    volume starts at the origin. Positions without a z component place the
+    tile at the first slice.
+
+    Returns
+    -------
+    placements : list(Placement)
+    shape : (int, int, int)
+        The shape (Z, Y, X) of the fused volume.
+    """
+    placements = list()
+    for tile in mosaic_ds.subvol:
+        pos = tile.position['relative']
+        dim = tile.get_dimensions()
+        z_pos = pos[2] if len(pos) > 2 else 0
+        placements.append(Placement(tile, int(round(pos[0])),
+                                    int(round(pos[1])), int(round(z_pos)),
+                                    dim['X'], dim['Y'], max(dim['Z'], 1)))
+    x_min = min(plc.x for plc in placements)
+    y_min = min(plc.y for plc in placements)
+    z_min = min(plc.z for plc in placements)
+    placements = [plc._replace(x=plc.x - x_min, y=plc.y - y_min,
+                               z=plc.z - z_min) for plc in placements]
+    shape = (max(plc.z + plc.depth for plc in placements),
+             max(plc.y + plc.height for plc in placements),
+             max(plc.x + plc.width for plc in placements))
+    return placements, shape
+
+
+def linear_ramp(size):
+    """Blending weights along one axis, rising linearly from the borders."""
+    pos = np.arange(size, dtype=np.float32)
+    return np.minimum(pos + 1, size - pos)
+
+
+def blocks_of(shape, block_size):
+    """Generate the (y0, y1, x0, x1) bounds of the output blocks."""
+    for y_0 in range(0, shape[1], block_size):
+        for x_0 in range(0, shape[2], block_size):
+            yield (y_0, min(y_0 + block_size, shape[1]),
+                   x_0, min(x_0 + block_size, shape[2]))
+
+
+def fuse_block(outfile, bounds, placements, c=0, t=0):
+    """Fuse the tiles overlapping a block and write it to the output file.
+
+    Parameters
+    ----------
+    outfile : str
+        The (existing) .npy file holding the fused volume.
+    bounds : (int, int, int, int)
+        The block boundaries (y0, y1, x0, x1) in the fused volume.
+    placements : list(Placement)
+        The tiles overlapping the block.
+    c, t : int
+        The channel and timepoint to fuse.
+    """
+    out = np.load(outfile, mmap_mode='r+')
+    y_0, y_1, x_0, x_1 = bounds
+    overlaps = list()
+    for plc in placements:
+        o_y0, o_y1 = max(y_0, plc.y), min(y_1, plc.y + plc.height)
+        o_x0, o_x1 = max(x_0, plc.x), min(x_1, plc.x + plc.width)
+        weight = np.outer(
+            linear_ramp(plc.height)[o_y0 - plc.y:o_y1 - plc.y],
+            linear_ramp(plc.width)[o_x0 - plc.x:o_x1 - plc.x])
+        overlaps.append((plc,
+                         (slice(o_y0 - y_0, o_y1 - y_0),
+                          slice(o_x0 - x_0, o_x1 - x_0)),
+                         (o_x0 - plc.x, o_x1 - plc.x,
+                          o_y0 - plc.y, o_y1 - plc.y),
+                         weight))
+    integer = np.issubdtype(out.dtype, np.integer)
+    if integer:
+        limits = np.iinfo(out.dtype)
+    for z_out in range(out.shape[0]):
+        acc = np.zeros((y_1 - y_0, x_1 - x_0), dtype=np.float32)
+        wsum = np.zeros_like(acc)
+        for plc, blk, sub, weight in overlaps:
+            if not plc.z <= z_out < plc.z + plc.depth:
+                continue
+            region = plc.tile.read_region(*sub, z=z_out - plc.z, c=c, t=t)
+            acc[blk] += region * weight
+            wsum[blk] += weight
+        np.divide(acc, wsum, out=acc, where=wsum > 0)
+        if integer:
+            acc = np.clip(np.rint(acc), limits.min, limits.max)
+        out[z_out, y_0:y_1, x_0:x_1] = acc
+    out.flush()
+    del out
+
+
+def fuse_mosaic(mosaic_ds, outfile, c=0, t=0, block_size=1024, dtype=None,
+                executor='process', max_workers=None):
+    """Fuse a mosaic into a volume on disk, using linear blending.
+
+    Parameters
+    ----------
+    mosaic_ds : dataset.MosaicData
+        The mosaic, its tiles placed according to position['relative'].
+    outfile : str
+        The .npy file to write the fused volume (Z, Y, X) to.
+    c, t : int
+        The (zero-based) channel and timepoint to fuse.
+    block_size : int
+        The edge length (in pixels) of the blocks processed at once.
+    dtype : str or np.dtype, optional
+        The pixel type of the fused volume, by default an unsigned integer
+        type large enough for the bit depth of the tiles.
+    executor : str
+        The executor type to use for fusing the blocks, see get_executor.
+    max_workers : int, optional
+        The maximum number of concurrently processed blocks.
+
+    Returns
+    -------
+    shape : (int, int, int)
+        The shape of the fused volume.
+    """
+    if np is None:
+        raise ImportError('Fusing mosaics requires numpy!')
+    placements, shape = place_tiles(mosaic_ds)
+    if dtype is None:
+        bits = mosaic_ds.subvol[0].get_dimensions()['B']
+        dtype = np.uint8 if 0 < bits <= 8 else np.uint16
+    log.info('Fusing %s tiles into a volume of %s (%s).',
+             len(placements), shape, np.dtype(dtype).name)
+    out = np.lib.format.open_memmap(outfile, mode='w+', dtype=dtype,
+                                    shape=shape)
+    del out
+
+    x_pos = np.array([plc.x for plc in placements])
+    y_pos = np.array([plc.y for plc in placements])
+    x_end = x_pos + [plc.width for plc in placements]
+    y_end = y_pos + [plc.height for plc in placements]
+    pool = get_executor(executor, max_workers)
+    pending = list()
+    for bounds in blocks_of(shape, block_size):
+        y_0, y_1, x_0, x_1 = bounds
+        hits = np.nonzero((y_pos < y_1) & (y_end > y_0) &
+                          (x_pos < x_1) & (x_end > x_0))[0]
+        if not len(hits):
+            continue
+        pending.append(pool.submit(fuse_block, outfile, bounds,
+                                   [placements[i] for i in hits], c, t))
+    log.debug('Submitted %s blocks for fusion.', len(pending))
+    failed = wait_all(pending)
+    pool.shutdown()
+    if failed is not None:
+        raise pending[failed].exception()
+    log.info('Fused mosaic written to %s', outfile)
+    return shape
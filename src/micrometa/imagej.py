@@ -6,14 +6,16 @@
 # the methods required for all templates and derived subclasses that contain a
 # required method that adds the specific variables-setting code.
 
-from os.path import join, dirname
+from os.path import join, dirname, splitext
 
 from log import log
 from misc import readtxt
 
+from . import metrics
 from .pathtools import exists
 
 
+@metrics.timed('imagej.gen_tile_config')
 def gen_tile_config(mosaic_ds):
     """Generate a tile configuration for Fiji's stitcher.
 
@@ -39,8 +41,18 @@ def gen_tile_config(mosaic_ds):
         app('# Generated by %s (%s).\n#\n' % (__name__, imcf.VERSION))
     except ImportError:
         pass
-    subvol_size_z = mosaic_ds.subvol[0].get_dimensions()['Z']
-    subvol_position_dim = len(mosaic_ds.subvol[0].position['relative'])
+    try:
+        # all positions at once from the mosaic's tile table (the positions
+        # of the subvolumes are bound to it, see MosaicDataCuboid.tile_table):
+        rows = mosaic_ds.tile_table().rows
+        positions = rows['relative'].tolist()
+        subvol_size_z = rows['dim']['Z'][0]
+    except ImportError:  # no numpy (e.g. in Jython), ask the subvolumes
+        positions = [vol.position['relative'] for vol in mosaic_ds.subvol]
+        subvol_size_z = mosaic_ds.subvol[0].get_dimensions()['Z']
+    # unknown coordinates are NaN in the table, drop them:
+    positions = [tuple(val for val in pos if val == val) for pos in positions]
+    subvol_position_dim = len(positions[0])
     app('# Define the number of dimensions we are working on\n')
     if subvol_size_z > 1:
         app('dim = 3\n')
@@ -53,7 +65,7 @@ def gen_tile_config(mosaic_ds):
         coord_format = '(%f, %f)\n'
     app('# Define the image coordinates (in pixels)\n')
     log.debug("Mosaic storage path: %s", mosaic_ds.storage['path'])
-    for vol in mosaic_ds.subvol:
+    for vol, pos in zip(mosaic_ds.subvol, positions):
         vol_fname = vol.storage['full']
         # convert path to subvolumes to be relative to mosaic file:
         if vol.storage['full'].startswith(mosaic_ds.storage['path']):
@@ -61,11 +73,12 @@ def gen_tile_config(mosaic_ds):
         line = '%s; ; ' % vol_fname
         # always use forward slashes as path separator (works on all OS!)
         line = line.replace('\\', '/')
-        line += coord_format % vol.position['relative']
+        line += coord_format % pos
         app(line)
     return conf
 
 
+@metrics.timed('imagej.write_tile_config')
 def write_tile_config(mosaic_ds, outdir='', fixsep=False):
     """Generate and write the tile configuration file.
 
@@ -80,10 +93,10 @@ def write_tile_config(mosaic_ds, outdir='', fixsep=False):
     outdir : str
         The output directory, if empty the input directory is used.
     fixsep : bool
-        Passed on to gen_tile_config().
+        Unused, gen_tile_config() always uses forward slashes as separator.
     """
     log.info('write_tile_config(%i)', mosaic_ds.supplement['index'])
-    config = gen_tile_config(mosaic_ds, fixsep)
+    config = gen_tile_config(mosaic_ds)
     # TODO: add some padding mechanism to the experiment/dataset classes
     # fname = 'mosaic_%0*i.txt' % (len(str(len(mosaic_ds))))
     fname = 'mosaic_%s.txt' % mosaic_ds.supplement['index']
@@ -94,19 +107,27 @@ def write_tile_config(mosaic_ds, outdir='', fixsep=False):
     out = open(fname, 'w')
     out.writelines(config)
     out.close()
+    metrics.count('imagej.files_written')
     log.warn('Wrote tile config to %s', out.name)
 
 
 def write_all_tile_configs(experiment, outdir='', fixsep=False):
     """Wrapper to generate all TileConfiguration.txt files.
 
-    All arguments are directly passed on to write_tile_config().
+    The mosaics are processed one by one in the order they are provided, so
+    besides a MosaicExperiment any iterable of mosaics can be passed in. When
+    using a generator like FluoView3kMosaic.iter_mosaics(), each configuration
+    is written as soon as the corresponding mosaic has been parsed.
+
+    All other arguments are directly passed on to write_tile_config().
     """
     for mosaic_ds in experiment:
         write_tile_config(mosaic_ds, outdir, fixsep)
 
 
-def gen_stitching_macro_code(experiment, pfx, path='', tplpath='', opts={}):
+@metrics.timed('imagej.gen_stitching_macro_code')
+def gen_stitching_macro_code(experiment, pfx, path='', tplpath='', opts={},
+                             mosaics=None):
     """Generate code in ImageJ's macro language to stitch the mosaics.
 
     Take two template files ("head" and "body") and generate an ImageJ
@@ -131,6 +152,10 @@ def gen_stitching_macro_code(experiment, pfx, path='', tplpath='', opts={}):
         and body to override the macro's default settings.
         NOTE: the values are placed literally in the macro code, this means
         that strings have to be quoted, e.g. opts['foo'] = '"bar baz"'
+    mosaics : list(volpy.dataset.MosaicData) (optional)
+        The mosaics to be stitched by this macro (identified by the names of
+        their tile configuration files). If omitted, the macro stitches all
+        tile configurations found in the input directory.
 
     Returns
     -------
@@ -166,10 +191,16 @@ def gen_stitching_macro_code(experiment, pfx, path='', tplpath='', opts={}):
     ijm.append('use_batch_mode = true;\n')
     for option, value in opts.items():
         ijm.append('%s = %s;\n' % (option, value))
+    if mosaics is not None:
+        names = ['"mosaic_%s.txt"' % mosaic_ds.supplement['index']
+                 for mosaic_ds in mosaics]
+        ijm.append('tileconfig_list = newArray(%s);\n' % ', '.join(names))
+    else:
+        mosaics = experiment
 
     # If the overlap is below a certain level (5 percent), we disable
     # computing the actual positions and subpixel accuracy:
-    if experiment[0].get_overlap('pct') < 5.0:
+    if mosaics[0].get_overlap('pct') < 5.0:
         ijm.append('compute = false;\n')
 
     ijm.append('\n')
@@ -178,6 +209,40 @@ def gen_stitching_macro_code(experiment, pfx, path='', tplpath='', opts={}):
     return ijm
 
 
+def gen_stitching_macro_shards(experiment, pfx, shards=None, path='',
+                               tplpath='', opts={}):
+    """Generate separate stitching macros for shards of the mosaics.
+
+    The mosaics are distributed round-robin over the shards, each shard is
+    stitched by its own macro (see gen_stitching_macro_code), so the macros
+    can be run in parallel (e.g. by fiji.run_macros). The macros write their
+    logs to separate files, suffixed with the shard number.
+
+    Parameters
+    ----------
+    experiment : volpy.experiment.MosaicExperiment
+    pfx : str
+    shards : int (optional)
+        The number of shards, by default one macro per mosaic is generated.
+    path, tplpath, opts : see gen_stitching_macro_code
+
+    Returns
+    -------
+    macros : list(list(str))
+        The code of each macro (one str per line).
+    """
+    shards = min(shards or len(experiment), len(experiment))
+    macros = list()
+    for shard in range(shards):
+        shard_opts = dict(opts)
+        shard_opts['log_suffix'] = '"_shard_%s"' % shard
+        macros.append(gen_stitching_macro_code(
+            experiment, pfx, path, tplpath, shard_opts,
+            mosaics=experiment[shard::shards]))
+    log.info('Generated %s stitching macros.', len(macros))
+    return macros
+
+
 def write_stitching_macro(code, fname, dname):
     """Write generated macro code into a file.
 
@@ -189,9 +254,43 @@ def write_stitching_macro(code, fname, dname):
         The desired output filename.
     dname : str
         The output directory.
+
+    Returns
+    -------
+    fname : str
+        The full path of the written file.
     """
     fname = join(dname, fname)
     log.debug('Writing macro to output directory: "%s".', fname)
     with open(fname, 'w') as out:
         out.writelines(code)
         log.warn('Wrote macro template to "%s".', out.name)
+    metrics.count('imagej.files_written')
+    return fname
+
+
+def write_stitching_macros(macros, fname, dname):
+    """Write a list of generated macros (e.g. shards) into separate files.
+
+    The files are named after 'fname' with the (zero-padded) number of the
+    macro appended, e.g. "stitch_all_03.ijm".
+
+    Parameters
+    ----------
+    macros : list(list(str))
+        The code of each macro, see gen_stitching_macro_shards().
+    fname : str
+        The desired output filename (before numbering).
+    dname : str
+        The output directory.
+
+    Returns
+    -------
+    fnames : list(str)
+        The full paths of the written files.
+    """
+    base, ext = splitext(fname)
+    width = len(str(len(macros) - 1))
+    return [write_stitching_macro(code, '%s_%0*i%s' % (base, width, i, ext),
+                                  dname)
+            for i, code in enumerate(macros)]
@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+"""Streaming reader for (UTF-16 encoded) INI files of the Olympus formats.
+
+The metadata files of OIF / OIB datasets can be rather large, although only a
+few of their sections are required for parsing the dimensions. The reader
+decodes the file incrementally, keeps only the lines of the requested sections
+and stops reading as soon as all of them have been found. The collected lines
+are then handed over to a regular ConfigParser object, so the result behaves
+exactly like a parser set up from the full file (for those sections).
+
+Example
+-------
+>>> with open('tile.oif', 'rb') as fin:
+...     parser = read_ini_sections(fin, [u'Reference Image Parameter'])
+>>> parser.get(u'Reference Image Parameter', u'ImageWidth')
+"""
+
+import codecs
+import ConfigParser
+from io import StringIO
+
+from log import log
+
+
+SECTCRE = ConfigParser.RawConfigParser.SECTCRE
+
+
+def read_ini_sections(fileobj, sections=None, encoding='utf16',
+                      chunk_size=65536):
+    """Read the requested sections of an INI file into a ConfigParser object.
+
+    Parameters
+    ----------
+    fileobj : file-like
+        The (binary) INI file object, read from its current position.
+    sections : list(str), optional
+        The names of the sections to read, all sections are read if omitted.
+    encoding : str
+        The encoding of the file.
+    chunk_size : int
+        The number of bytes to read and decode at once.
+
+    Returns
+    -------
+    parser : ConfigParser.RawConfigParser
+        The parser containing (at most) the requested sections, a section not
+        present in the file results in a NoSectionError on access.
+    """
+    pending = set(sections or [])
+    decoder = codecs.getincrementaldecoder(encoding)()
+    collected = list()
+    keep = False
+    tail = u''
+    done = False
+    while not done:
+        chunk = fileobj.read(chunk_size)
+        text = tail + decoder.decode(chunk, final=not chunk)
+        lines = text.splitlines(True)
+        # the last line might be incomplete, hold it back until the next chunk:
+        tail = lines.pop() if chunk and lines else u''
+        for line in lines:
+            match = SECTCRE.match(line)
+            if match:
+                if sections and not pending:
+                    done = True
+                    break
+                header = match.group('header')
+                keep = sections is None or header in pending
+                pending.discard(header)
+            if keep:
+                collected.append(line)
+        if not chunk:
+            break
+    if pending:
+        log.debug('INI sections not found: %s', sorted(pending))
+    parser = ConfigParser.RawConfigParser()
+    parser.readfp(StringIO(u''.join(collected)))
+    return parser
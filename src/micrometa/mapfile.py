@@ -0,0 +1,166 @@
+#!/usr/bin/python
+
+"""Random access to (large) binary files, memory-mapped where possible."""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import mmap
+except ImportError:  # e.g. in Jython (Fiji)
+    mmap = None
+
+from log import log
+
+try:
+    _buffer = buffer  # pylint: disable=invalid-name
+except NameError:  # Python 3
+    def _buffer(obj, offset, size):
+        """Zero-copy view on a slice of a buffer object."""
+        return memoryview(obj)[offset:offset + size]
+
+
+class MappedFile(object):
+
+    """A read-only binary file, accessed by offset and size.
+
+    The file is memory-mapped if possible, otherwise (e.g. in Jython or if the
+    file can't be mapped) it is accessed through regular seek() and read()
+    calls.
+    """
+
+    def __init__(self, fname):
+        """Open the file.
+
+        Parameters
+        ----------
+        fname : str
+            The full path to the file.
+
+        Instance Variables
+        ------------------
+        fname : str
+        size : int
+            The size of the file in bytes.
+        """
+        self.fname = fname
+        self._file = open(fname, 'rb')
+        self._lock = threading.Lock()
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = None
+        if mmap is not None and self.size > 0:
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError) as err:
+                log.debug('Unable to map file, using buffered reads: %s', err)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def mapped(self):
+        """Check if the file is memory-mapped."""
+        return self._map is not None
+
+    @property
+    def closed(self):
+        """Check if the file has been closed."""
+        return self._file.closed
+
+    def close(self):
+        """Release the memory map and close the file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def read(self, offset, size):
+        """Read 'size' bytes starting at 'offset'."""
+        if self._map is not None:
+            return self._map[offset:offset + size]
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(size)
+
+    def view(self, offset, size):
+        """Get 'size' bytes starting at 'offset', without copying if mapped.
+
+        Returns
+        -------
+        data : buffer, memoryview or str
+            A read-only view on the memory map, a copy if the file isn't
+            mapped. Note that a view keeps the map alive, the file must not be
+            closed explicitly while views are in use.
+        """
+        if self._map is not None:
+            return _buffer(self._map, offset, size)
+        return self.read(offset, size)
+
+
+class HandlePool(object):
+
+    """A bounded pool of open MappedFile objects, shared by file name.
+
+    Handles are acquired by the readers and have to be released again once
+    they are done. Files are kept open for re-use until more than 'max_open'
+    are in the pool, then the least recently used ones are dropped. A dropped
+    handle is closed right away if no reader holds it, otherwise as soon as
+    the last one releases it.
+    """
+
+    def __init__(self, max_open=32):
+        self.max_open = max_open
+        self._handles = OrderedDict()
+        self._users = dict()
+        self._lock = threading.Lock()
+
+    def acquire(self, fname):
+        """Get the open handle of a file, opening it if necessary."""
+        with self._lock:
+            handle = self._handles.pop(fname, None)
+            if handle is None:
+                handle = MappedFile(fname)
+            self._handles[fname] = handle
+            self._users[handle] = self._users.get(handle, 0) + 1
+            while len(self._handles) > self.max_open:
+                self._drop(self._handles.popitem(last=False)[1])
+            return handle
+
+    def release(self, handle):
+        """Release a handle, closing it if it was dropped from the pool."""
+        with self._lock:
+            self._users[handle] -= 1
+            if self._users[handle] == 0:
+                del self._users[handle]
+                if self._handles.get(handle.fname) is not handle:
+                    handle.close()
+
+    @contextmanager
+    def handle(self, fname):
+        """Hold the handle of a file for the duration of a 'with' block."""
+        handle = self.acquire(fname)
+        try:
+            yield handle
+        finally:
+            self.release(handle)
+
+    def clear(self):
+        """Drop all handles from the pool."""
+        with self._lock:
+            while self._handles:
+                self._drop(self._handles.popitem()[1])
+
+    def _drop(self, handle):
+        """Close a handle dropped from the pool unless a reader holds it."""
+        if handle not in self._users:
+            handle.close()
+
+
+# the pool shared by all readers of this package:
+HANDLES = HandlePool()
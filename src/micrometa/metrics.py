@@ -0,0 +1,202 @@
+#!/usr/bin/python
+
+"""Lightweight instrumentation of the parsing and generation phases.
+
+The modules of this package report timing spans (e.g. validating the project
+XML, decoding an INI file, scanning an OIR file) and counters (e.g. files
+opened, bytes scanned, cache hits) through this module. The events are passed
+on to the registered sinks, any callable taking (kind, name, value):
+
+- kind 'span': 'value' is the duration in seconds
+- kind 'count': 'value' is the increment
+
+Without any sink registered, span() returns a shared no-op context manager
+and count() returns right away, so the instrumentation costs one function
+call per event. Note that events occurring in the workers of a 'process'
+executor are not reported, as the sinks live in the parent process.
+
+Sinks providing a report() method (like the Recorder) are asked to report
+their summary at the end of add_mosaics() of the experiments (see report()).
+
+Example
+-------
+>>> recorder = metrics.Recorder()
+>>> metrics.add_sink(recorder)
+>>> mosaic = fluoview.FluoViewMosaic('MATL_Mosaic.log')
+>>> recorder.counters['dataset.files_opened']
+>>> recorder.spans['fluoview.validate_xml']  # [calls, seconds]
+>>> metrics.remove_sink(recorder)
+"""
+
+import functools
+import threading
+import time
+
+from log import log
+
+
+# the registered sinks, see add_sink():
+SINKS = []
+
+
+class NullSpan(object):
+
+    """The (shared) span used while no sink is registered."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span(object):
+
+    """Context manager measuring the wall time of a phase."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        emit('span', self.name, time.time() - self.start)
+        return False
+
+
+def add_sink(sink):
+    """Register a callable receiving the events as (kind, name, value)."""
+    if sink not in SINKS:
+        SINKS.append(sink)
+
+
+def remove_sink(sink):
+    """Unregister a sink (if it was registered)."""
+    if sink in SINKS:
+        SINKS.remove(sink)
+
+
+def emit(kind, name, value):
+    """Pass an event on to all registered sinks."""
+    for sink in SINKS:
+        sink(kind, name, value)
+
+
+def span(name):
+    """Measure the time spent in a 'with' block.
+
+    Parameters
+    ----------
+    name : str
+        The name of the phase, prefixed with the module (e.g. 'dataset.ini').
+
+    Returns
+    -------
+    span : Span or NullSpan
+    """
+    if not SINKS:
+        return NULL_SPAN
+    return Span(name)
+
+
+def timed(name):
+    """Decorator measuring each call of a function as a span.
+
+    Example
+    -------
+    >>> @metrics.timed('imagej.gen_tile_config')
+    ... def gen_tile_config(mosaic_ds):
+    ...     pass
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not SINKS:
+                return func(*args, **kwargs)
+            with Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """Increment a counter by 'value'."""
+    if not SINKS:
+        return
+    emit('count', name, value)
+
+
+def report(title):
+    """Ask all sinks providing a report() method to report their summary."""
+    for sink in SINKS:
+        if hasattr(sink, 'report'):
+            sink.report(title)
+
+
+class Recorder(object):
+
+    """A sink accumulating all spans and counters (thread-safe)."""
+
+    def __init__(self):
+        """Set up an empty recorder.
+
+        Instance Variables
+        ------------------
+        spans : dict(str: [int, float])
+            The number of calls and the total time in seconds per span.
+        counters : dict(str: int)
+            The value of each counter.
+        """
+        self.spans = dict()
+        self.counters = dict()
+        self._lock = threading.Lock()
+
+    def __call__(self, kind, name, value):
+        with self._lock:
+            if kind == 'span':
+                stats = self.spans.setdefault(name, [0, 0.0])
+                stats[0] += 1
+                stats[1] += value
+            else:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        """Discard all spans and counters recorded so far."""
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def summary(self):
+        """Format the recorded spans and counters.
+
+        Returns
+        -------
+        lines : list(str)
+            The spans (sorted by their total time) followed by the counters.
+        """
+        with self._lock:
+            spans = sorted(self.spans.items(), key=lambda item: -item[1][1])
+            counters = sorted(self.counters.items())
+        lines = ['%-32s %8s %10s %10s' % ('span', 'calls', 'total [s]',
+                                          'mean [ms]')]
+        for name, (calls, total) in spans:
+            lines.append('%-32s %8i %10.3f %10.3f' %
+                         (name, calls, total, 1000.0 * total / calls))
+        lines.append('%-32s %8s' % ('counter', 'value'))
+        for name, value in counters:
+            lines.append('%-32s %8i' % (name, value))
+        return lines
+
+    def report(self, title):
+        """Log the summary of the recorded spans and counters."""
+        log.warn('%s:\n%s', title, '\n'.join(self.summary()))
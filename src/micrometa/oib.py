@@ -0,0 +1,317 @@
+#!/usr/bin/python
+
+"""Indexed access to the streams of Olympus OIB files.
+
+An OIB file is an OLE2 compound document (the format of the old MS Office
+files), containing the files of an OIF dataset (metadata and TIFF planes) as
+streams. The directory of the container is walked once using the 'olefile'
+package, recording for every stream the extents (offset and size) it occupies
+in the OIB file. The streams are then read directly from these extents through
+a shared pool of (memory-mapped) file handles, without ever opening the OLE
+container again.
+
+The sector tables are not part of the documented API of olefile (see the
+version range pinned in setup.py). If an olefile version lacks them, the
+streams are not indexed and every read falls back to olefile's openstream().
+
+Example
+-------
+>>> oib = OIBContainer('tile.oib')
+>>> info = oib.open('OibInfo.txt')
+>>> data = oib.view('Storage00001/Stream00001')
+"""
+
+import io
+from collections import namedtuple
+
+import olefile
+
+from log import log
+from .mapfile import HANDLES
+
+
+class OIBStream(namedtuple('OIBStream', ['name', 'size', 'extents'])):
+
+    """A stream of an OIB file.
+
+    Attributes
+    ----------
+    name : unicode
+        The path of the stream inside the container, e.g. 'OibInfo.txt' or
+        'Storage00001/Stream00001'.
+    size : int
+        The size of the stream in bytes.
+    extents : tuple((int, int)) or None
+        The (offset, size) pairs of the file regions making up the stream,
+        None if they are unknown (the stream is read using olefile).
+    """
+
+    __slots__ = ()
+
+
+# the (undocumented) attributes of olefile.OleFileIO used for indexing:
+SECTOR_TABLES = ('fat', 'minifat', 'loadminifat', 'sectorsize',
+                 'minisectorsize', 'minisectorcutoff')
+
+
+def has_sector_tables(ole):
+    """Check if an olefile.OleFileIO object exposes its sector tables."""
+    return (all(hasattr(ole, attr) for attr in SECTOR_TABLES) and
+            hasattr(ole.root, 'isectStart'))
+
+
+def sector_chain(fat, start):
+    """Follow a chain of sectors through a (mini) FAT.
+
+    Returns
+    -------
+    sects : list(int)
+        The sector numbers of the chain, in order.
+    """
+    sects = list()
+    sect = start
+    while sect <= olefile.MAXREGSECT:
+        if sect >= len(fat) or len(sects) > len(fat):
+            raise IOError('Broken sector chain (starting at %s)!' % start)
+        sects.append(sect)
+        sect = fat[sect]
+    return sects
+
+
+def read_extents(handle, extents, offset, size):
+    """Read a range of bytes of a stream made up of the given extents."""
+    chunks = list()
+    for ext_offset, ext_size in extents:
+        if size <= 0:
+            break
+        if offset >= ext_size:
+            offset -= ext_size
+            continue
+        chunk = handle.read(ext_offset + offset, min(ext_size - offset, size))
+        chunks.append(chunk)
+        size -= len(chunk)
+        offset = 0
+    return ''.join(chunks)
+
+
+def merge_extents(offsets, unit, size):
+    """Merge consecutive (sector) offsets into a tuple of extents.
+
+    Parameters
+    ----------
+    offsets : list(int)
+        The file offsets of the sectors of a stream, in stream order.
+    unit : int
+        The sector size.
+    size : int
+        The size of the stream, the last extent is truncated accordingly.
+    """
+    extents = list()
+    for offset in offsets:
+        if extents and extents[-1][0] + extents[-1][1] == offset:
+            extents[-1][1] += unit
+        else:
+            extents.append([offset, unit])
+    remaining = size
+    merged = list()
+    for offset, length in extents:
+        if remaining <= 0:
+            break
+        merged.append((offset, min(length, remaining)))
+        remaining -= length
+    return tuple(merged)
+
+
+class OIBContainer(object):
+
+    """Random access to the streams of an OIB file."""
+
+    def __init__(self, fname, pool=None):
+        """Index the streams of the OIB file.
+
+        Parameters
+        ----------
+        fname : str
+            The full path to the .OIB file.
+        pool : mapfile.HandlePool, optional
+            The pool providing the file handles for reading, by default the
+            pool shared by the whole package (mapfile.HANDLES) is used.
+
+        Instance Variables
+        ------------------
+        fname : str
+        streams : dict(unicode: OIBStream)
+            The streams of the container, by their lower-cased name (stream
+            names are matched case-insensitively, like olefile does).
+        """
+        self.fname = fname
+        self.pool = pool or HANDLES
+        self.streams = self.index()
+
+    def __getstate__(self):
+        """Pickle everything but the pool (which holds locks and handles)."""
+        state = self.__dict__.copy()
+        state['pool'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.pool = HANDLES
+
+    def index(self):
+        """Walk the OLE directory and determine the extents of all streams.
+
+        Returns
+        -------
+        streams : dict(unicode: OIBStream)
+        """
+        # keep the names as unicode instead of encoding them (Python 2):
+        ole = olefile.OleFileIO(self.fname, path_encoding=None)
+        try:
+            indexed = has_sector_tables(ole)
+            if not indexed:
+                log.warn('olefile %s lacks the sector tables, reading the '
+                         'streams of %s without an index.',
+                         getattr(olefile, '__version__', '(unknown)'),
+                         self.fname)
+            ministream = None
+            streams = dict()
+            pending = [(u'', kid) for kid in ole.root.kids]
+            while pending:
+                prefix, entry = pending.pop()
+                name = prefix + entry.name
+                if entry.entry_type == olefile.STGTY_STORAGE:
+                    pending.extend((name + u'/', kid) for kid in entry.kids)
+                    continue
+                if entry.entry_type != olefile.STGTY_STREAM:
+                    continue
+                if entry.size == 0:
+                    streams[name.lower()] = OIBStream(name, 0, ())
+                    continue
+                if not indexed:
+                    streams[name.lower()] = OIBStream(name, entry.size, None)
+                    continue
+                fat = ole.fat
+                sectorsize = ole.sectorsize
+                if entry.size >= ole.minisectorcutoff:
+                    offsets = [(sect + 1) * sectorsize
+                               for sect in sector_chain(fat, entry.isectStart)]
+                    unit = sectorsize
+                else:
+                    if ministream is None:
+                        if ole.minifat is None:
+                            ole.loadminifat()
+                        ministream = sector_chain(fat, ole.root.isectStart)
+                    unit = ole.minisectorsize
+                    offsets = list()
+                    for sect in sector_chain(ole.minifat, entry.isectStart):
+                        pos = sect * unit
+                        offsets.append((ministream[pos // sectorsize] + 1) *
+                                       sectorsize + pos % sectorsize)
+                extents = merge_extents(offsets, unit, entry.size)
+                streams[name.lower()] = OIBStream(name, entry.size, extents)
+        finally:
+            ole.close()
+        log.debug('Indexed %s streams of %s', len(streams), self.fname)
+        return streams
+
+    def handle(self):
+        """Hold the (pooled) file handle used for reading, see HandlePool."""
+        return self.pool.handle(self.fname)
+
+    def stream(self, name):
+        """Look up a stream by name, raising an IOError if it doesn't exist.
+
+        The name is matched case-insensitively, as different versions of
+        FluoView don't agree on the case of the stream names.
+        """
+        try:
+            return self.streams[name.lower()]
+        except KeyError:
+            raise IOError("Stream '%s' not found in %s" % (name, self.fname))
+
+    def read_ole(self, name):
+        """Read the contents of a stream through olefile (not indexed)."""
+        ole = olefile.OleFileIO(self.fname, path_encoding=None)
+        try:
+            return ole.openstream(self.stream(name).name).read()
+        finally:
+            ole.close()
+
+    def read(self, name):
+        """Read the contents of a stream."""
+        extents = self.stream(name).extents
+        if extents is None:
+            return self.read_ole(name)
+        with self.handle() as handle:
+            return ''.join(handle.read(offset, size)
+                           for offset, size in extents)
+
+    def read_at(self, name, offset, size):
+        """Read 'size' bytes starting at 'offset' of a stream."""
+        extents = self.stream(name).extents
+        if extents is None:
+            return self.read_ole(name)[offset:offset + size]
+        with self.handle() as handle:
+            return read_extents(handle, extents, offset, size)
+
+    def view(self, name):
+        """Get the contents of a stream, without copying if possible.
+
+        Streams stored in a single extent of a memory-mapped file are returned
+        as a read-only view on the file (see MappedFile.view), all others are
+        read into memory. Note that a view is only valid as long as the file
+        is kept open by the pool (or by a reader holding it).
+        """
+        extents = self.stream(name).extents
+        if extents is not None and len(extents) == 1:
+            with self.handle() as handle:
+                return handle.view(*extents[0])
+        return self.read(name)
+
+    def open(self, name):
+        """Open a stream as a (read-only) file-like object.
+
+        The reader holds the file handle until it is closed, use it as a
+        context manager to make sure it is released:
+
+        >>> with oib.open('OibInfo.txt') as stream:
+        ...     data = stream.read()
+        """
+        stream = self.stream(name)
+        if stream.extents is None:
+            return io.BytesIO(self.read_ole(name))
+        return StreamReader(self.pool, self.pool.acquire(self.fname), stream)
+
+
+class StreamReader(object):
+
+    """A file-like object reading a stream extent by extent."""
+
+    def __init__(self, pool, handle, stream):
+        self._pool = pool
+        self._handle = handle
+        self._stream = stream
+        self._pos = 0
+
+    def read(self, size=-1):
+        """Read up to 'size' bytes (or everything left) from the stream."""
+        remaining = self._stream.size - self._pos
+        if size < 0 or size > remaining:
+            size = remaining
+        data = read_extents(self._handle, self._stream.extents, self._pos,
+                            size)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        """Release the file handle back to the pool."""
+        if self._handle is not None:
+            self._pool.release(self._handle)
+            self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,243 @@
+#!/usr/bin/python
+
+"""Helpers to access the block structure of Olympus OIR files.
+
+An OIR file is a container holding the raw pixel data together with a number
+of metadata blocks. Each metadata block is an XML document, stored with its
+length (little-endian 32 bit integer) directly in front of the XML declaration.
+The pixel data in between the XML blocks is not interpreted here, it is
+treated as opaque 'data' blocks: their length is not known, so they are
+searched for the next XML declaration (see OIRContainer.index).
+"""
+
+import re
+import string    # bug #2481 pylint: disable=deprecated-module
+import struct
+from collections import namedtuple
+
+from log import log
+from . import metrics
+from .mapfile import MappedFile
+
+
+OIR_MAGIC = 'OLYMPUSRAWFORMAT'
+XML_DECL = '<?xml'
+PRINTABLE_RUN = re.compile('[%s]*' % re.escape(string.printable))
+XML_ROOT = re.compile(r'<\?xml[^>]*\?>\s*<([^\s/>]+)')
+# the maximum number of bytes (e.g. padding) in between adjacent XML blocks:
+HEADER_SLACK = 16
+
+
+class OIRBlock(namedtuple('OIRBlock', ['offset', 'size', 'type'])):
+
+    """A block of an OIR file.
+
+    Attributes
+    ----------
+    offset : int
+        Position of the first byte of the block in the file.
+    size : int
+        Size of the block in bytes (including the length prefix for XML).
+    type : str
+        The root tag of an XML block (e.g. 'lsmframe:frameProperties') or
+        'data' for the (pixel) data in between the XML blocks.
+    """
+
+    __slots__ = ()
+
+
+class OIRContainer(MappedFile):
+
+    """Random access to the blocks of an OIR file.
+
+    The file is memory-mapped if possible, otherwise (e.g. in Jython or if the
+    file can't be mapped) it is accessed through regular seek() and read()
+    calls, using chunks of a given size when searching (see MappedFile).
+
+    Example
+    -------
+    >>> with OIRContainer('tile.oir') as oir:
+    ...     blocks = oir.index()
+    ...     xml = [oir.read_xml(b) for b in blocks if b.type != 'data']
+    """
+
+    def __init__(self, fname, chunk_size=1048576):
+        """Open the OIR file.
+
+        Parameters
+        ----------
+        fname : str
+            The full path to the .OIR file.
+        chunk_size : int
+            The chunk size used for searching if the file isn't mapped.
+        """
+        super(OIRContainer, self).__init__(fname)
+        self.chunk_size = chunk_size
+        if self.read(0, len(OIR_MAGIC)) != OIR_MAGIC:
+            log.warn('WARNING: %s has no OIR signature!', fname)
+
+    def find(self, sub, start=0):
+        """Find the first position of 'sub' at or after 'start' (or -1)."""
+        if self._map is not None:
+            return self._map.find(sub, start)
+        # chunks have to overlap in case 'sub' crosses a chunk boundary:
+        overlap = len(sub) - 1
+        while start < self.size:
+            chunk = self.read(start, self.chunk_size)
+            metrics.count('oir.chunks_read')
+            pos = chunk.find(sub)
+            if pos > -1:
+                return start + pos
+            if len(chunk) < self.chunk_size:
+                break
+            start += len(chunk) - overlap
+        return -1
+
+    def printable_end(self, pos, step=4096):
+        """Find the end of the printable chars sequence starting at 'pos'."""
+        while pos < self.size:
+            chunk = self.read(pos, step)
+            length = PRINTABLE_RUN.match(chunk).end()
+            pos += length
+            if length < len(chunk):
+                break
+        return pos
+
+    def xml_block_at(self, pos, lower=0, min_len=100):
+        """Determine the XML block whose declaration is located at 'pos'.
+
+        The extent of the block is taken from its length prefix. If there is
+        no valid prefix, the block is assumed to end with the last '>' of the
+        sequence of printable chars starting at 'pos'.
+
+        Parameters
+        ----------
+        pos : int
+            The position of the XML declaration.
+        lower : int
+            The lowest position that may belong to the block (i.e. the end of
+            the previous block).
+        min_len : int
+            Minimum length of the XML to be accepted as a block.
+
+        Returns
+        -------
+        block : OIRBlock or None
+            None if the XML is too short or runs up to the end of the file.
+        """
+        offset = pos
+        length = 0
+        if pos - 4 >= lower:
+            length = struct.unpack('<I', self.read(pos - 4, 4))[0]
+            if (length < len(XML_DECL) or pos + length > self.size or
+                    self.read(pos + length - 1, 1) != '>'):
+                length = 0
+            else:
+                offset = pos - 4
+        if not length:
+            end = self.printable_end(pos)
+            if end == self.size:
+                return None
+            length = self.read(pos, end - pos).rfind('>') + 1
+        if length < min_len:
+            return None
+        match = XML_ROOT.match(self.read(pos, 1024))
+        btype = match.group(1) if match else 'xml'
+        return OIRBlock(offset, pos + length - offset, btype)
+
+    def next_header(self, pos):
+        """Locate an XML block starting right at (or shortly after) 'pos'.
+
+        Returns
+        -------
+        decl : int
+            The position of the XML declaration of the block, if it follows
+            its length prefix within HEADER_SLACK bytes after 'pos', else -1.
+        """
+        head = self.read(pos, 4 + HEADER_SLACK + len(XML_DECL))
+        found = head.find(XML_DECL, 4)
+        return -1 if found < 0 else pos + found
+
+    def index(self, tags=None, min_len=100):
+        """Build an index of the blocks in this file.
+
+        Adjacent XML blocks are walked using their length prefixes (see
+        next_header). The (pixel) data in between them is NOT skipped by a
+        header though, as the layout of the pixel blocks is not known: it is
+        searched for the next XML declaration, so building the index is still
+        a linear scan over all bytes up to the last XML block required. This
+        is a fast search of the raw buffer (see find), not a parse of the
+        pixel data, and it is only done once per file as the index is kept
+        (see ImageDataOIR.blocks). A declaration found by the search is only
+        accepted with a valid length prefix, so bytes in the pixel data that
+        happen to read '<?xml' are skipped.
+
+        If some of the requested tags can't be found this way (e.g. in files
+        whose blocks lack the length prefix), the file is scanned again,
+        accepting any sequence of printable chars starting with an XML
+        declaration as a block (see xml_block_at).
+
+        Parameters
+        ----------
+        tags : list(str), optional
+            If given, stop once an XML block for each of the tags was found.
+        min_len : int
+            Minimum length of the XML to be accepted as a block.
+
+        Returns
+        -------
+        blocks : list(OIRBlock)
+            The blocks in the order of their appearance in the file, covering
+            the file up to the end of the last block examined.
+        """
+        blocks, pending = self.walk(tags, min_len, prefixed=True)
+        if pending:
+            log.debug('XML blocks %s not found by their length prefixes, '
+                      'scanning for printable sequences.', sorted(pending))
+            metrics.count('oir.fallback_scans')
+            blocks, pending = self.walk(tags, min_len, prefixed=False)
+        return blocks
+
+    def walk(self, tags=None, min_len=100, prefixed=True):
+        """Walk the blocks of this file, see index() for details.
+
+        Parameters
+        ----------
+        tags : list(str), optional
+        min_len : int
+        prefixed : bool, optional
+            Whether XML blocks are only accepted with a valid length prefix.
+
+        Returns
+        -------
+        (blocks, pending) : (list(OIRBlock), set(str))
+            The blocks and the requested tags that were not found.
+        """
+        blocks = list()
+        pending = set(tags or [])
+        last = 0
+        pos = self.find(XML_DECL)
+        while pos > -1:
+            block = self.xml_block_at(pos, last, min_len)
+            if block is None or (prefixed and block.offset != pos - 4):
+                pos = self.find(XML_DECL, pos + 1)
+                continue
+            if block.offset > last:
+                blocks.append(OIRBlock(last, block.offset - last, 'data'))
+            blocks.append(block)
+            log.debug('OIR block: %s', block)
+            last = block.offset + block.size
+            pending.discard(block.type)
+            if tags and not pending:
+                return blocks, pending
+            pos = self.next_header(last)
+            if pos < 0:
+                pos = self.find(XML_DECL, last)
+        if last < self.size:
+            blocks.append(OIRBlock(last, self.size - last, 'data'))
+        return blocks, pending
+
+    def read_xml(self, block):
+        """Read the XML document of a block (without the length prefix)."""
+        data = self.read(block.offset, block.size)
+        return data[data.find(XML_DECL):data.rfind('>') + 1]
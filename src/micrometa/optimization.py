@@ -0,0 +1,167 @@
+#!/usr/bin/python
+
+"""Global optimization of tile positions from pairwise registration results.
+
+The positions of all tiles of a mosaic are determined at once, such that the
+offsets between registered pairs of tiles (see registration.register_mosaic)
+are matched as well as possible. This is a weighted linear least-squares
+problem (one equation per pair, weighted by its correlation score), with a
+weak prior pulling each tile towards its current position to fix the global
+translation and to keep tiles without (valid) links in place. The normal
+equations are sparse (the weighted graph Laplacian of the tile pairs) and are
+solved by a Jacobi-preconditioned conjugate gradient method, operating on the
+list of pairs only - no matrix is ever assembled.
+
+Links that are inconsistent with the global solution are removed iteratively
+(the worst ones first), as well as links with a low correlation score.
+
+Example
+-------
+>>> shifts = registration.register_mosaic(mosaic)
+>>> optimization.optimize_positions(mosaic, shifts)
+"""
+
+try:
+    import numpy as np
+except ImportError:  # e.g. in Jython (Fiji)
+    np = None
+
+from log import log
+
+
+def solve_positions(prior_pos, first, second, offsets, weights, prior=1e-3,
+                    start=None, tol=1e-6, maxiter=None):
+    """Solve the least-squares problem for the tile positions.
+
+    Minimizes sum(w * |p[second] - p[first] - offset|^2) over the links plus
+    prior * sum(|p - prior_pos|^2) over the tiles.
+
+    Parameters
+    ----------
+    prior_pos : np.ndarray (N, 2)
+        The prior (e.g. nominal) positions of the tiles.
+    first, second : np.ndarray (int, E)
+        The tile indices of the links.
+    offsets : np.ndarray (E, 2)
+        The measured offsets of the links.
+    weights : np.ndarray (E)
+        The weights of the links.
+    prior : float
+        The weight of the prior positions.
+    start : np.ndarray (N, 2), optional
+        The initial solution, by default the prior positions.
+    tol : float
+        The relative tolerance of the residual for stopping the iteration.
+    maxiter : int, optional
+        The maximum number of iterations, by default 10 times the number of
+        tiles.
+
+    Returns
+    -------
+    positions : np.ndarray (N, 2)
+    """
+    num = len(prior_pos)
+
+    def scatter(values):
+        """Accumulate per-link values (E, 2) into their tiles (N, 2)."""
+        return np.column_stack([np.bincount(second, values[:, k], num) -
+                                np.bincount(first, values[:, k], num)
+                                for k in range(2)])
+
+    def apply(pos):
+        """Multiply with the (implicit) normal equations matrix."""
+        return prior * pos + scatter(
+            (pos[second] - pos[first]) * weights[:, None])
+
+    rhs = prior * prior_pos + scatter(offsets * weights[:, None])
+    precond = 1.0 / (prior + np.bincount(first, weights, num) +
+                     np.bincount(second, weights, num))[:, None]
+    pos = prior_pos.copy() if start is None else start.copy()
+    resid = rhs - apply(pos)
+    direction = precond * resid
+    rz_old = (resid * direction).sum(axis=0)
+    limit = tol * np.maximum(np.sqrt((rhs * rhs).sum(axis=0)), 1e-12)
+    i = 0  # in case there is nothing to iterate (no tiles, maxiter=0)
+    for i in range(10 * num if maxiter is None else maxiter):
+        if (np.sqrt((resid * resid).sum(axis=0)) <= limit).all():
+            break
+        a_dir = apply(direction)
+        # the x and y columns are independent problems, each with its own step:
+        alpha = rz_old / np.maximum((direction * a_dir).sum(axis=0), 1e-300)
+        pos += alpha * direction
+        resid -= alpha * a_dir
+        z_new = precond * resid
+        rz_new = (resid * z_new).sum(axis=0)
+        direction = z_new + (rz_new / np.maximum(rz_old, 1e-300)) * direction
+        rz_old = rz_new
+    log.debug('Conjugate gradient finished after %s iterations.', i)
+    return pos
+
+
+def optimize_positions(mosaic_ds, shifts, min_score=0.3, max_residual=2.5,
+                       prior=1e-3, update=True):
+    """Compute globally consistent tile positions from pairwise shifts.
+
+    Parameters
+    ----------
+    mosaic_ds : dataset.MosaicData
+        The mosaic, its tiles' current position['relative'] coordinates serve
+        as the prior positions.
+    shifts : list(registration.PairShift)
+        The pairwise registration results.
+    min_score : float
+        Links with a lower correlation score are ignored.
+    max_residual : float
+        The maximum deviation (in pixels) of a link from the global solution,
+        links exceeding it are removed (the worst ones first) and the
+        positions are re-computed.
+    prior : float
+        The weight of the prior positions relative to the link weights (the
+        correlation scores).
+    update : bool
+        Whether to store the result in the mosaic's tile table, i.e. as the
+        tiles' position['relative'].
+
+    Returns
+    -------
+    positions : np.ndarray (N, 2)
+        The optimized (x, y) positions of the tiles.
+    kept : list(registration.PairShift)
+        The links used for the final solution.
+    """
+    if np is None:
+        raise ImportError('Optimizing tile positions requires numpy!')
+    tiles = mosaic_ds.subvol
+    prior_pos = np.array([tile.position['relative'][:2] for tile in tiles],
+                         dtype=np.float64)
+    first = np.array([shf.first for shf in shifts], dtype=np.intp)
+    second = np.array([shf.second for shf in shifts], dtype=np.intp)
+    offsets = np.array([(shf.dx, shf.dy) for shf in shifts],
+                       dtype=np.float64).reshape((-1, 2))
+    scores = np.array([shf.score for shf in shifts], dtype=np.float64)
+    keep = scores >= min_score
+    log.info('Optimizing %s tile positions, using %s of %s links.',
+             len(tiles), keep.sum(), len(shifts))
+    positions = prior_pos
+    while True:
+        positions = solve_positions(prior_pos, first[keep], second[keep],
+                                    offsets[keep], scores[keep], prior,
+                                    start=positions)
+        resid = np.zeros(len(shifts))
+        resid[keep] = np.sqrt((
+            (positions[second[keep]] - positions[first[keep]] -
+             offsets[keep]) ** 2).sum(axis=1))
+        worst = resid.max() if len(resid) else 0
+        if worst <= max_residual:
+            break
+        # removing the worst link can resolve the deviations of others that
+        # were caused by it, so only drop the links close to the worst one:
+        drop = resid > max(max_residual, 0.5 * worst)
+        log.debug('Removing %s inconsistent links (max residual %.1f px).',
+                  drop.sum(), worst)
+        keep &= ~drop
+    log.info('Final solution uses %s links, max residual %.2f px.',
+             keep.sum(), worst)
+    if update:
+        mosaic_ds.tile_table().rows['relative'][:, :2] = positions
+    return positions, [shf for shf, kept in zip(shifts, keep) if kept]
@@ -0,0 +1,179 @@
+#!/usr/bin/python
+
+"""Helpers to run parsing tasks concurrently.
+
+The executors are provided by the 'concurrent.futures' package, which is part
+of the standard library in Python 3 and available as the 'futures' backport for
+Python 2. If it can't be imported (e.g. in Jython), all tasks are run serially
+by a SerialExecutor, which mimics the subset of the executor interface used in
+this package. The package (which imports multiprocessing) is only imported
+once a thread or process pool is requested.
+"""
+
+from collections import deque
+
+from log import log
+
+
+def import_futures():
+    """Import 'concurrent.futures' on first use, None if unavailable."""
+    try:
+        from concurrent import futures
+    except ImportError:  # Python 2 without the 'futures' backport, Jython
+        futures = None
+    return futures
+
+
+class DeferredFuture(object):
+
+    """A future that runs its task (in the calling thread) on first access."""
+
+    def __init__(self, func, *args, **kwargs):
+        self._task = (func, args, kwargs)
+        self._result = None
+        self._exception = None
+        self._state = 'pending'
+
+    def _run(self):
+        """Run the task unless it was run or cancelled before."""
+        if self._state != 'pending':
+            return
+        func, args, kwargs = self._task
+        try:
+            self._result = func(*args, **kwargs)
+        except Exception as err:  # pylint: disable=broad-except
+            self._exception = err
+        self._state = 'finished'
+
+    def cancel(self):
+        """Cancel the task, possible as long as it wasn't run yet."""
+        if self._state == 'pending':
+            self._state = 'cancelled'
+        return self._state == 'cancelled'
+
+    def cancelled(self):
+        """Check if the task was cancelled."""
+        return self._state == 'cancelled'
+
+    def exception(self):
+        """Run the task (if necessary) and return the exception it raised."""
+        self._run()
+        return self._exception
+
+    def result(self):
+        """Run the task (if necessary) and return its result."""
+        self._run()
+        if self._state == 'cancelled':
+            raise RuntimeError('Task was cancelled.')
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+class SerialExecutor(object):
+
+    """Executor running the submitted tasks lazily in the calling thread."""
+
+    @staticmethod
+    def submit(func, *args, **kwargs):
+        """Schedule a task, it is run once its result is requested."""
+        return DeferredFuture(func, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        """Nothing to clean up for serial execution."""
+        pass
+
+
+def get_executor(kind=None, max_workers=None):
+    """Set up an executor for running tasks concurrently.
+
+    Parameters
+    ----------
+    kind : str, optional
+        One of 'serial' (the default), 'thread' or 'process'. Falls back to
+        'serial' if 'concurrent.futures' is unavailable.
+    max_workers : int, optional
+        The maximum number of workers, passed on to the executor.
+
+    Returns
+    -------
+    executor : concurrent.futures.Executor or SerialExecutor
+    """
+    kinds_allowed = (None, 'serial', 'thread', 'process')
+    if kind not in kinds_allowed:
+        raise TypeError('Unknown executor type: %s' % kind)
+    if kind in (None, 'serial'):
+        return SerialExecutor()
+    futures = import_futures()
+    if futures is None:
+        log.warn('WARNING: concurrent.futures unavailable, running serially!')
+        return SerialExecutor()
+    log.debug('Using a %s pool executor (max workers: %s).', kind, max_workers)
+    if kind == 'thread':
+        # the thread pool of Python 2 (backport) requires max_workers:
+        return futures.ThreadPoolExecutor(max_workers or 4)
+    return futures.ProcessPoolExecutor(max_workers)
+
+
+def submit_ahead(items, submit, limit):
+    """Submit tasks for a stream of items, keeping a bounded number pending.
+
+    Items are taken from the (possibly lazy) iterable and passed to 'submit'
+    until 'limit' of them are pending, only then the oldest one is handed
+    back to the caller, so the tasks of the next items can already run while
+    the results of the current one are collected.
+
+    Parameters
+    ----------
+    items : iterable
+    submit : callable
+        Called with each item, submitting its task(s) to an executor.
+    limit : int
+        The maximum number of items submitted ahead of the current one.
+
+    Yields
+    ------
+    (item, submitted) : (object, object)
+        Each item and the value returned by 'submit' for it, in order.
+    """
+    pending = deque()
+    for item in items:
+        pending.append((item, submit(item)))
+        if len(pending) > limit:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def wait_all(fs):
+    """Wait for a list of futures to finish, stopping at the first failure.
+
+    If one of the futures raises an exception, all of the remaining ones are
+    cancelled (as far as they haven't started yet).
+
+    Parameters
+    ----------
+    fs : list(concurrent.futures.Future) or list(DeferredFuture)
+
+    Returns
+    -------
+    failed : int or None
+        The index of the future that failed, None if all succeeded.
+    """
+    if fs and isinstance(fs[0], DeferredFuture):
+        # deferred futures are run one after another, in order:
+        for i, fut in enumerate(fs):
+            if fut.exception() is not None:
+                for remaining in fs[i + 1:]:
+                    remaining.cancel()
+                return i
+        return None
+    futures = import_futures()
+    done, not_done = futures.wait(fs, return_when=futures.FIRST_EXCEPTION)
+    failed = [i for i, fut in enumerate(fs)
+              if fut in done and fut.exception() is not None]
+    if not failed:
+        return None
+    for fut in not_done:
+        fut.cancel()
+    return failed[0]
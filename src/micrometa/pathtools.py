@@ -3,27 +3,129 @@
 """Helper functions to work with filenames."""
 
 import platform
+import threading
 from os import sep
 import os.path
 
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
 
-def parse_path(path):
+
+class ParsedPath(object):
+
+    """The (immutable) components of a path, see parse_path().
+
+    A read-only mapping from the names of the components to their values,
+    i.e. it can be used like the dict formerly returned by parse_path()
+    (e.g. parsed['fname'], 'ext' in parsed, dict(parsed)), except for item
+    assignment. The components can be accessed as attributes as well. Use
+    _replace() to derive a modified copy, e.g. parsed._replace(type='tree').
+    """
+
+    _fields = ('orig', 'full', 'path', 'dname', 'fname', 'ext', 'type')
+    __slots__ = _fields
+
+    def __init__(self, orig, full, path, dname, fname, ext, type=None):
+        # pylint: disable=too-many-arguments,redefined-builtin
+        values = (orig, full, path, dname, fname, ext, type)
+        for key, value in zip(self._fields, values):
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("'ParsedPath' object is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("'ParsedPath' object is immutable")
+
+    def __reduce__(self):
+        return (ParsedPath, tuple(self.values()))
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        if isinstance(other, (ParsedPath, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __hash__(self):
+        return hash(tuple(self.values()))
+
+    def __repr__(self):
+        return 'ParsedPath(%s)' % ', '.join('%s=%r' % item
+                                            for item in self.items())
+
+    def get(self, key, default=None):
+        """Like dict.get()."""
+        if key not in self._fields:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        """The names of the components, like dict.keys()."""
+        return list(self._fields)
+
+    def values(self):
+        """The values of the components (in the order of keys())."""
+        return [getattr(self, key) for key in self._fields]
+
+    def items(self):
+        """The (name, value) pairs of the components, like dict.items()."""
+        return list(zip(self._fields, self.values()))
+
+    def _replace(self, **kwargs):
+        """A copy with some of the components replaced."""
+        values = dict(self.items())
+        values.update(kwargs)
+        return ParsedPath(**values)
+
+
+Mapping.register(ParsedPath)
+
+
+def parse_path(path, st_type=None):
     """Parse a path into its components.
 
     If the path doesn't end with the pathsep, it is assumed being a file!
     No tests based on existing files are done, as this is supposed to also work
     on path strings that don't exist on the system running this code.
 
+    Parameters
+    ----------
+    path : str
+    st_type : str, optional
+        The storage type of the dataset located at this path, see DataSet.
+
     Returns
     -------
-    parsed = {
+    parsed : ParsedPath(
         'orig' : str   # string as passed into this function
         'full' : str   # separators adjusted to current platform
         'path' : str   # like previous, up to (including) the last separator
         'dname' : str  # segment between the last two separators (directory)
         'fname' : str  # segment after the last separator (filename)
         'ext' : str    # filename extension, containing max 1 period
-    }
+        'type' : str   # the storage type as given, None by default
+    )
 
     Example
     -------
@@ -52,15 +154,16 @@ def parse_path(path):
     >>> path_to_dir['fname']
     ''
     """
-    parsed = {}
-    parsed['orig'] = path
-    path = path.replace('\\', sep)
-    parsed['full'] = path
-    parsed['path'] = os.path.dirname(path) + sep
-    parsed['fname'] = os.path.basename(path)
-    parsed['dname'] = os.path.basename(os.path.dirname(parsed['path']))
-    parsed['ext'] = os.path.splitext(parsed['fname'])[1]
-    return parsed
+    full = path.replace('\\', sep)
+    dirpath = os.path.dirname(full) + sep
+    fname = os.path.basename(full)
+    return ParsedPath(orig=path,
+                      full=full,
+                      path=dirpath,
+                      dname=os.path.basename(os.path.dirname(dirpath)),
+                      fname=fname,
+                      ext=os.path.splitext(fname)[1],
+                      type=st_type)
 
 
 def jython_fiji_exists(path):
@@ -88,6 +191,91 @@ else:
     exists = os.path.exists
 
 
+class PathResolver(object):
+
+    """Check for existing files using cached directory listings.
+
+    Looking up many files (e.g. the tiles of a mosaic, often including a
+    second attempt with a modified name, see ImageDataOlympus) by individual
+    exists() calls is slow on network shares, where every call is a round
+    trip to the server. The resolver lists each directory only once and
+    answers all subsequent queries for files in it from memory.
+
+    The listings are not updated automatically, use invalidate() if files
+    are created or removed while the resolver is used. They are not pickled
+    either, so an unpickled copy (e.g. in a process pool) starts empty.
+
+    Example
+    -------
+    >>> resolver = PathResolver()
+    >>> resolver.exists('/data/Slide1sec001/Slide1sec001_01.oif')
+    >>> resolver.invalidate('/data/Slide1sec001')
+    """
+
+    def __init__(self):
+        """Set up the (empty) listing cache.
+
+        Instance Variables
+        ------------------
+        listings : dict(str: set(str))
+            The (normcase'd) names in each listed directory, by the directory
+            path.
+        """
+        self.listings = dict()
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # note: pickle skips __setstate__ for an empty state, so unpickling
+        # has to go through __init__ to set up the listings and the lock
+        return (self.__class__, ())
+
+    def listing(self, dname):
+        """The names in a directory, listed on first access.
+
+        Parameters
+        ----------
+        dname : str
+
+        Returns
+        -------
+        names : set(str)
+            The names in the directory (empty if it doesn't exist), converted
+            by os.path.normcase (i.e. lowercase on case-insensitive systems).
+        """
+        dname = os.path.normpath(dname)
+        with self._lock:
+            names = self.listings.get(dname)
+        if names is not None:
+            return names
+        try:
+            names = set(os.path.normcase(name) for name in os.listdir(dname))
+        except OSError:
+            names = set()
+        with self._lock:
+            self.listings[dname] = names
+        return names
+
+    def exists(self, path):
+        """Check if a file or directory exists (see listing)."""
+        dname, name = os.path.split(os.path.normpath(path))
+        return os.path.normcase(name) in self.listing(dname or os.curdir)
+
+    def invalidate(self, dname=None):
+        """Discard the listing of a directory, or all of them.
+
+        Parameters
+        ----------
+        dname : str, optional
+            The directory to be listed again on the next access, all cached
+            listings are discarded if omitted.
+        """
+        with self._lock:
+            if dname is None:
+                self.listings.clear()
+            else:
+                self.listings.pop(os.path.normpath(dname), None)
+
+
 if __name__ == "__main__":
     # pylint: disable-msg=W0611
     # pylint: disable-msg=W0406
@@ -0,0 +1,263 @@
+#!/usr/bin/python
+
+"""Pairwise registration of neighbouring tiles using phase correlation.
+
+The adjacent tile pairs of a mosaic are enumerated from the tile grid indices
+(supplement['tileno'], looked up in the mosaic's tiletable.TileTable). For
+each pair the region where the tiles overlap according to their current
+relative positions is read from both tiles (and nothing else, see
+ImageData.read_region) and the translation between them is estimated by phase
+correlation (NumPy FFT).
+As the correlation is periodic, the strongest peaks are examined for all of
+their possible interpretations and the one with the best normalized cross
+correlation is picked (and refined locally), which also serves as the score of
+the pair.
+
+Example
+-------
+>>> from micrometa import registration
+>>> shifts = registration.register_mosaic(mosaic, c=0)
+>>> [(s.first, s.second, s.dx, s.dy, s.score) for s in shifts]
+"""
+
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # e.g. in Jython (Fiji)
+    np = None
+
+from log import log
+from .parallel import get_executor, wait_all
+
+
+class PairShift(namedtuple('PairShift',
+                           ['first', 'second', 'dx', 'dy', 'score'])):
+
+    """The registration result of a pair of tiles.
+
+    Attributes
+    ----------
+    first, second : int
+        The indices of the tiles in the mosaic's subvolume list.
+    dx, dy : float
+        The measured offset of the second tile relative to the first one (in
+        pixels), i.e. the difference of their positions.
+    score : float
+        The normalized cross correlation of the overlap at the measured
+        offset (between -1 and 1).
+    """
+
+    __slots__ = ()
+
+
+def adjacent_pairs(mosaic_ds):
+    """Enumerate the pairs of tiles adjacent in the tile grid.
+
+    Returns
+    -------
+    pairs : list((int, int))
+        The subvolume indices of each tile and its right / lower neighbour.
+    """
+    return mosaic_ds.tile_table().adjacent_pairs()
+
+
+def overlap_bounds(shape_a, shape_b, offset):
+    """Determine the overlap of two tiles in the coordinates of both tiles.
+
+    Parameters
+    ----------
+    shape_a, shape_b : (int, int)
+        The (Y, X) shapes of the tiles.
+    offset : (int, int)
+        The (x, y) offset of the second tile relative to the first one.
+
+    Returns
+    -------
+    bounds_a, bounds_b : (int, int, int, int) or None
+        The overlap (y0, y1, x0, x1) in each tile, None if there is none.
+    """
+    off_x, off_y = offset
+    y_0, y_1 = max(0, off_y), min(shape_a[0], off_y + shape_b[0])
+    x_0, x_1 = max(0, off_x), min(shape_a[1], off_x + shape_b[1])
+    if y_0 >= y_1 or x_0 >= x_1:
+        return None, None
+    return ((y_0, y_1, x_0, x_1),
+            (y_0 - off_y, y_1 - off_y, x_0 - off_x, x_1 - off_x))
+
+
+def ncc(img_a, img_b, shift_y, shift_x):
+    """Normalized cross correlation of b(p) and a(p + shift) where defined.
+
+    Returns
+    -------
+    score : float
+    area : int
+        The number of overlapping pixels.
+    """
+    y_0, y_1 = max(0, -shift_y), min(img_b.shape[0], img_a.shape[0] - shift_y)
+    x_0, x_1 = max(0, -shift_x), min(img_b.shape[1], img_a.shape[1] - shift_x)
+    if y_0 >= y_1 or x_0 >= x_1:
+        return -1.0, 0
+    sub_b = img_b[y_0:y_1, x_0:x_1]
+    sub_a = img_a[y_0 + shift_y:y_1 + shift_y, x_0 + shift_x:x_1 + shift_x]
+    sub_a = sub_a - sub_a.mean()
+    sub_b = sub_b - sub_b.mean()
+    norm = np.sqrt((sub_a * sub_a).sum() * (sub_b * sub_b).sum())
+    if norm == 0:
+        return 0.0, sub_b.size
+    return float((sub_a * sub_b).sum() / norm), sub_b.size
+
+
+def phase_correlation(img_a, img_b, peaks=5, min_overlap=0.25):
+    """Estimate the translation between two images of the same shape.
+
+    Parameters
+    ----------
+    img_a, img_b : np.ndarray (2D)
+    peaks : int
+        The number of correlation peaks to examine.
+    min_overlap : float
+        The minimal fraction of the image area that has to overlap for a
+        translation to be accepted.
+
+    Returns
+    -------
+    (shift_y, shift_x) : (int, int)
+        The translation for which b(p) = a(p + shift) matches best.
+    score : float
+        The normalized cross correlation at that translation.
+    """
+    img_a = img_a - img_a.mean()
+    img_b = img_b - img_b.mean()
+    cross = np.fft.rfft2(img_a) * np.conj(np.fft.rfft2(img_b))
+    cross /= np.maximum(np.abs(cross), 1e-12)
+    corr = np.fft.irfft2(cross, s=img_a.shape)
+    peaks = min(peaks, corr.size)
+    candidates = np.argpartition(corr.ravel(), -peaks)[-peaks:]
+    size_y, size_x = img_a.shape
+    best = ((0, 0), -1.0)
+    for peak in candidates:
+        peak_y, peak_x = np.unravel_index(peak, corr.shape)
+        # the peak is located at the shift (modulo the image size):
+        for shift_y in set([peak_y, peak_y - size_y]):
+            for shift_x in set([peak_x, peak_x - size_x]):
+                score, area = ncc(img_a, img_b, shift_y, shift_x)
+                if area < min_overlap * img_a.size:
+                    continue
+                if score > best[1]:
+                    best = ((int(shift_y), int(shift_x)), score)
+    # broad peaks (e.g. of smooth images) are off by a few pixels at times,
+    # so refine the translation by climbing the cross correlation:
+    improved = True
+    while improved:
+        improved = False
+        (shift_y, shift_x), _ = best
+        for step_y, step_x in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            shift = (shift_y + step_y, shift_x + step_x)
+            score, area = ncc(img_a, img_b, *shift)
+            if area >= min_overlap * img_a.size and score > best[1]:
+                best = (shift, score)
+                improved = True
+    return best
+
+
+def registration_image(tile, bounds, c=0, z=None, t=0):
+    """Read the 2D image of a tile region used for registration.
+
+    Parameters
+    ----------
+    tile : dataset.ImageData
+    bounds : (int, int, int, int)
+        The region (y0, y1, x0, x1) to read.
+    c, z, t : int
+        The channel, slice and timepoint to use, the maximum projection
+        along Z is used if z is None.
+    """
+    y_0, y_1, x_0, x_1 = bounds
+    if z is not None:
+        return np.asarray(tile.read_region(x_0, x_1, y_0, y_1, z=z, c=c, t=t),
+                          dtype=np.float32)
+    return np.asarray(tile.read_region(x_0, x_1, y_0, y_1, c=c, t=t)
+                      .max(axis=0), dtype=np.float32)
+
+
+def register_pair(tile_a, tile_b, offset, c=0, z=None, t=0, peaks=5):
+    """Register two tiles on their overlap.
+
+    Parameters
+    ----------
+    tile_a, tile_b : dataset.ImageData
+    offset : (int, int)
+        The expected (x, y) offset of tile_b relative to tile_a, defining the
+        overlap region to be registered.
+    c, z, t : int
+        The channel, slice and timepoint to use, the maximum projection
+        along Z is used if z is None.
+    peaks : int
+        The number of correlation peaks to examine.
+
+    Returns
+    -------
+    (dx, dy, score) : (float, float, float) or None
+        The measured offset and its score, None if the tiles don't overlap.
+    """
+    dim_a = tile_a.get_dimensions()
+    dim_b = tile_b.get_dimensions()
+    bounds_a, bounds_b = overlap_bounds((dim_a['Y'], dim_a['X']),
+                                        (dim_b['Y'], dim_b['X']), offset)
+    if bounds_a is None:
+        return None
+    sub_a = registration_image(tile_a, bounds_a, c, z, t)
+    sub_b = registration_image(tile_b, bounds_b, c, z, t)
+    (shift_y, shift_x), score = phase_correlation(sub_a, sub_b, peaks)
+    return (offset[0] + shift_x, offset[1] + shift_y, score)
+
+
+def register_mosaic(mosaic_ds, c=0, z=None, t=0, peaks=5,
+                    executor='process', max_workers=None):
+    """Register all pairs of adjacent tiles of a mosaic.
+
+    The overlap of each pair is taken from the current (relative) positions
+    of the tiles, see register_pair for the other parameters.
+
+    Parameters
+    ----------
+    mosaic_ds : dataset.MosaicData
+    executor : str
+        The executor type to use for registering the pairs, see get_executor.
+    max_workers : int, optional
+        The maximum number of concurrently registered pairs.
+
+    Returns
+    -------
+    shifts : list(PairShift)
+        The results of the pairs that overlap.
+    """
+    if np is None:
+        raise ImportError('Registering tiles requires numpy!')
+    tiles = mosaic_ds.subvol
+    pairs = adjacent_pairs(mosaic_ds)
+    log.info('Registering %s pairs of adjacent tiles.', len(pairs))
+    pool = get_executor(executor, max_workers)
+    pending = list()
+    for first, second in pairs:
+        pos_a = tiles[first].position['relative']
+        pos_b = tiles[second].position['relative']
+        offset = (int(round(pos_b[0] - pos_a[0])),
+                  int(round(pos_b[1] - pos_a[1])))
+        pending.append(pool.submit(register_pair, tiles[first],
+                                   tiles[second], offset, c, z, t, peaks))
+    failed = wait_all(pending)
+    pool.shutdown()
+    if failed is not None:
+        raise pending[failed].exception()
+    shifts = list()
+    for (first, second), fut in zip(pairs, pending):
+        result = fut.result()
+        if result is None:
+            log.warn('Tiles %s and %s do not overlap!', first, second)
+            continue
+        shifts.append(PairShift(first, second, *result))
+        log.debug('Registered pair: %s', shifts[-1])
+    return shifts
@@ -0,0 +1,218 @@
+#!/usr/bin/python
+
+"""Minimal reader for the uncompressed TIFF planes of Olympus datasets.
+
+Only what is required for the planes written by FluoView is supported: the
+first page of a classic (non-Big) TIFF, stored in uncompressed strips with a
+single sample per pixel. Planes whose strips are stored contiguously in a file
+are memory-mapped instead of being read.
+"""
+
+import struct
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # e.g. in Jython (Fiji)
+    np = None
+
+from .mapfile import MappedFile
+
+
+# TIFF field types: (struct format, size in bytes)
+FIELD_TYPES = {
+    1: ('B', 1),  # BYTE
+    2: ('c', 1),  # ASCII
+    3: ('H', 2),  # SHORT
+    4: ('I', 4),  # LONG
+    6: ('b', 1),  # SBYTE
+    8: ('h', 2),  # SSHORT
+    9: ('i', 4),  # SLONG
+}
+
+# the tags of interest:
+TAGS = {
+    256: 'width',
+    257: 'height',
+    258: 'bits',
+    259: 'compression',
+    273: 'strip_offsets',
+    277: 'samples',
+    278: 'rows_per_strip',
+    279: 'strip_counts',
+    322: 'tile_width',
+    339: 'sample_format',
+}
+
+# numpy kind by TIFF SampleFormat:
+SAMPLE_KINDS = {1: 'u', 2: 'i', 3: 'f'}
+
+
+class TiffPlane(namedtuple('TiffPlane',
+                           ['width', 'height', 'dtype', 'strips'])):
+
+    """The layout of the (first) plane of a TIFF file.
+
+    Attributes
+    ----------
+    width, height : int
+        The plane dimensions in pixels.
+    dtype : str
+        The numpy type string of the pixels (including the byte order).
+    strips : tuple((int, int))
+        The (offset, size) pairs of the strips, relative to the TIFF start.
+    """
+
+    __slots__ = ()
+
+    def contiguous(self):
+        """Check if the strips are stored in one piece (in order)."""
+        pos = self.strips[0][0]
+        for offset, size in self.strips:
+            if offset != pos:
+                return False
+            pos += size
+        return True
+
+
+def parse_tiff(read):
+    """Determine the layout of the first plane of a TIFF.
+
+    Parameters
+    ----------
+    read : callable
+        A function taking offset and size (relative to the TIFF start) and
+        returning the corresponding bytes, e.g. MappedFile.read.
+
+    Returns
+    -------
+    plane : TiffPlane
+    """
+    order = {'II': '<', 'MM': '>'}.get(read(0, 2))
+    if order is None:
+        raise ValueError('Not a TIFF file!')
+    magic, ifd = struct.unpack(order + 'HI', read(2, 6))
+    if magic != 42:
+        raise NotImplementedError('Only classic TIFF files are supported!')
+    count = struct.unpack(order + 'H', read(ifd, 2))[0]
+    entries = read(ifd + 2, count * 12)
+    tags = dict()
+    for i in range(count):
+        tag, ftype, nvals, value = struct.unpack(
+            order + 'HHI4s', entries[i * 12:(i + 1) * 12])
+        if tag not in TAGS or ftype not in FIELD_TYPES:
+            continue
+        fmt, size = FIELD_TYPES[ftype]
+        if nvals * size > 4:
+            value = read(struct.unpack(order + 'I', value)[0], nvals * size)
+        tags[TAGS[tag]] = struct.unpack(
+            '%s%i%s' % (order, nvals, fmt), value[:nvals * size])
+    if tags.get('compression', (1,))[0] != 1:
+        raise NotImplementedError('Compressed TIFF planes are not supported!')
+    if 'tile_width' in tags or tags.get('samples', (1,))[0] != 1:
+        raise NotImplementedError('Only single-sample strips are supported!')
+    width = tags['width'][0]
+    height = tags['height'][0]
+    bits = tags.get('bits', (1,))[0]
+    kind = SAMPLE_KINDS[tags.get('sample_format', (1,))[0]]
+    if bits % 8:
+        raise NotImplementedError('Unsupported bit depth: %s' % bits)
+    offsets = tags['strip_offsets']
+    counts = tags.get('strip_counts')
+    if counts is None:
+        rows = tags.get('rows_per_strip', (height,))[0]
+        counts = [min(rows, height - i * rows) * width * bits // 8
+                  for i in range(len(offsets))]
+    return TiffPlane(width, height, '%s%s%i' % (order, kind, bits // 8),
+                     tuple(zip(offsets, counts)))
+
+
+def read_tiff_file(fname, base=0, handle=None):
+    """Read the (first) plane of a TIFF file into a numpy array.
+
+    Parameters
+    ----------
+    fname : str
+        The file containing the TIFF.
+    base : int
+        The offset of the TIFF inside the file (e.g. for streams of an OIB).
+    handle : mapfile.MappedFile, optional
+        An open handle of the file to use for reading the TIFF structure.
+
+    Returns
+    -------
+    plane : np.ndarray (2D) or np.memmap
+        A (read-only) memory map if the strips are stored contiguously.
+    """
+    if handle is None:
+        with MappedFile(fname) as tmp:
+            return read_tiff_file(fname, base, tmp)
+    plane = parse_tiff(lambda offset, size: handle.read(base + offset, size))
+    shape = (plane.height, plane.width)
+    if plane.contiguous():
+        return np.memmap(fname, dtype=plane.dtype, mode='r', shape=shape,
+                         offset=base + plane.strips[0][0])
+    data = ''.join(handle.read(base + offset, size)
+                   for offset, size in plane.strips)
+    return np.frombuffer(data, dtype=plane.dtype).reshape(shape)
+
+
+def read_tiff_buffer(data):
+    """Read the (first) plane of a TIFF held in memory into a numpy array."""
+    plane = parse_tiff(lambda offset, size: data[offset:offset + size])
+    itemsize = np.dtype(plane.dtype).itemsize
+    strips = [np.frombuffer(data, plane.dtype, size // itemsize, offset)
+              for offset, size in plane.strips]
+    arr = strips[0] if len(strips) == 1 else np.concatenate(strips)
+    return arr.reshape((plane.height, plane.width))
+
+
+def read_tiff_region(read, bounds, gap=0):
+    """Read a rectangular region of the (first) plane of a TIFF.
+
+    Only the bytes of the requested rows and columns are read, the segments
+    of consecutive rows are combined into a single read if they are adjacent
+    (i.e. for regions spanning the full width) or the gap between them is
+    small enough.
+
+    Parameters
+    ----------
+    read : callable
+        A function taking offset and size (relative to the TIFF start) and
+        returning the corresponding bytes, e.g. MappedFile.read.
+    bounds : (int, int, int, int)
+        The region (y0, y1, x0, x1) to read, end-exclusive.
+    gap : int
+        The maximum number of unneeded bytes to read for combining reads,
+        trading the amount of data read for the number of read calls.
+
+    Returns
+    -------
+    region : np.ndarray (2D)
+    """
+    plane = parse_tiff(read)
+    y_0, y_1, x_0, x_1 = bounds
+    if not (0 <= y_0 < y_1 <= plane.height and 0 <= x_0 < x_1 <= plane.width):
+        raise IndexError('Region %s exceeds the plane (%s x %s)!' %
+                         (bounds, plane.height, plane.width))
+    dtype = np.dtype(plane.dtype)
+    row_bytes = plane.width * dtype.itemsize
+    rows_per_strip = max(plane.strips[0][1] // row_bytes, 1)
+    seg_bytes = (x_1 - x_0) * dtype.itemsize
+    starts = list()
+    for row in range(y_0, y_1):
+        strip = plane.strips[row // rows_per_strip][0]
+        starts.append(strip + (row % rows_per_strip) * row_bytes +
+                      x_0 * dtype.itemsize)
+    region = np.empty((y_1 - y_0, x_1 - x_0), dtype=dtype)
+    first = 0
+    for last in range(len(starts)):
+        if (last + 1 < len(starts) and
+                0 <= starts[last + 1] - starts[last] - seg_bytes <= gap):
+            continue
+        data = read(starts[first], starts[last] - starts[first] + seg_bytes)
+        for row in range(first, last + 1):
+            region[row] = np.frombuffer(data, dtype, x_1 - x_0,
+                                        starts[row] - starts[first])
+        first = last + 1
+    return region
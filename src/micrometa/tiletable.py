@@ -0,0 +1,174 @@
+#!/usr/bin/python
+
+"""Columnar (array-backed) table of the tiles of a mosaic.
+
+The tiles of a mosaic are ImageData objects, each keeping its grid indices,
+positions and dimensions in separate dicts. For operations on whole mosaics
+(looking up a tile by its grid index, finding the neighbours of a tile,
+processing all positions at once) the tile table gathers these values into a
+single NumPy structured array, together with a lookup grid mapping the (x, y,
+z) grid indices to the index of the tile in the mosaic's subvolume list.
+
+The table is built once per mosaic (see MosaicDataCuboid.tile_table), the
+ImageData objects in 'subvol' stay the per-tile view of the same information:
+their relative positions are bound to the 'relative' column of the table.
+
+Example
+-------
+>>> table = mosaic_ds.tile_table()
+>>> idx = table.index(2, 1)
+>>> mosaic_ds.subvol[idx].storage['fname']
+>>> table.neighbours(idx)
+>>> table.rows['relative'][:, 0]  # the x positions of all tiles
+"""
+
+try:
+    import numpy as np
+except ImportError:  # e.g. in Jython (Fiji)
+    np = None
+
+from log import log
+
+
+# the columns of the table, unknown values are stored as -1 (int) / NaN:
+TILE_DTYPE = [
+    ('tileno', '<i4', (3,)),     # grid indices (x, y, z)
+    ('stage', '<f8', (2,)),      # raw stage coordinates (x, y)
+    ('relative', '<f8', (3,)),   # relative position in pixels (x, y, z)
+    ('dim', [('X', '<i4'), ('Y', '<i4'), ('Z', '<i4'),
+             ('C', '<i4'), ('T', '<i4'), ('B', '<i4')]),
+    ('pixelsize', '<f8', (2,)),  # pixel size in micrometers (x, y)
+]
+
+
+class TileTable(object):
+
+    """The tiles of a mosaic in a NumPy structured array with a lookup grid."""
+
+    def __init__(self, tiles, shape=(0, 0, 0)):
+        """Gather the information of the tiles into the table.
+
+        The dimensions of the tiles are resolved for this, i.e. their metadata
+        is read unless it is known already. Relative positions that are still
+        to be computed (see ImageDataOlympus.set_relpos) are left as NaN, see
+        MosaicDataCuboid.tile_table for how they are filled in.
+
+        Parameters
+        ----------
+        tiles : list(ImageData)
+            The tiles of the mosaic (its 'subvol' list).
+        shape : (int, int, int)
+            The (minimal) number of tiles in X, Y and Z direction, the grid is
+            enlarged to fit the grid indices of all tiles.
+
+        Instance Variables
+        ------------------
+        rows : np.ndarray (TILE_DTYPE)
+            One row per tile, in the order of the 'tiles' list.
+        grid : np.ndarray (int, (X, Y, Z))
+            The index of the tile at each (x, y, z) grid position, -1 where
+            there is no tile.
+        """
+        if np is None:
+            raise ImportError('The tile table requires numpy!')
+        self.rows = np.zeros(len(tiles), dtype=TILE_DTYPE)
+        for row, tile in zip(self.rows, tiles):
+            self.fill_row(row, tile)
+        tileno = self.rows['tileno']
+        # tiles without an index in a dimension are placed at zero:
+        cells = np.maximum(tileno, 0)
+        shape = np.maximum(shape, 1)
+        if len(tiles):
+            shape = np.maximum(shape, cells.max(axis=0) + 1)
+        self.grid = np.full(tuple(shape), -1, dtype=np.intp)
+        self.grid[cells[:, 0], cells[:, 1], cells[:, 2]] = np.arange(len(tiles))
+        if (self.grid >= 0).sum() < len(tiles):
+            log.warn('WARNING: multiple tiles share the same grid position!')
+        log.debug('Built tile table: %s tiles, grid %s.', len(tiles), shape)
+
+    @staticmethod
+    def fill_row(row, tile):
+        """Copy the information of a tile into a row of the table."""
+        tileno = tile.supplement.get('tileno', (None, None, None))
+        row['tileno'] = [-1 if num is None else num for num in tileno]
+        stage = tile.position.get('stage') or (None, None)
+        row['stage'] = [np.nan if val is None else val for val in stage]
+        row['relative'] = TileTable.read_relative(tile)
+        dim = tile.get_dimensions()
+        for axis in 'XYZCTB':
+            row['dim'][axis] = dim[axis]
+        try:
+            row['pixelsize'] = tile.get_pixelsize()
+        except (NotImplementedError, ValueError):
+            row['pixelsize'] = np.nan
+
+    @staticmethod
+    def read_relative(tile):
+        """The relative position of a tile as (x, y, z), NaN where unknown.
+
+        Positions that are still to be computed (deferred) are NOT computed
+        here, they are returned as NaN.
+        """
+        relative = ()
+        if 'relative' not in tile.position.deferred:
+            relative = tuple(tile.position.get('relative') or ())
+        return (relative + (np.nan,) * 3)[:3]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def index(self, tile_x, tile_y, tile_z=0):
+        """Look up a tile by its grid indices.
+
+        Returns
+        -------
+        idx : int or None
+            The index of the tile in the mosaic, None if there is no tile at
+            the given grid position.
+        """
+        try:
+            idx = self.grid[tile_x, tile_y, tile_z]
+        except IndexError:
+            return None
+        if idx < 0 or min(tile_x, tile_y, tile_z) < 0:
+            return None
+        return int(idx)
+
+    def neighbours(self, idx):
+        """Find the tiles adjacent to a tile in the grid.
+
+        Returns
+        -------
+        neighbours : dict(str: int)
+            The indices of the existing neighbours, by their direction ('-x',
+            '+x', '-y', '+y', '-z', '+z').
+        """
+        cell = np.maximum(self.rows['tileno'][idx], 0)
+        found = dict()
+        for axis, name in enumerate('xyz'):
+            for step, sign in ((-1, '-'), (1, '+')):
+                pos = list(cell)
+                pos[axis] += step
+                other = self.index(*pos)
+                if other is not None:
+                    found[sign + name] = other
+        return found
+
+    def adjacent_pairs(self):
+        """Enumerate the pairs of tiles adjacent in X or Y direction.
+
+        Returns
+        -------
+        pairs : list((int, int))
+            The indices of each tile and its right / lower neighbour, ordered
+            by the grid position of the first tile.
+        """
+        pairs = list()
+        for axis in (0, 1):
+            first = self.grid.take(range(self.grid.shape[axis] - 1), axis=axis)
+            second = self.grid.take(range(1, self.grid.shape[axis]), axis=axis)
+            valid = (first >= 0) & (second >= 0)
+            for cell, idx, other in zip(np.argwhere(valid), first[valid],
+                                        second[valid]):
+                pairs.append(((tuple(cell[:2]), axis), (int(idx), int(other))))
+        return [pair for _, pair in sorted(pairs)]
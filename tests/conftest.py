@@ -0,0 +1,9 @@
+import pytest
+
+import synthetic
+
+
+@pytest.fixture
+def fv3k_project(tmpdir):
+    """A FluoView 3000 project: 2 mosaics of 3x2 OIR tiles (64 px, 10%)."""
+    return synthetic.write_fv3k_project(str(tmpdir.join('fv3k')), 2, 3, 2, 64)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+"""A stand-in for the Fiji launcher, to test running macros without Fiji.
+
+Accepts the command line used by micrometa.fiji.fiji_command, prints what a
+headless Fiji would be doing and exits. The behaviour can be controlled by
+environment variables:
+
+FAKE_FIJI_SLEEP : float
+    The number of seconds to pretend to be busy [0].
+FAKE_FIJI_FAIL : str
+    Fail (exit code 1) for macros whose file name contains this string.
+FAKE_FIJI_FAIL_ONCE : str
+    Like FAKE_FIJI_FAIL, but only on the first attempt (a marker file next to
+    the macro is used to recognize retries).
+
+To be used as the Fiji launcher of micrometa.fiji.run_macros, e.g. by passing
+[sys.executable, 'tests/fake_fiji.py'] as its 'fiji' argument (see
+test_fiji.py).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+def main():
+    """Parse the launcher arguments and pretend to run the macro."""
+    argp = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argp.add_argument('--mem')
+    argp.add_argument('--headless', action='store_true')
+    argp.add_argument('--console', action='store_true')
+    argp.add_argument('-macro', required=True)
+    args = argp.parse_args()
+
+    print('fake Fiji (pid %s): macro=%s mem=%s headless=%s' %
+          (os.getpid(), args.macro, args.mem, args.headless))
+    if not os.path.exists(args.macro):
+        print('Macro file not found: %s' % args.macro)
+        return 2
+    time.sleep(float(os.environ.get('FAKE_FIJI_SLEEP', 0)))
+
+    name = os.path.basename(args.macro)
+    fail = os.environ.get('FAKE_FIJI_FAIL')
+    if fail and fail in name:
+        print('Failing as requested.')
+        return 1
+    fail_once = os.environ.get('FAKE_FIJI_FAIL_ONCE')
+    marker = args.macro + '.fake_fiji_failed'
+    if fail_once and fail_once in name and not os.path.exists(marker):
+        open(marker, 'w').close()
+        print('Failing (once) as requested.')
+        return 1
+    print('Macro finished.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
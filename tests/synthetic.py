@@ -0,0 +1,470 @@
+#!/usr/bin/env python
+
+"""Generate synthetic FluoView projects for testing and benchmarking.
+
+Two kinds of projects can be generated, each with a configurable number of
+mosaics, tiles and tile size:
+
+- FluoView 3000: a "matl.omp2info" project file and one OIR file per tile,
+  consisting of the OIR magic, the XML blocks required for parsing the
+  dimensions and (zero-filled) pixel data.
+- FluoView (1000): a "MATL_Mosaic.log" project file and one OIF (with its
+  ".oif.files" directory of TIFF planes) or OIB file per tile. As FluoView
+  does, the project file refers to the tiles without their "_01" suffix.
+
+The OIB files are OLE2 compound documents (version 4, 4096 byte sectors),
+written by the minimal writer in this module (olefile can't create files).
+
+Example
+-------
+$ python tests/synthetic.py --format oir --mosaics 2 --tiles 4x4 /tmp/fv3k
+"""
+
+import argparse
+import codecs
+import os
+import struct
+
+
+MATL_NS = 'http://www.olympus.co.jp/hpf/protocol/matl/model/matl'
+MARKER_NS = 'http://www.olympus.co.jp/hpf/model/marker'
+XSI_NS = 'http://www.w3.org/2001/XMLSchema-instance'
+
+
+def tile_grid(mosaics, tiles_x, tiles_y):
+    """Enumerate (mosaic, x, y, running number) of all tiles."""
+    num = 0
+    for mosaic in range(mosaics):
+        for grid_y in range(tiles_y):
+            for grid_x in range(tiles_x):
+                num += 1
+                yield mosaic, grid_x, grid_y, num
+
+
+########## FluoView 3000 (matl.omp2info + OIR) ##########
+
+
+NS_BASE = 'http://www.olympus.co.jp/hpf/model'
+
+FRAME_PROPS = (
+    '<?xml version="1.0" encoding="ASCII"?>'
+    '<lsmframe:frameProperties xmlns:lsmframe="%(ns)s/lsmframe" '
+    'xmlns:commonframe="%(ns)s/commonframe" xmlns:base="%(ns)s/base">'
+    '<commonframe:imageDefinition>'
+    '<base:width>%(x)i</base:width>'
+    '<base:height>%(y)i</base:height>'
+    '<base:bitCounts>%(b)i</base:bitCounts>'
+    '</commonframe:imageDefinition>'
+    '</lsmframe:frameProperties>'
+)
+
+IMAGE_PROPS = (
+    '<?xml version="1.0" encoding="ASCII"?>'
+    '<lsmimage:imageProperties xmlns:lsmimage="%(ns)s/lsmimage" '
+    'xmlns:commonimage="%(ns)s/commonimage" '
+    'xmlns:commonparam="%(ns)s/commonparam" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<commonimage:acquisition><commonimage:imagingParam>'
+    '<commonparam:axis xsi:type="commonparam:ZAxisParam">'
+    '<commonparam:paramName>Start End</commonparam:paramName>'
+    '<commonparam:maxSize>%(z)i</commonparam:maxSize>'
+    '</commonparam:axis>'
+    '</commonimage:imagingParam></commonimage:acquisition>'
+    '</lsmimage:imageProperties>'
+)
+
+
+def xml_block(xml):
+    """Assemble a length-prefixed XML block, terminated by a null byte."""
+    return struct.pack('<I', len(xml)) + xml + '\x00'
+
+
+def write_oir(fname, size, slices=1, bits=12):
+    """Write an OIR file with the metadata blocks and blank pixel data."""
+    values = {'ns': NS_BASE, 'x': size, 'y': size, 'z': slices, 'b': bits}
+    plane = '\x00' * (size * size * 2)
+    with open(fname, 'wb') as fout:
+        fout.write('OLYMPUSRAWFORMAT')
+        fout.write(xml_block(FRAME_PROPS % values))
+        fout.write(xml_block(IMAGE_PROPS % values))
+        for _ in range(slices):
+            fout.write(plane)
+
+
+def omp2info_xml(mosaics, tiles_x, tiles_y, overlap):
+    """Assemble the XML of a "matl.omp2info" project file."""
+    xml = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+           '<matl:properties xmlns:matl="%s" xmlns:marker="%s" '
+           'xmlns:xsi="%s" version="2.2" applicationVersion="2.3.1.163" '
+           'platformVersion="2.3.1.163" id="synthetic">\n' %
+           (MATL_NS, MARKER_NS, XSI_NS),
+           '<matl:stage><matl:name>PRIOR,H101F</matl:name>'
+           '<matl:overlap>%i</matl:overlap></matl:stage>\n' % overlap]
+    areas = dict()
+    for mosaic, grid_x, grid_y, num in tile_grid(mosaics, tiles_x, tiles_y):
+        areas.setdefault(mosaic, []).append(
+            '<matl:area><matl:image>%s</matl:image>'
+            '<matl:xIndex>%i</matl:xIndex><matl:yIndex>%i</matl:yIndex>'
+            '</matl:area>\n' % (oir_name(mosaic, num), grid_x, grid_y))
+    for mosaic in range(mosaics):
+        xml.append(
+            '<matl:group xsi:type="matl:DefineMatrixROI" objectId="%i">\n'
+            '<marker:regionInfo xsi:type="marker:rectangleRegion">'
+            '<marker:shape>Rectangle</marker:shape></marker:regionInfo>\n'
+            '<matl:enable>true</matl:enable>'
+            '<matl:protocolGroupId>%i</matl:protocolGroupId>\n'
+            '<matl:areaInfo><matl:numOfXAreas>%i</matl:numOfXAreas>'
+            '<matl:numOfYAreas>%i</matl:numOfYAreas>'
+            '<matl:areaWidth>1000000</matl:areaWidth>'
+            '<matl:areaHeight>1000000</matl:areaHeight></matl:areaInfo>\n' %
+            (mosaic + 1, mosaic + 1, tiles_x, tiles_y))
+        xml.extend(areas[mosaic])
+        xml.append('</matl:group>\n')
+    xml.append('</matl:properties>\n')
+    return ''.join(xml)
+
+
+def oir_name(mosaic, num):
+    """The file name of an OIR tile."""
+    return 'Stitch_A%02i_G%03i_%04i.oir' % (mosaic + 1, mosaic + 1, num)
+
+
+def write_fv3k_project(dname, mosaics, tiles_x, tiles_y, size, slices=1,
+                       overlap=10):
+    """Write a FluoView 3000 project, returns the path of the project file."""
+    if not os.path.isdir(dname):
+        os.makedirs(dname)
+    for mosaic, _, _, num in tile_grid(mosaics, tiles_x, tiles_y):
+        write_oir(os.path.join(dname, oir_name(mosaic, num)), size, slices)
+    project = os.path.join(dname, 'matl.omp2info')
+    with open(project, 'w') as fout:
+        fout.write(omp2info_xml(mosaics, tiles_x, tiles_y, overlap))
+    return project
+
+
+########## FluoView (MATL_Mosaic.log + OIF / OIB) ##########
+
+
+def olympus_ini(size, slices=1, bits=12, pixelsize=0.5):
+    """The (main) metadata INI of an OIF / OIB tile, as unicode."""
+    lines = [
+        u'[Acquisition Parameters Common]',
+        u'ImageCaputreDate=\'2018-01-01 12:00:00\'',
+        u'[Axis 0 Parameters Common]',
+        u'AxisCode="X"',
+        u'MaxSize=%i' % size,
+        u'[Axis 1 Parameters Common]',
+        u'AxisCode="Y"',
+        u'MaxSize=%i' % size,
+        u'[Axis 2 Parameters Common]',
+        u'AxisName="Ch"',
+        u'MaxSize=1',
+        u'[Axis 3 Parameters Common]',
+        u'AxisName="Z"',
+        u'MaxSize=%i' % slices,
+        u'[Axis 4 Parameters Common]',
+        u'AxisName="T"',
+        u'MaxSize=0',
+        u'[Reference Image Parameter]',
+        u'HeightConvertValue=%s' % pixelsize,
+        u'HeightUnit="um"',
+        u'ImageHeight=%i' % size,
+        u'ImageWidth=%i' % size,
+        u'ValidBitCounts=%i' % bits,
+        u'WidthConvertValue=%s' % pixelsize,
+        u'WidthUnit="um"',
+    ]
+    # pad with a realistic amount of sections that are not required:
+    for num in range(40):
+        lines.append(u'[Unused Section %02i]' % num)
+        lines.extend(u'Key%02i="%s"' % (key, u'x' * 40) for key in range(10))
+    return u'\r\n'.join(lines) + u'\r\n'
+
+
+def encode_ini(text):
+    """Encode an INI as UTF-16 (with BOM), like FluoView does."""
+    return codecs.BOM_UTF16_LE + text.encode('utf-16-le')
+
+
+def tiff_plane(size, fill='\x00'):
+    """A minimal uncompressed 16 bit TIFF of a single plane."""
+    entries = [
+        (256, 4, size),             # ImageWidth
+        (257, 4, size),             # ImageLength
+        (258, 3, 16),               # BitsPerSample
+        (259, 3, 1),                # Compression: none
+        (262, 3, 1),                # PhotometricInterpretation
+        (273, 4, 0),                # StripOffsets (set below)
+        (277, 3, 1),                # SamplesPerPixel
+        (278, 4, size),             # RowsPerStrip
+        (279, 4, size * size * 2),  # StripByteCounts
+    ]
+    ifd_size = 2 + 12 * len(entries) + 4
+    data_offset = 8 + ifd_size
+    ifd = [struct.pack('<H', len(entries))]
+    for tag, ftype, value in entries:
+        if tag == 273:
+            value = data_offset
+        fmt = '<HHIHH' if ftype == 3 else '<HHII'
+        if ftype == 3:
+            ifd.append(struct.pack(fmt, tag, ftype, 1, value, 0))
+        else:
+            ifd.append(struct.pack(fmt, tag, ftype, 1, value))
+    ifd.append(struct.pack('<I', 0))
+    return 'II*\x00' + struct.pack('<I', 8) + ''.join(ifd) + \
+        fill * (size * size * 2)
+
+
+def plane_names(slices):
+    """The file names of the TIFF planes of a (single channel) tile."""
+    return ['s_C001Z%03i.tif' % (z + 1) for z in range(slices)]
+
+
+def write_oif(fname, size, slices=1):
+    """Write an OIF file and its ".oif.files" directory of TIFF planes."""
+    with open(fname, 'wb') as fout:
+        fout.write(encode_ini(olympus_ini(size, slices)))
+    planedir = fname + '.files'
+    if not os.path.isdir(planedir):
+        os.makedirs(planedir)
+    plane = tiff_plane(size)
+    for name in plane_names(slices):
+        with open(os.path.join(planedir, name), 'wb') as fout:
+            fout.write(plane)
+
+
+def write_oib(fname, size, slices=1):
+    """Write an OIB file (an OLE2 container with the OIF contents)."""
+    names = plane_names(slices)
+    info = [u'[OibSaveInfo]', u'Version=2.0.0.0',
+            u'MainFileName=Stream00000', u'[Storage00001]']
+    info.extend(u'Stream%05i="%s"' % (num + 1, name)
+                for num, name in enumerate(names))
+    plane = tiff_plane(size)
+    streams = [
+        ('OibInfo.txt', encode_ini(u'\r\n'.join(info) + u'\r\n')),
+        ('Stream00000', encode_ini(olympus_ini(size, slices))),
+    ]
+    streams.extend(('Storage00001/Stream%05i' % (num + 1), plane)
+                   for num in range(len(names)))
+    write_ole(fname, streams)
+
+
+def mosaic_log_xml(mosaics, tiles_x, tiles_y, ext, overlap, size):
+    """Assemble the XML of a "MATL_Mosaic.log" project file."""
+    xml = ['<?xml version="1.0" encoding="ASCII"?>\n<XYStage>\n',
+           '<XAxisDirection>LeftToRight</XAxisDirection>\n',
+           '<YAxisDirection>TopToBottom</YAxisDirection>\n',
+           '<NumberOfMosaics>%i</NumberOfMosaics>\n' % mosaics]
+    images = dict()
+    step = size * 0.5 * (100 - overlap) / 100.0  # stage units: micrometers
+    for mosaic, grid_x, grid_y, num in tile_grid(mosaics, tiles_x, tiles_y):
+        name = tile_name(num)
+        images.setdefault(mosaic, []).append(
+            '<ImageInfo><No>%i</No><Filename>%s\\%s%s</Filename>'
+            '<XPos>%.3f</XPos><YPos>%.3f</YPos><Xno>%i</Xno><Yno>%i</Yno>'
+            '</ImageInfo>\n' % (num, name, name, ext, grid_x * step,
+                                grid_y * step, grid_x, grid_y))
+    for mosaic in range(mosaics):
+        xml.append('<Mosaic No="%i">\n' % (mosaic + 1) +
+                   '<XScanDirection>LeftToRight</XScanDirection>\n'
+                   '<YScanDirection>TopToBottom</YScanDirection>\n'
+                   '<XImages>%i</XImages><YImages>%i</YImages>\n'
+                   '<IndexRatio>%.1f</IndexRatio>\n' %
+                   (tiles_x, tiles_y, 100.0 - overlap))
+        xml.extend(images[mosaic])
+        xml.append('</Mosaic>\n')
+    xml.append('</XYStage>\n')
+    return ''.join(xml)
+
+
+def tile_name(num):
+    """The name (directory and file name without suffix) of a FV1000 tile."""
+    return 'Slide1sec%03i' % num
+
+
+def write_fv1000_project(dname, mosaics, tiles_x, tiles_y, size, slices=1,
+                         overlap=10, fmt='oif'):
+    """Write a FluoView project, returns the path of the project file."""
+    writer = {'oif': write_oif, 'oib': write_oib}[fmt]
+    for _, _, _, num in tile_grid(mosaics, tiles_x, tiles_y):
+        tiledir = os.path.join(dname, tile_name(num))
+        if not os.path.isdir(tiledir):
+            os.makedirs(tiledir)
+        writer(os.path.join(tiledir, '%s_01.%s' % (tile_name(num), fmt)),
+               size, slices)
+    project = os.path.join(dname, 'MATL_Mosaic.log')
+    with open(project, 'w') as fout:
+        fout.write(mosaic_log_xml(mosaics, tiles_x, tiles_y, '.' + fmt,
+                                  overlap, size))
+    return project
+
+
+########## minimal OLE2 (compound document) writer ##########
+
+
+SECTOR = 4096
+MINI_SECTOR = 64
+MINI_CUTOFF = 4096
+FREESECT = 0xFFFFFFFF
+ENDOFCHAIN = 0xFFFFFFFE
+FATSECT = 0xFFFFFFFD
+NOSTREAM = 0xFFFFFFFF
+
+
+def chain(start, count):
+    """FAT entries for 'count' consecutive sectors starting at 'start'."""
+    if not count:
+        return []
+    return [start + i + 1 for i in range(count - 1)] + [ENDOFCHAIN]
+
+
+def sectors(size, unit=SECTOR):
+    """The number of sectors required for 'size' bytes."""
+    return (size + unit - 1) // unit
+
+
+def pad(data, unit=SECTOR):
+    """Pad data to a multiple of the sector size."""
+    return data + '\x00' * (sectors(len(data), unit) * unit - len(data))
+
+
+def dir_entry(name, obj_type, start, size, child=NOSTREAM, right=NOSTREAM):
+    """Pack a directory entry (all entries are black, no left siblings)."""
+    uname = name.encode('utf-16-le') + '\x00\x00'
+    return struct.pack('<64sHBBIII16sIQQIQ', uname, len(uname), obj_type, 1,
+                       NOSTREAM, right, child, '\x00' * 16, 0, 0, 0, start,
+                       size)
+
+
+def write_ole(fname, streams):
+    """Write an OLE2 compound document (version 4) with the given streams.
+
+    Parameters
+    ----------
+    fname : str
+    streams : list((str, str))
+        The (path, data) of the streams, paths with a single level of storage
+        at most (e.g. 'Storage00001/Stream00001').
+    """
+    # the directory: root, the storages and the streams, in a flat list
+    entries = [{'name': 'Root Entry', 'type': 5, 'kids': []}]
+    storages = dict()
+    for path, data in streams:
+        parent = entries[0]
+        if '/' in path:
+            storage, path = path.split('/')
+            if storage not in storages:
+                storages[storage] = {'name': storage, 'type': 1, 'kids': []}
+                entries.append(storages[storage])
+                entries[0]['kids'].append(len(entries) - 1)
+            parent = storages[storage]
+        entries.append({'name': path, 'type': 2, 'data': data})
+        parent['kids'].append(len(entries) - 1)
+
+    # small streams go into the mini stream, large ones get their own sectors
+    ministream = ''
+    minifat = list()
+    big = list()
+    for entry in entries:
+        if entry['type'] != 2:
+            continue
+        data = entry['data']
+        if len(data) < MINI_CUTOFF:
+            count = sectors(len(data), MINI_SECTOR)
+            entry['start'] = len(minifat) if data else ENDOFCHAIN
+            minifat.extend(chain(len(minifat), count))
+            ministream += pad(data, MINI_SECTOR)
+        else:
+            big.append(entry)
+    blobs = list()  # (entry or key, padded data) in sector order
+    blobs.append(('ministream', pad(ministream)))
+    blobs.append(('minifat', pad(struct.pack('<%iI' % len(minifat),
+                                             *minifat))))
+    blobs.extend((entry, pad(entry['data'])) for entry in big)
+    num_dir = sectors(len(entries) * 128)
+    # the FAT sectors are placed first, everything else follows:
+    used = sum(len(data) // SECTOR for _, data in blobs) + num_dir
+    num_fat = 1
+    while num_fat * SECTOR // 4 < used + num_fat:
+        num_fat += 1
+    if num_fat > 109:
+        raise ValueError('Too much data for a container without DIFAT!')
+    fat = [FATSECT] * num_fat
+    starts = dict()
+    for key, data in blobs:
+        count = len(data) // SECTOR
+        starts[id(key)] = len(fat) if count else ENDOFCHAIN
+        fat.extend(chain(len(fat), count))
+    dir_start = len(fat)
+    fat.extend(chain(dir_start, num_dir))
+    fat.extend([FREESECT] * (num_fat * SECTOR // 4 - len(fat)))
+    for entry in big:
+        entry['start'] = starts[id(entry)]
+
+    # the directory, siblings are chained through their right pointers:
+    for entry in entries:
+        kids = sorted(entry.get('kids', []),
+                      key=lambda i: (len(entries[i]['name']),
+                                     entries[i]['name'].upper()))
+        entry['child'] = kids[0] if kids else NOSTREAM
+        for left, right in zip(kids, kids[1:]):
+            entries[left]['right'] = right
+    directory = ''
+    for i, entry in enumerate(entries):
+        if entry['type'] == 5:
+            start = starts[id('ministream')] if ministream else ENDOFCHAIN
+            size = len(ministream)
+        elif entry['type'] == 1:
+            start, size = 0, 0
+        else:
+            start, size = entry['start'], len(entry['data'])
+        directory += dir_entry(entry['name'], entry['type'], start, size,
+                               entry['child'], entry.get('right', NOSTREAM))
+    directory = pad(directory)
+
+    difat = list(range(num_fat)) + [FREESECT] * (109 - num_fat)
+    header = struct.pack(
+        '<8s16sHHHHH6sIIIIIIIII109I', '\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',
+        '\x00' * 16, 0x3e, 4, 0xfffe, 12, 6, '\x00' * 6, num_dir, num_fat,
+        dir_start, 0, MINI_CUTOFF,
+        starts[id('minifat')] if minifat else ENDOFCHAIN,
+        len(minifat) * 4 // SECTOR + (1 if len(minifat) * 4 % SECTOR else 0),
+        ENDOFCHAIN, 0, *difat)
+    with open(fname, 'wb') as fout:
+        fout.write(pad(header))
+        fout.write(struct.pack('<%iI' % len(fat), *fat))
+        for _, data in blobs:
+            fout.write(data)
+        fout.write(directory)
+
+
+def main():
+    """Write a synthetic project as requested on the command line."""
+    argp = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argp.add_argument('dname', help='the output directory')
+    argp.add_argument('--format', choices=('oir', 'oif', 'oib'),
+                      default='oir', help='the tile format [oir]')
+    argp.add_argument('--mosaics', type=int, default=1,
+                      help='the number of mosaics [1]')
+    argp.add_argument('--tiles', default='4x4',
+                      help='the tiles per mosaic, as XxY [4x4]')
+    argp.add_argument('--size', type=int, default=512,
+                      help='the tile size (width and height) in pixels [512]')
+    argp.add_argument('--slices', type=int, default=1,
+                      help='the number of z-slices per tile [1]')
+    args = argp.parse_args()
+
+    tiles_x, tiles_y = [int(num) for num in args.tiles.split('x')]
+    if args.format == 'oir':
+        project = write_fv3k_project(args.dname, args.mosaics, tiles_x,
+                                     tiles_y, args.size, args.slices)
+    else:
+        project = write_fv1000_project(args.dname, args.mosaics, tiles_x,
+                                       tiles_y, args.size, args.slices,
+                                       fmt=args.format)
+    print('Wrote synthetic project: %s' % project)
+
+
+if __name__ == '__main__':
+    main()
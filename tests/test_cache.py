@@ -0,0 +1,131 @@
+import itertools
+import os
+import pickle
+
+import pytest
+
+from micrometa import cache as cache_module
+from micrometa import dataset
+from micrometa.cache import MetadataCache
+from micrometa.dataset import ImageDataOIR
+from micrometa.oir import OIR_MAGIC
+from micrometa.parallel import get_executor
+from synthetic import FRAME_PROPS, IMAGE_PROPS, NS_BASE, xml_block
+
+
+class Clock(object):
+
+    """A clock advancing by one second whenever it is read."""
+
+    def __init__(self):
+        self.ticks = itertools.count(1000)
+
+    def time(self):
+        return float(next(self.ticks))
+
+
+@pytest.fixture
+def cache(tmpdir):
+    cache = MetadataCache(str(tmpdir.join('cache.sqlite')))
+    yield cache
+    cache.close()
+
+
+def store_record(cache, path):
+    """Store a record in a worker, returns the worker's cache object."""
+    cache.put(path, {'fname': os.path.basename(path)})
+    return os.getpid(), id(cache)
+
+
+def write_files(tmpdir, count):
+    """Write 'count' (small) files to be cached, returns their paths."""
+    paths = list()
+    for i in range(count):
+        fname = tmpdir.join('tile_%02i.oir' % i)
+        fname.write('x')
+        paths.append(str(fname))
+    return paths
+
+
+def test_cache_roundtrip(tmpdir, cache):
+    fname = tmpdir.join('data.oir')
+    fname.write('x')
+    assert cache.get(str(fname)) is None
+    cache.put(str(fname), {'dim': [1, 2]})
+    assert cache.get(str(fname)) == {'dim': [1, 2]}
+    assert (cache.hits, cache.misses) == (1, 1)
+    # the entry is dropped once the size of the file changes...
+    fname.write('modified')
+    assert cache.get(str(fname)) is None
+    cache.put(str(fname), {'dim': [3, 4]})
+    assert cache.get(str(fname)) == {'dim': [3, 4]}
+    # ... or its modification time:
+    mtime = os.stat(str(fname)).st_mtime
+    os.utime(str(fname), (mtime + 10, mtime + 10))
+    assert cache.get(str(fname)) is None
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_cache_persistent(tmpdir):
+    fname, = write_files(tmpdir, 1)
+    cache = MetadataCache(str(tmpdir.join('cache.sqlite')), commit_every=50)
+    cache.put(fname, {'dim': [1, 2]})
+    cache.close()
+    cache = MetadataCache(str(tmpdir.join('cache.sqlite')))
+    assert cache.get(fname) == {'dim': [1, 2]}
+    cache.close()
+
+
+def test_cache_evicts_least_recently_used(tmpdir, monkeypatch):
+    monkeypatch.setattr(cache_module, 'time', Clock())
+    paths = write_files(tmpdir, 4)
+    cache = MetadataCache(str(tmpdir.join('cache.sqlite')), max_entries=3)
+    for path in paths[:3]:
+        cache.put(path, {'fname': os.path.basename(path)})
+    # the first file is used again, so the second one is evicted:
+    assert cache.get(paths[0]) is not None
+    cache.put(paths[3], {'fname': os.path.basename(paths[3])})
+    # entries are evicted once the queued changes are written:
+    cache.flush()
+    assert [cache.get(path) is not None for path in paths] == [
+        True, False, True, True]
+    cache.close()
+
+
+def test_oir_metadata_from_cache(tmpdir, monkeypatch, cache):
+    values = {'ns': NS_BASE, 'x': 64, 'y': 32, 'z': 5, 'b': 12}
+    fname = tmpdir.join('tile.oir')
+    fname.write(OIR_MAGIC + os.urandom(5000) +
+                xml_block(FRAME_PROPS % values) +
+                xml_block(IMAGE_PROPS % values), 'wb')
+    expected = ImageDataOIR(str(fname), cache).get_dimensions()
+
+    def fail(*args, **kwargs):
+        raise AssertionError('file opened despite the cache')
+
+    # a cache hit doesn't open the file at all:
+    monkeypatch.setattr(dataset, 'OIRContainer', fail)
+    assert ImageDataOIR(str(fname), cache).get_dimensions() == expected
+    assert cache.hits == 1
+
+
+def test_unpickled_caches_are_shared(tmpdir):
+    cache = MetadataCache(str(tmpdir.join('cache.sqlite')), commit_every=50)
+    first = pickle.loads(pickle.dumps(cache))
+    second = pickle.loads(pickle.dumps(cache))
+    assert first is second
+    assert first is not cache
+    assert (first.fname, first.commit_every) == (cache.fname, 50)
+
+
+def test_cache_in_process_pool(tmpdir, cache):
+    paths = write_files(tmpdir, 20)
+    executor = get_executor('process', 2)
+    workers = [executor.submit(store_record, cache, path) for path in paths]
+    workers = set(fut.result() for fut in workers)
+    executor.shutdown()
+    # a single cache object (connection) per worker process:
+    assert len(workers) == len(set(pid for pid, _ in workers)) <= 2
+    # the records are committed when the workers exit:
+    for path in paths:
+        assert cache.get(path) == {'fname': os.path.basename(path)}
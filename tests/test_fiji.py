@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+from micrometa import fiji
+
+FAKE_FIJI = [sys.executable, os.path.join(os.path.dirname(__file__),
+                                          'fake_fiji.py')]
+
+
+def write_macros(tmpdir, names):
+    fnames = list()
+    for name in names:
+        macro = tmpdir.join(name + '.ijm')
+        macro.write('// %s\n' % name)
+        fnames.append(str(macro))
+    return fnames
+
+
+def test_fiji_command_mem():
+    cmd = fiji.fiji_command('ImageJ-linux64', 'a.ijm', mem='4G')
+    assert cmd == ['ImageJ-linux64', '--mem=4G', '--headless', '--console',
+                   '-macro', 'a.ijm']
+    assert '--mem' not in ' '.join(fiji.fiji_command(FAKE_FIJI, 'a.ijm'))
+
+
+def test_run_macros_parallel(tmpdir, monkeypatch):
+    monkeypatch.setenv('FAKE_FIJI_SLEEP', '1')
+    macros = write_macros(tmpdir, ['shard_%i' % i for i in range(4)])
+    start = time.time()
+    jobs = fiji.run_macros(macros, FAKE_FIJI, max_jobs=4, mem='2G')
+    # four macros of one second each, run at the same time:
+    assert time.time() - start < 3.5
+    assert [job.macro for job in jobs] == macros
+    for job in jobs:
+        assert job.returncode == 0
+        assert job.attempts == 1
+        assert job.logfile == os.path.splitext(job.macro)[0] + '.log'
+        with open(job.logfile) as fin:
+            output = fin.read()
+        assert 'macro=%s mem=2G headless=True' % job.macro in output
+        assert 'Macro finished.' in output
+
+
+def test_run_macros_retries(tmpdir, monkeypatch):
+    monkeypatch.setenv('FAKE_FIJI_FAIL_ONCE', 'flaky')
+    monkeypatch.setenv('FAKE_FIJI_FAIL', 'broken')
+    macros = write_macros(tmpdir, ['flaky', 'broken', 'good'])
+    logdir = tmpdir.mkdir('logs')
+    jobs = fiji.run_macros(macros, FAKE_FIJI, retries=2, logdir=str(logdir))
+    flaky, broken, good = jobs
+    assert (flaky.returncode, flaky.attempts) == (0, 2)
+    assert (broken.returncode, broken.attempts) == (1, 3)
+    assert (good.returncode, good.attempts) == (0, 1)
+    assert sorted(os.listdir(str(logdir))) == \
+        ['broken.log', 'flaky.log', 'good.log']
+    output = logdir.join('flaky.log').read()
+    assert 'Failing (once) as requested.' in output
+    assert '=== attempt 2: exit code 0' in output
+    assert 'mem=None' in output
@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+import pytest
+
+import synthetic
+from micrometa import fluoview
+from micrometa.oir import OIR_MAGIC
+
+
+def truncate(fname, size):
+    with open(fname, 'r+b') as fout:
+        fout.truncate(size)
+
+
+@pytest.mark.parametrize('executor', [None, 'thread'])
+def test_broken_tile_skips_mosaic(fv3k_project, executor):
+    tile = os.path.join(os.path.dirname(fv3k_project),
+                        synthetic.oir_name(0, 2))
+    # the magic is intact, the metadata blocks are cut off:
+    truncate(tile, 100)
+    experiment = fluoview.FluoView3kMosaic(fv3k_project, executor=executor,
+                                           prefetch=True)
+    assert [mos.supplement['oid'] for mos in experiment] == ['2']
+
+
+def summarize(experiment):
+    """The mosaics and tiles of an experiment, in the order they are kept."""
+    return [(mos.supplement['index'],
+             [(tile.storage['full'], tile.supplement['index'],
+               tile.supplement['tileno'], tile.position['relative'],
+               tile.get_dimensions()) for tile in mos.subvol])
+            for mos in experiment]
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_fv1000_concurrent_matches_serial(tmpdir, executor):
+    project = synthetic.write_fv1000_project(str(tmpdir), 3, 3, 2, 16)
+    expected = summarize(fluoview.FluoViewMosaic(project))
+    assert [index for index, _ in expected] == [1, 2, 3]
+    assert [len(tiles) for _, tiles in expected] == [6, 6, 6]
+    # fewer workers than tiles, so the tiles are submitted ahead in turns:
+    experiment = fluoview.FluoViewMosaic(project, executor=executor,
+                                         max_workers=2)
+    assert summarize(experiment) == expected
+
+
+def test_broken_tile_skipped_on_materialize(fv3k_project):
+    tile = os.path.join(os.path.dirname(fv3k_project),
+                        synthetic.oir_name(0, 2))
+    truncate(tile, 100)
+    # placeholders don't read the tiles, so the broken one isn't noticed yet:
+    experiment = fluoview.FluoView3kMosaic(fv3k_project)
+    assert len(experiment) == 2
+    assert experiment.materialize() is experiment
+    assert [mos.supplement['oid'] for mos in experiment] == ['2']
+
+
+def test_malformed_metadata_skipped_on_materialize(fv3k_project, tmpdir):
+    values = {'ns': synthetic.NS_BASE, 'x': 64, 'y': 64, 'z': 1, 'b': 12}
+    frame = synthetic.FRAME_PROPS % values
+    # the closing tag doesn't match, so parsing the XML fails:
+    frame = frame.replace('</lsmframe:frameProperties>', '</lsmframe:frame>')
+    tile = os.path.join(os.path.dirname(fv3k_project),
+                        synthetic.oir_name(1, 9))
+    with open(tile, 'wb') as fout:
+        fout.write(OIR_MAGIC + synthetic.xml_block(frame) +
+                   synthetic.xml_block(synthetic.IMAGE_PROPS % values))
+    experiment = fluoview.FluoView3kMosaic(fv3k_project).materialize()
+    assert [mos.supplement['oid'] for mos in experiment] == ['1']
+    # an OIF whose INI lacks the required sections:
+    project = synthetic.write_fv1000_project(str(tmpdir.join('fv1000')), 2,
+                                             2, 1, 16)
+    name = synthetic.tile_name(1)
+    tmpdir.join('fv1000', name, name + '_01.oif').write(
+        synthetic.encode_ini(u'[Unused Section]\r\nKey="x"\r\n'), 'wb')
+    experiment = fluoview.FluoViewMosaic(project).materialize()
+    assert [mos.supplement['index'] for mos in experiment] == [2]
+
+
+def test_position_set_replaces_deferred(fv3k_project):
+    tile = fluoview.FluoView3kMosaic(fv3k_project)[0].subvol[0]
+    assert 'relative' in tile.position.deferred
+    tile.position['relative'] = (3, 4)
+    assert tile.position['relative'] == (3, 4)
+
+
+def describe(mosaic):
+    """The tiles (file, grid index, dimensions) and positions of a mosaic."""
+    tiles = [(tile.storage['full'], tile.supplement['tileno'],
+              tile.get_dimensions()) for tile in mosaic.subvol]
+    return tiles, mosaic.relative_positions()
+
+
+def assert_same_mosaics(streamed, eager):
+    assert len(streamed) == len(eager) == 2
+    for mos_s, mos_e in zip(streamed, eager):
+        tiles_s, positions_s = describe(mos_s)
+        tiles_e, positions_e = describe(mos_e)
+        assert tiles_s == tiles_e
+        assert len(tiles_s) == 6
+        assert np.allclose(positions_s, positions_e, equal_nan=True)
+
+
+def test_iter_mosaics_fv3k(fv3k_project):
+    streamed = list(fluoview.FluoView3kMosaic(
+        fv3k_project, runparser=False).iter_mosaics())
+    eager = fluoview.FluoView3kMosaic(fv3k_project)
+    assert_same_mosaics(streamed, eager)
+    assert [mos.supplement['index'] for mos in streamed] == [0, 1]
+
+
+@pytest.mark.parametrize('fmt', ['oif', 'oib'])
+def test_iter_mosaics_fv1000(tmpdir, fmt):
+    project = synthetic.write_fv1000_project(str(tmpdir.join(fmt)), 2, 3, 2,
+                                             64, fmt=fmt)
+    streamed = list(fluoview.FluoViewMosaic(
+        project, runparser=False).iter_mosaics())
+    eager = fluoview.FluoViewMosaic(project)
+    assert_same_mosaics(streamed, eager)
+
+
+def test_validate_xml_closes_file(fv3k_project, monkeypatch):
+    opened = list()
+    real_open = open
+
+    def tracking_open(fname, *args):
+        fobj = real_open(fname, *args)
+        opened.append(fobj)
+        return fobj
+
+    monkeypatch.setattr(fluoview, 'open', tracking_open, raising=False)
+    fluoview.FluoView3kMosaic(fv3k_project, runparser=False)
+    assert opened and all(fobj.closed for fobj in opened)
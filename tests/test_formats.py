@@ -0,0 +1,85 @@
+import os
+import re
+
+import pytest
+
+import synthetic
+from micrometa import fluoview, formats
+
+
+def write_tile(tmpdir, name, fmt):
+    fname = str(tmpdir.join(name))
+    if fmt == 'oif':
+        synthetic.write_oif(fname, 16)
+    elif fmt == 'oib':
+        synthetic.write_oib(fname, 16)
+    else:
+        synthetic.write_oir(fname, 16)
+    return fname
+
+
+@pytest.mark.parametrize('fmt', ['oif', 'oib', 'oir'])
+def test_match_magic(tmpdir, fmt):
+    fname = write_tile(tmpdir, 'tile.' + fmt, fmt)
+    header = formats.read_header(fname, formats.HEADER_SIZE)
+    assert formats.match_magic(header) == fmt
+
+
+def test_match_magic_rejects(tmpdir):
+    oib = formats.read_header(write_tile(tmpdir, 'tile.oib', 'oib'), 512)
+    assert formats.match_magic('') is None
+    assert formats.match_magic('II*\x00' + '\x00' * 100) is None
+    # a truncated OLE2 header lacks the version and byte order mark:
+    assert formats.match_magic(oib[:20]) is None
+    # an OIF without a complete section header:
+    assert formats.match_magic(synthetic.encode_ini(u'[Acquisition')) is None
+
+
+def test_sniff_files(tmpdir):
+    names = [write_tile(tmpdir, 'a.oif', 'oib'),
+             write_tile(tmpdir, 'b.oir', 'oir'),
+             str(tmpdir.join('missing.oib'))]
+    tmpdir.join('empty.oif').write('')
+    names.append(str(tmpdir.join('empty.oif')))
+    assert formats.sniff_files(names) == ['oib', 'oir', None, None]
+
+
+def test_register_custom_backend():
+    try:
+        formats.register('lsm', ['.LSM'], 'micrometa.dataset',
+                         'ImageDataOIF', magic=[re.compile('II\\*\x00')])
+        assert formats.format_for('/data/tile.lsm') == 'lsm'
+        assert formats.match_magic('II*\x00' + '\x00' * 4) == 'lsm'
+    finally:
+        formats.BACKENDS.pop('lsm')
+        formats.ORDER.remove('lsm')
+    with pytest.raises(IOError):
+        formats.format_for('/data/tile.lsm')
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_mislabelled_subvolume(tmpdir, caplog, prefetch):
+    project = synthetic.write_fv1000_project(str(tmpdir), 1, 2, 1, 16)
+    # the first tile contains OIB data, despite its suffix:
+    tile = os.path.join(str(tmpdir), 'Slide1sec001', 'Slide1sec001_01.oif')
+    synthetic.write_oib(tile, 16)
+    experiment = fluoview.FluoViewMosaic(project, prefetch=prefetch)
+    subvols = experiment[0].subvol
+    assert [type(ds).__name__ for ds in subvols] == ['ImageDataOIB',
+                                                     'ImageDataOIF']
+    assert subvols[0].get_dimensions()['X'] == 16
+    warnings = [rec.getMessage() for rec in caplog.records
+                if 'wrong suffix' in rec.getMessage()]
+    assert warnings == ['Subvolume %s contains OIB data (wrong suffix)!' %
+                        tile]
+
+
+def test_unknown_subvolume_skips_mosaic(tmpdir):
+    project = synthetic.write_fv1000_project(str(tmpdir), 2, 2, 1, 16,
+                                             fmt='oib')
+    tile = os.path.join(str(tmpdir), 'Slide1sec003', 'Slide1sec003_01.oib')
+    # cut off within the OLE2 header:
+    with open(tile, 'r+b') as fout:
+        fout.truncate(20)
+    experiment = fluoview.FluoViewMosaic(project, prefetch=False)
+    assert [mos.supplement['index'] for mos in experiment] == [1]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import synthetic
+from micrometa import fluoview, fusion
+
+SIZE = 32
+SLICES = 2
+POSITIONS = [(0, 0), (23, 5)]
+
+
+def ramp(size):
+    pos = np.arange(size, dtype=np.float64)
+    return np.minimum(pos + 1, size - pos)
+
+
+def fuse_in_memory(stacks, positions, shape):
+    """Blend the (Z, Y, X) stacks with linear weights, all in memory."""
+    acc = np.zeros(shape)
+    wsum = np.zeros(shape[1:])
+    for stack, (pos_x, pos_y) in zip(stacks, positions):
+        weight = np.outer(ramp(stack.shape[1]), ramp(stack.shape[2]))
+        acc[:, pos_y:pos_y + SIZE, pos_x:pos_x + SIZE] += stack * weight
+        wsum[pos_y:pos_y + SIZE, pos_x:pos_x + SIZE] += weight
+    fused = np.zeros(shape, dtype=np.uint16)
+    covered = wsum > 0
+    fused[:, covered] = np.rint(acc[:, covered] / wsum[covered])
+    return fused
+
+
+@pytest.mark.parametrize('executor', ['serial', 'thread'])
+def test_fuse_two_tiles(tmpdir, executor):
+    project = synthetic.write_fv1000_project(str(tmpdir.join('project')), 1,
+                                             2, 1, SIZE, SLICES)
+    header = synthetic.tiff_plane(SIZE)[:-SIZE * SIZE * 2]
+    rnd = np.random.RandomState(7)
+    stacks = list()
+    for num in (1, 2):
+        # tiles of different content, so the blending is visible:
+        stack = rnd.randint(0, 4096, (SLICES, SIZE, SIZE)).astype(np.uint16)
+        stacks.append(stack)
+        name = synthetic.tile_name(num)
+        for plane, fname in zip(stack, synthetic.plane_names(SLICES)):
+            tmpdir.join('project', name, name + '_01.oif.files',
+                        fname).write(header + plane.astype('<u2').tobytes(),
+                                     'wb')
+    mosaic = fluoview.FluoViewMosaic(project)[0]
+    for tile, pos in zip(mosaic.subvol, POSITIONS):
+        tile.position['relative'] = pos
+    outfile = str(tmpdir.join('fused.npy'))
+    # blocks smaller than the tiles, crossing the overlap:
+    shape = fusion.fuse_mosaic(mosaic, outfile, block_size=20,
+                               executor=executor, max_workers=2)
+    assert shape == (SLICES, SIZE + 5, SIZE + 23)
+    fused = np.load(outfile, mmap_mode='r')
+    assert isinstance(fused, np.memmap)
+    assert (fused == fuse_in_memory(stacks, POSITIONS, shape)).all()
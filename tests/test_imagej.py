@@ -0,0 +1,108 @@
+import os
+import re
+
+import pytest
+
+import synthetic
+from micrometa import fluoview, imagej
+from micrometa.dataset import ImageDataOIR
+
+
+def test_tile_config_moved_tile(fv3k_project, tmpdir):
+    mosaic = fluoview.FluoView3kMosaic(fv3k_project)[0]
+    name = 'Stitch_A01_G001_0002.oir; ; '
+    assert imagej.gen_tile_config(mosaic)[-5].endswith(
+        name + '(57.600000, 0.000000)\n')
+    # move a tile after the tile table was built:
+    mosaic.subvol[1].position['relative'] = (999.0, 999.0)
+    assert imagej.gen_tile_config(mosaic)[-5].endswith(
+        name + '(999.000000, 999.000000)\n')
+    imagej.write_tile_config(mosaic, str(tmpdir))
+    fname = tmpdir.join('mosaic_%s.txt' % mosaic.supplement['index'])
+    assert name + '(999.000000, 999.000000)' in fname.read()
+
+
+def test_tile_config_without_table(fv3k_project, monkeypatch):
+    mosaic = fluoview.FluoView3kMosaic(fv3k_project)[0]
+    mosaic.tile_table()
+    mosaic.subvol[1].position['relative'] = (999.0, 999.0)
+    expected = imagej.gen_tile_config(mosaic)
+    assert expected[-5].endswith('(999.000000, 999.000000)\n')
+
+    def no_numpy(self, rebuild=False):
+        raise ImportError('No module named numpy')
+
+    # without numpy (Jython) the positions come from the subvolumes:
+    monkeypatch.setattr(type(mosaic), 'tile_table', no_numpy)
+    assert imagej.gen_tile_config(mosaic) == expected
+
+
+def test_tile_config_from_table(fv3k_project, monkeypatch):
+    mosaic = fluoview.FluoView3kMosaic(fv3k_project)[0]
+    expected = imagej.gen_tile_config(mosaic)
+
+    def fail(self):
+        raise AssertionError('tile metadata accessed')
+
+    # once the table exists, the tiles are not asked for anything else:
+    monkeypatch.setattr(ImageDataOIR, 'get_dimensions', fail)
+    for tile in mosaic.subvol:
+        tile.position = None
+    assert imagej.gen_tile_config(mosaic) == expected
+
+
+@pytest.fixture
+def experiment(tmpdir):
+    """A FluoView project of 5 mosaics (2x1 OIF tiles of 16 px)."""
+    project = synthetic.write_fv1000_project(str(tmpdir.join('project')), 5,
+                                             2, 1, 16)
+    return fluoview.FluoViewMosaic(project)
+
+
+def macro_options(code):
+    """The settings of a macro between its head and body, as a dict."""
+    return dict(line.rstrip(';\n').split(' = ', 1) for line in code
+                if re.match(r'^(log_suffix|tileconfig_list) = ', line))
+
+
+def test_stitching_macro_shards(experiment):
+    names = ['"mosaic_%s.txt"' % mos.supplement['index']
+             for mos in experiment]
+    macros = imagej.gen_stitching_macro_shards(experiment, 'stitching', 2,
+                                               opts={'log_suffix': '""'})
+    options = [macro_options(code) for code in macros]
+    # round-robin, every mosaic is stitched by exactly one macro:
+    assert [opt['tileconfig_list'] for opt in options] == [
+        'newArray(%s)' % ', '.join(names[0::2]),
+        'newArray(%s)' % ', '.join(names[1::2])]
+    assert [opt['log_suffix'] for opt in options] == ['"_shard_0"',
+                                                      '"_shard_1"']
+
+
+def test_stitching_macro_shards_count(experiment):
+    # one macro per mosaic by default, never more macros than mosaics:
+    for shards in (None, 9):
+        macros = imagej.gen_stitching_macro_shards(experiment, 'stitching',
+                                                   shards)
+        lists = [macro_options(code)['tileconfig_list'] for code in macros]
+        assert len(lists) == 5
+        assert lists == ['newArray("mosaic_%s.txt")' % mos.supplement['index']
+                         for mos in experiment]
+        suffixes = set(macro_options(code)['log_suffix'] for code in macros)
+        assert len(suffixes) == 5
+
+
+def test_write_stitching_macros(experiment, tmpdir):
+    macros = imagej.gen_stitching_macro_shards(experiment, 'stitching', 3)
+    fnames = imagej.write_stitching_macros(macros, 'stitch_all.ijm',
+                                           str(tmpdir))
+    assert [os.path.basename(fname) for fname in fnames] == [
+        'stitch_all_0.ijm', 'stitch_all_1.ijm', 'stitch_all_2.ijm']
+    for fname, code in zip(fnames, macros):
+        with open(fname) as fin:
+            assert fin.read() == ''.join(code)
+    # the numbers are padded to the same width:
+    fnames = imagej.write_stitching_macros(macros * 4, 'stitch_all.ijm',
+                                           str(tmpdir))
+    assert os.path.basename(fnames[0]) == 'stitch_all_00.ijm'
+    assert os.path.basename(fnames[-1]) == 'stitch_all_11.ijm'
@@ -0,0 +1,75 @@
+import ConfigParser
+import io
+
+import pytest
+
+from micrometa.ini import read_ini_sections
+from synthetic import encode_ini
+
+TEXT = u'\r\n'.join(
+    [u'[Reference Image Parameter]', u'ImageWidth=512', u'ImageHeight=256',
+     u'[Unused]'] + [u'Key%04i="%s"' % (i, u'\xb5m ' * 10) for i in range(500)]
+    + [u'[Axis 3 Parameters Common]', u'MaxSize=12', u'AxisCode="Z"',
+       u'[Trailing]'] + [u'Key%04i=%i' % (i, i) for i in range(2000)]) + u'\r\n'
+WANTED = [u'Reference Image Parameter', u'Axis 3 Parameters Common']
+
+
+class CountingReader(io.BytesIO):
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = io.BytesIO.read(self, size)
+        self.bytes_read += len(data)
+        return data
+
+
+def full_parser():
+    parser = ConfigParser.RawConfigParser()
+    parser.readfp(io.StringIO(TEXT))
+    return parser
+
+
+def crlf_split_chunk_size(data):
+    """A chunk size splitting the encoded data in between a CR and a LF."""
+    pos = data.index(u'\r\n'.encode('utf-16-le'), 1000)
+    return pos + 2  # the chunk ends right after the CR
+
+
+@pytest.mark.parametrize('chunk_size', [7, 64, 4097, 65536, None])
+def test_requested_sections(chunk_size):
+    data = encode_ini(TEXT)
+    if chunk_size is None:
+        chunk_size = crlf_split_chunk_size(data)
+    fin = CountingReader(data)
+    parser = read_ini_sections(fin, WANTED, chunk_size=chunk_size)
+    assert sorted(parser.sections()) == sorted(WANTED)
+    expected = full_parser()
+    for section in WANTED:
+        assert parser.items(section) == expected.items(section)
+    # stopped at the header of the section following the last one found:
+    header = u'[Trailing]\r\n'.encode('utf-16-le')
+    header_end = data.index(header) + len(header)
+    assert fin.bytes_read <= header_end + chunk_size
+
+
+def test_crlf_split_across_chunks():
+    data = encode_ini(TEXT)
+    chunk_size = crlf_split_chunk_size(data)
+    assert data[chunk_size - 2:chunk_size] == u'\r'.encode('utf-16-le')
+    parser = read_ini_sections(io.BytesIO(data), chunk_size=chunk_size)
+    expected = full_parser()
+    assert parser.sections() == expected.sections()
+    for section in expected.sections():
+        assert parser.items(section) == expected.items(section)
+
+
+def test_missing_section():
+    data = encode_ini(TEXT)
+    fin = CountingReader(data)
+    parser = read_ini_sections(fin, [WANTED[0], u'Missing'], chunk_size=4096)
+    assert parser.sections() == [WANTED[0]]
+    assert parser.get(WANTED[0], u'ImageWidth') == u'512'
+    assert fin.bytes_read == len(data)
+    with pytest.raises(ConfigParser.NoSectionError):
+        parser.get(u'Missing', u'Key')
@@ -0,0 +1,84 @@
+import pytest
+
+from micrometa import fluoview, metrics
+
+
+@pytest.fixture
+def recorder():
+    rec = metrics.Recorder()
+    metrics.add_sink(rec)
+    yield rec
+    metrics.remove_sink(rec)
+    assert not metrics.SINKS
+
+
+@metrics.timed('test.work')
+def work(value):
+    metrics.count('test.items', value)
+    return value * 2
+
+
+def test_recorder_nested_spans(recorder):
+    events = list()
+
+    def sink(*event):
+        events.append(event)
+
+    metrics.add_sink(sink)
+    try:
+        with metrics.span('test.outer'):
+            with metrics.span('test.inner'):
+                assert work(3) == 6
+            assert work(4) == 8
+    finally:
+        metrics.remove_sink(sink)
+    # the spans are reported when they end, inner ones first:
+    assert [event[:2] for event in events] == [
+        ('count', 'test.items'), ('span', 'test.work'), ('span', 'test.inner'),
+        ('count', 'test.items'), ('span', 'test.work'), ('span', 'test.outer')]
+    assert recorder.counters == {'test.items': 7}
+    assert sorted(recorder.spans) == ['test.inner', 'test.outer', 'test.work']
+    assert recorder.spans['test.work'][0] == 2
+    assert recorder.spans['test.outer'][1] >= recorder.spans['test.inner'][1]
+    lines = recorder.summary()
+    assert lines[1].split()[:2] == ['test.outer', '1']
+    assert lines[-1].split() == ['test.items', '7']
+    recorder.reset()
+    assert not recorder.spans and not recorder.counters
+
+
+def test_add_sink_once(recorder):
+    metrics.add_sink(recorder)
+    assert metrics.SINKS == [recorder]
+    metrics.count('test.items')
+    assert recorder.counters == {'test.items': 1}
+
+
+def test_no_sinks(monkeypatch):
+    assert not metrics.SINKS
+    assert metrics.span('test.outer') is metrics.NULL_SPAN
+
+    def no_span(name):
+        raise AssertionError('Span %s created without a sink!' % name)
+
+    monkeypatch.setattr(metrics, 'Span', no_span)
+    monkeypatch.setattr(metrics, 'emit', no_span)
+    with metrics.span('test.outer'):
+        assert work(3) == 6
+    metrics.count('test.items')
+
+
+def test_recorder_parsing(fv3k_project, recorder, caplog):
+    fluoview.FluoView3kMosaic(fv3k_project, prefetch=True)
+    assert recorder.counters['dataset.files_opened'] == 12
+    assert recorder.counters['fluoview.tiles'] == 12
+    assert recorder.spans['fluoview.load_tile'][0] == 12
+    assert recorder.spans['fluoview.collect_mosaic'][0] == 2
+    assert recorder.spans['fluoview.add_mosaics'][0] == 1
+    # the summary is reported at the end of parsing:
+    assert 'dataset.files_opened' in caplog.text
+    recorder.reset()
+    # without prefetching, the tiles are not opened at all:
+    fluoview.FluoView3kMosaic(fv3k_project)
+    assert 'dataset.files_opened' not in recorder.counters
+    assert recorder.counters['fluoview.tiles'] == 12
@@ -0,0 +1,123 @@
+import os
+
+import olefile
+import pytest
+
+from micrometa import oib as oib_module
+from micrometa.dataset import ImageDataOIB
+from micrometa.mapfile import HANDLES, HandlePool
+from micrometa.oib import OIBContainer
+from synthetic import encode_ini, olympus_ini, tiff_plane, write_ole
+
+
+def test_streams_match_olefile(tmpdir):
+    fname = str(tmpdir.join('container.oib'))
+    # streams on both sides of the mini stream cutoff (4096 bytes), several
+    # small ones to make the mini stream span more than one sector:
+    sizes = [0, 100, 3000, 3000, 4095, 4096, 3 * 4096 + 17, 20000]
+    streams = [('Storage00001/Stream%05i' % i, os.urandom(size))
+               for i, size in enumerate(sizes)]
+    streams.append(('OibInfo.txt', os.urandom(700)))
+    write_ole(fname, streams)
+    ole = olefile.OleFileIO(fname)
+    oib = OIBContainer(fname)
+    assert ole.minisectorcutoff == 4096
+    for name, data in streams:
+        expected = ole.openstream(name).read()
+        assert expected == data
+        assert oib.read(name) == expected
+        assert bytes(oib.view(name)) == expected
+        reader = oib.open(name)
+        assert reader.read() == expected
+        reader.close()
+        assert oib.read_at(name, 50, 5000) == expected[50:5050]
+    ole.close()
+
+
+def test_stream_names_case_insensitive(tmpdir):
+    fname = str(tmpdir.join('container.oib'))
+    write_ole(fname, [('STORAGE00001/stream00001', 'x' * 200)])
+    oib = OIBContainer(fname)
+    assert oib.read('Storage00001/Stream00001') == 'x' * 200
+    assert oib.stream('storage00001/STREAM00001').name == \
+        u'STORAGE00001/stream00001'
+
+
+def write_tile(fname, info):
+    """Write an OIB tile of 16x16 pixels with the given description."""
+    write_ole(fname, [
+        (u'OibInfo.txt', encode_ini(u'\r\n'.join(info) + u'\r\n')),
+        (u'Stream00000', encode_ini(olympus_ini(16))),
+        (u'Storage00001/Stream00001', tiff_plane(16, '\x07')),
+    ])
+
+
+def test_oib_stream_names(tmpdir):
+    fname = str(tmpdir.join('tile.oib'))
+    # a non-ASCII main file, stream names in a case differing from the
+    # ones in the description file:
+    main = u'Str\xebam00000'
+    info = [u'[OibSaveInfo]', u'Version=2.0.0.0', u'MainFileName=%s' % main,
+            u'[Storage00001]', u'Stream00001="s_C001Z001.tif"']
+    write_ole(fname, [
+        (u'OIBINFO.TXT', encode_ini(u'\r\n'.join(info) + u'\r\n')),
+        (main, encode_ini(olympus_ini(16))),
+        (u'storage00001/STREAM00001', tiff_plane(16, '\x07')),
+    ])
+    tile = ImageDataOIB(fname)
+    assert tile.get_dimensions()['X'] == 16
+    pixels = tile.read()
+    assert pixels.shape[-2:] == (16, 16)
+    assert (pixels == 0x0707).all()
+
+
+def test_pool_closes_dropped_handles(tmpdir):
+    pool = HandlePool(max_open=2)
+    containers = list()
+    for num in range(4):
+        fname = str(tmpdir.join('container%i.oib' % num))
+        write_ole(fname, [('OibInfo.txt', 'x' * 5000)])
+        containers.append(OIBContainer(fname, pool))
+    # a reader holds on to the handle of the first file:
+    reader = containers[0].open('OibInfo.txt')
+    handles = list()
+    for oib in containers:
+        assert oib.read('OibInfo.txt') == 'x' * 5000
+        with oib.handle() as handle:
+            handles.append(handle)
+    # only the two most recently used files are kept open:
+    assert [handle.closed for handle in handles] == [False, True, False, False]
+    assert reader.read(10) == 'x' * 10
+    reader.close()
+    assert handles[0].closed
+    pool.clear()
+    assert all(handle.closed for handle in handles)
+
+
+def test_broken_description_releases_handle(tmpdir):
+    fname = str(tmpdir.join('tile.oib'))
+    # the description lacks the OibSaveInfo section:
+    write_tile(fname, [u'[Storage00001]', u'Stream00001="s_C001Z001.tif"'])
+    with pytest.raises(Exception):
+        ImageDataOIB(fname).get_dimensions()
+    assert not [handle for handle in HANDLES._users if handle.fname == fname]
+
+
+def test_streams_without_sector_tables(tmpdir, monkeypatch):
+    # an olefile version lacking (one of) the sector tables:
+    monkeypatch.setattr(oib_module, 'SECTOR_TABLES',
+                        oib_module.SECTOR_TABLES + ('no_such_table',))
+    fname = str(tmpdir.join('tile.oib'))
+    write_tile(fname, [u'[OibSaveInfo]', u'Version=2.0.0.0',
+                       u'MainFileName=Stream00000', u'[Storage00001]',
+                       u'Stream00001="s_C001Z001.tif"'])
+    tile = ImageDataOIB(fname)
+    assert tile.get_dimensions()['X'] == 16
+    container = tile.get_container()
+    assert all(stream.extents is None
+               for stream in container.streams.values())
+    assert (tile.read() == 0x0707).all()
+    plane = tiff_plane(16, '\x07')
+    name = 'Storage00001/Stream00001'
+    assert container.read_at(name, 10, 20) == plane[10:30]
+    assert bytes(container.view(name)) == plane
@@ -0,0 +1,98 @@
+import os
+import struct
+
+import pytest
+
+from micrometa import mapfile
+from micrometa.dataset import ImageDataOIR
+from micrometa.oir import OIR_MAGIC, OIRContainer
+from synthetic import FRAME_PROPS, IMAGE_PROPS, NS_BASE, xml_block
+
+VALUES = {'ns': NS_BASE, 'x': 64, 'y': 32, 'z': 5, 'b': 12}
+TAGS = ['lsmframe:frameProperties', 'lsmimage:imageProperties']
+
+
+def write_oir(fname, data_size):
+    """Pixel data (with a fake XML declaration) followed by the metadata."""
+    # '<?xml' inside the pixel data, without a valid length prefix:
+    fake = '\xff\xff\xff\xff<?xml version="1.0"?><fake>' + 'x' * 200 + '>'
+    data = os.urandom(data_size - len(fake)) + fake
+    frame = xml_block(FRAME_PROPS % VALUES)
+    image = xml_block(IMAGE_PROPS % VALUES)
+    with open(fname, 'wb') as fout:
+        fout.write(OIR_MAGIC + data + frame + image + os.urandom(3000))
+    offset = len(OIR_MAGIC) + data_size
+    return [(offset, len(frame) - 1), (offset + len(frame), len(image) - 1)]
+
+
+@pytest.mark.parametrize('mapped', [True, False])
+@pytest.mark.parametrize('data_size', [4000, 4096 - 16 - 100, 10000])
+def test_index_straddling_blocks(tmpdir, monkeypatch, mapped, data_size):
+    if not mapped:
+        monkeypatch.setattr(mapfile, 'mmap', None)
+    fname = str(tmpdir.join('tile.oir'))
+    expected = write_oir(fname, data_size)
+    # small chunks: the blocks straddle chunk (and page) boundaries
+    with OIRContainer(fname, chunk_size=64) as oir:
+        assert oir.mapped == mapped
+        blocks = oir.index(TAGS)
+        xml_blocks = [blk for blk in blocks if blk.type != 'data']
+        assert [blk.type for blk in xml_blocks] == TAGS
+        assert [(blk.offset, blk.size) for blk in xml_blocks] == expected
+        assert blocks[0].offset == 0
+        for blk, nxt in zip(blocks, blocks[1:]):
+            assert blk.offset + blk.size == nxt.offset
+        assert oir.read_xml(xml_blocks[0]) == FRAME_PROPS % VALUES
+        assert struct.unpack('<I', oir.read(expected[1][0], 4))[0] == \
+            len(IMAGE_PROPS % VALUES)
+
+
+def test_oir_dimensions(tmpdir):
+    fname = str(tmpdir.join('tile.oir'))
+    write_oir(fname, 5000)
+    tile = ImageDataOIR(fname)
+    dim = tile.get_dimensions()
+    assert (dim['X'], dim['Y'], dim['Z'], dim['B']) == (64, 32, 5, 12)
+    assert [blk.type for blk in tile.blocks if blk.type != 'data'] == TAGS
+
+
+@pytest.mark.parametrize('mapped', [True, False])
+def test_index_unprefixed_block(tmpdir, monkeypatch, mapped):
+    if not mapped:
+        monkeypatch.setattr(mapfile, 'mmap', None)
+    fname = str(tmpdir.join('tile.oir'))
+    frame = FRAME_PROPS % VALUES
+    image = xml_block(IMAGE_PROPS % VALUES)
+    data = '\xff' * 8
+    # the frame properties lack the length prefix:
+    with open(fname, 'wb') as fout:
+        fout.write(OIR_MAGIC + data + frame + '\x00' + image + data)
+    with OIRContainer(fname, chunk_size=64) as oir:
+        xml_blocks = [blk for blk in oir.index(TAGS) if blk.type != 'data']
+        assert [blk.type for blk in xml_blocks] == TAGS
+        assert oir.read_xml(xml_blocks[0]) == frame
+        assert oir.read_xml(xml_blocks[1]) == IMAGE_PROPS % VALUES
+    tile = ImageDataOIR(fname)
+    assert tile.get_dimensions()['X'] == 64
+
+
+def test_empty_file(tmpdir):
+    # an empty file can't be mapped, the buffered scan reports it:
+    fname = tmpdir.join('tile.oir')
+    fname.write('')
+    with pytest.raises(ValueError):
+        ImageDataOIR(str(fname)).get_dimensions()
+
+
+@pytest.mark.parametrize('mapped', [True, False])
+def test_truncated_file(tmpdir, monkeypatch, mapped):
+    if not mapped:
+        monkeypatch.setattr(mapfile, 'mmap', None)
+    fname = tmpdir.join('tile.oir')
+    # the file ends in the middle of the image properties:
+    image = xml_block(IMAGE_PROPS % VALUES)
+    fname.write(OIR_MAGIC + os.urandom(5000) +
+                xml_block(FRAME_PROPS % VALUES) + image[:len(image) // 2],
+                'wb')
+    with pytest.raises(ValueError):
+        ImageDataOIR(str(fname)).get_dimensions()
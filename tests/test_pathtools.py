@@ -0,0 +1,70 @@
+import pickle
+
+import pytest
+
+from micrometa.dataset import ImageDataOlympus
+from micrometa.pathtools import PathResolver, parse_path
+
+
+def test_parsed_path_mapping():
+    parsed = parse_path('/tmp/foo/file.oif', 'single')
+    expected = {'orig': '/tmp/foo/file.oif', 'full': '/tmp/foo/file.oif',
+                'path': '/tmp/foo/', 'dname': 'foo', 'fname': 'file.oif',
+                'ext': '.oif', 'type': 'single'}
+    assert dict(parsed) == expected
+    assert parsed == expected
+    assert len(parsed) == 7
+    assert sorted(parsed) == sorted(expected)
+    assert sorted(parsed.keys()) == sorted(expected.keys())
+    assert sorted(parsed.values()) == sorted(expected.values())
+    assert sorted(parsed.items()) == sorted(expected.items())
+    assert 'fname' in parsed
+    assert 'file.oif' not in parsed
+    assert parsed['fname'] == parsed.fname == 'file.oif'
+    assert parsed.get('nothing', 'default') == 'default'
+    with pytest.raises(KeyError):
+        parsed['nothing']  # pylint: disable=pointless-statement
+
+
+def test_parsed_path_immutable():
+    parsed = parse_path('/tmp/foo/file.oif')
+    with pytest.raises(TypeError):
+        parsed['fname'] = 'other.oif'
+    with pytest.raises(AttributeError):
+        parsed.fname = 'other.oif'
+    changed = parsed._replace(type='tree')
+    assert (parsed['type'], changed['type']) == (None, 'tree')
+    assert changed['full'] == parsed['full']
+
+
+def test_parsed_path_pickle():
+    parsed = parse_path('/tmp/foo/file.oif', 'single')
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        assert pickle.loads(pickle.dumps(parsed, protocol)) == parsed
+
+
+def test_resolver_caches_listings(tmpdir):
+    tmpdir.join('tile.oif').write('')
+    resolver = PathResolver()
+    assert resolver.exists(str(tmpdir.join('tile.oif')))
+    assert not resolver.exists(str(tmpdir.join('missing', 'tile.oif')))
+    # files created after the directory was listed are only seen once the
+    # listing is invalidated:
+    tmpdir.join('new.oif').write('')
+    assert not resolver.exists(str(tmpdir.join('new.oif')))
+    resolver.invalidate(str(tmpdir))
+    assert resolver.exists(str(tmpdir.join('new.oif')))
+    # listings are not pickled:
+    assert pickle.loads(pickle.dumps(resolver)).listings == {}
+
+
+def test_resolver_locates_suffixed_file(tmpdir):
+    tmpdir.join('Slide1sec001_01.oib').write('')
+    resolver = PathResolver()
+    fpath = ImageDataOlympus.locate_file(
+        parse_path(str(tmpdir.join('Slide1sec001.oib'))), resolver.exists)
+    assert fpath['fname'] == 'Slide1sec001_01.oib'
+    with pytest.raises(IOError):
+        ImageDataOlympus.locate_file(
+            parse_path(str(tmpdir.join('Slide1sec002.oib'))), resolver.exists)
+    assert list(resolver.listings) == [str(tmpdir)]
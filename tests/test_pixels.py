@@ -0,0 +1,34 @@
+import pytest
+
+from micrometa.dataset import ImageDataOIB, ImageDataOIF, ImageDataOIR
+from synthetic import write_oib, write_oif, write_oir
+
+
+@pytest.mark.parametrize('reader,writer,ext', [
+    (ImageDataOIF, write_oif, '.oif'),
+    (ImageDataOIB, write_oib, '.oib'),
+])
+def test_read_pixels(tmpdir, reader, writer, ext):
+    fname = str(tmpdir.join('tile' + ext))
+    writer(fname, 32, slices=3)
+    tile = reader(fname)
+    assert tile.read().shape == (1, 1, 3, 32, 32)  # (T, C, Z, Y, X)
+    assert tile.read(c=0, t=0).shape == (3, 32, 32)
+    assert tile.read(z=1).shape == (1, 1, 32, 32)
+    assert tile.read(z=1, c=0, t=0).shape == (32, 32)
+    assert tile.read_region(4, 12, 0, 8, z=2, c=0, t=0).shape == (8, 8)
+    with pytest.raises(IndexError):
+        tile.read(z=3)
+
+
+def test_read_pixels_oir_unsupported(tmpdir):
+    fname = str(tmpdir.join('tile.oir'))
+    write_oir(fname, 32, slices=3)
+    tile = ImageDataOIR(fname)
+    assert tile.get_dimensions()['Z'] == 3
+    with pytest.raises(IOError, match='pixel data of OIR files'):
+        tile.read()
+    with pytest.raises(IOError, match='pixel data of OIR files'):
+        tile.read_region(0, 8, 0, 8, z=0, c=0, t=0)
+    with pytest.raises(ValueError, match='pixel size of OIR files'):
+        tile.get_pixelsize()
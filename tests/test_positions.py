@@ -0,0 +1,103 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import synthetic
+from micrometa import fluoview
+
+
+@pytest.fixture
+def fv1000_mosaic(tmpdir):
+    """A mosaic of 3x2 OIF tiles (16 px, 10%) with stage coordinates."""
+    project = synthetic.write_fv1000_project(str(tmpdir), 1, 3, 2, 16)
+    return fluoview.FluoViewMosaic(project)[0]
+
+
+def grid_positions(mosaic, step):
+    return step * np.array([tile.supplement['tileno'][:2]
+                            for tile in mosaic.subvol], dtype=np.float64)
+
+
+def test_table_filled_from_grid(fv3k_project):
+    mosaic = fluoview.FluoView3kMosaic(fv3k_project)[0]
+    mosaic.subvol[0].position['relative'] = (5.0, 7.0)
+    positions = mosaic.relative_positions()
+    assert positions[0, :2].tolist() == [5.0, 7.0]
+    # the other tiles are placed on the grid (64 px, 10% overlap):
+    expected = grid_positions(mosaic, 57.6)
+    assert np.allclose(positions[1:, :2], expected[1:])
+    # the tiles see the positions filled in from the grid:
+    for tile in mosaic.subvol[1:]:
+        assert 'relative' not in tile.position.deferred
+    assert mosaic.subvol[1].position['relative'] == (57.6, 0.0)
+    # the accessor returns a copy:
+    positions[0] = 0
+    assert mosaic.relative_positions()[0, :2].tolist() == [5.0, 7.0]
+
+
+def test_positions_bound_to_table(fv3k_project):
+    mosaic = fluoview.FluoView3kMosaic(fv3k_project)[0]
+    mosaic.tile_table()
+    mosaic.subvol[1].position['relative'] = (1.0, 2.0)
+    mosaic.subvol[2].position['relative'] = (3.0, 4.0, 5.0)
+    positions = mosaic.relative_positions()
+    assert positions[1, :2].tolist() == [1.0, 2.0]
+    assert np.isnan(positions[1, 2])
+    assert positions[2].tolist() == [3.0, 4.0, 5.0]
+    assert mosaic.subvol[2].position['relative'] == (3.0, 4.0, 5.0)
+    # the values are kept when the table is dropped or pickled:
+    copy = pickle.loads(pickle.dumps(mosaic.subvol[1]))
+    assert copy.position['relative'] == (1.0, 2.0)
+    assert not copy.position.bound
+    mosaic.add_subvol(copy)
+    assert not mosaic.subvol[2].position.bound
+    assert mosaic.subvol[2].position['relative'] == (3.0, 4.0, 5.0)
+
+
+def test_compute_positions_stage(fv1000_mosaic):
+    # the stage coordinates (0.5 um pixels) agree with the tile grid:
+    positions = fv1000_mosaic.compute_positions('stage')
+    assert np.allclose(positions, grid_positions(fv1000_mosaic, 14.4))
+    assert np.allclose(fv1000_mosaic.compute_positions('grid'), positions)
+    for tile, pos in zip(fv1000_mosaic.subvol, positions.tolist()):
+        assert tile.position['relative'] == tuple(pos)
+
+
+def test_compute_positions_stage_factor(fv1000_mosaic):
+    positions = fv1000_mosaic.compute_positions('stage', (2.0, 0.5))
+    assert np.allclose(positions,
+                       grid_positions(fv1000_mosaic, 14.4) * (2.0, 0.5))
+    assert np.allclose(fv1000_mosaic.relative_positions()[:, :2], positions)
+    assert fv1000_mosaic.subvol[1].position['relative'] == (28.8, 0.0)
+    # a negative factor flips the axis, the lowest coordinate stays zero:
+    positions = fv1000_mosaic.compute_positions('stage', (-1.0, 1.0))
+    assert positions[:, 0].tolist() == [28.8, 14.4, 0.0] * 2
+    assert np.allclose(positions[:, 1], [0.0] * 3 + [14.4] * 3)
+
+
+def test_compute_positions_invalid(fv3k_project, fv1000_mosaic):
+    # FluoView 3000 projects don't provide stage coordinates:
+    mosaic = fluoview.FluoView3kMosaic(fv3k_project)[0]
+    with pytest.raises(ValueError):
+        mosaic.compute_positions('stage')
+    with pytest.raises(TypeError):
+        fv1000_mosaic.compute_positions('spiral')
+
+
+def test_removed_positions_fill_from_grid(fv1000_mosaic):
+    fv1000_mosaic.compute_positions('stage', (2.0, 2.0))
+    fv1000_mosaic.subvol[4].position['relative'] = None
+    assert fv1000_mosaic.subvol[4].position['relative'] is None
+    assert np.isnan(fv1000_mosaic.relative_positions()[4]).all()
+    # deferring a bound position computes it right away:
+    fv1000_mosaic.subvol[5].set_relpos(10)
+    assert 'relative' not in fv1000_mosaic.subvol[5].position.deferred
+    assert fv1000_mosaic.subvol[5].position['relative'] == (28.8, 14.4)
+    # removed positions are placed on the grid when rebuilding the table:
+    positions = fv1000_mosaic.tile_table(rebuild=True).rows['relative']
+    expected = grid_positions(fv1000_mosaic, 28.8)
+    expected[4:] /= 2
+    assert np.allclose(positions[:, :2], expected)
+    assert np.isnan(positions[:, 2]).all()
+    assert fv1000_mosaic.subvol[4].position['relative'] == (14.4, 14.4)
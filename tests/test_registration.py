@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+import synthetic
+from micrometa import fluoview, fusion, optimization, registration
+from micrometa.registration import PairShift
+
+SIZE = 96
+STEP = 72  # 25% overlap
+MARGIN = 8
+# the deviations (x, y) of the tiles from the grid, summing up to zero:
+JITTER = [(0, 0), (2, -1), (-3, 2), (1, 3), (-2, -2), (2, -2)]
+
+
+@pytest.fixture
+def jittered(tmpdir):
+    """A mosaic of 3x2 OIF tiles cut from a random image, with jitter."""
+    truth = np.random.RandomState(42).randint(
+        0, 4096, (3 * SIZE, 4 * SIZE)).astype(np.uint16)
+    project = synthetic.write_fv1000_project(str(tmpdir), 1, 3, 2, SIZE,
+                                             overlap=25)
+    header = synthetic.tiff_plane(SIZE)[:-SIZE * SIZE * 2]
+    positions = list()
+    for (_, grid_x, grid_y, num), (jit_x, jit_y) in zip(
+            synthetic.tile_grid(1, 3, 2), JITTER):
+        pos_x = MARGIN + grid_x * STEP + jit_x
+        pos_y = MARGIN + grid_y * STEP + jit_y
+        positions.append((pos_x, pos_y))
+        name = synthetic.tile_name(num)
+        plane = tmpdir.join(name, name + '_01.oif.files',
+                            synthetic.plane_names(1)[0])
+        plane.write(header + truth[pos_y:pos_y + SIZE, pos_x:pos_x + SIZE]
+                    .astype('<u2').tobytes(), 'wb')
+    mosaic = fluoview.FluoViewMosaic(project)[0]
+    return mosaic, truth, np.array(positions, dtype=np.float64)
+
+
+@pytest.mark.parametrize('executor', ['serial', None])
+def test_register_mosaic(jittered, executor):
+    mosaic, _, truth_pos = jittered
+    if executor is None:
+        # the default, a process pool:
+        shifts = registration.register_mosaic(mosaic, max_workers=2)
+    else:
+        shifts = registration.register_mosaic(mosaic, executor=executor)
+    # 2x2 horizontal and 3 vertical neighbours:
+    assert len(shifts) == 7
+    for shf in shifts:
+        expected = truth_pos[shf.second] - truth_pos[shf.first]
+        assert (shf.dx, shf.dy) == tuple(expected)
+        assert shf.score > 0.99
+
+
+def test_register_unrelated_pair():
+    rand = np.random.RandomState(7)
+    img_a = rand.rand(64, 48).astype(np.float32)
+    img_b = rand.rand(64, 48).astype(np.float32)
+    _, score = registration.phase_correlation(img_a, img_b)
+    # tiles without common structure are left with a low score:
+    assert abs(score) < 0.3
+    shift, score = registration.phase_correlation(img_a, img_a)
+    assert (shift, score) == ((0, 0), pytest.approx(1.0))
+
+
+def test_register_pair_without_overlap(jittered):
+    mosaic, _, _ = jittered
+    first, second = mosaic.subvol[:2]
+    assert registration.register_pair(first, second, (SIZE, 0)) is None
+
+
+def test_optimize_positions(jittered):
+    mosaic, _, truth_pos = jittered
+    shifts = registration.register_mosaic(mosaic, executor='serial')
+    # a wrong link with a high score is removed as being inconsistent:
+    shifts.append(PairShift(0, 4, 60.0, 90.0, 0.9))
+    positions, kept = optimization.optimize_positions(mosaic, shifts)
+    assert kept == shifts[:-1]
+    # the jitter sums up to zero, so the prior doesn't move the solution:
+    assert np.allclose(positions, truth_pos - MARGIN, atol=0.01)
+    assert np.allclose(mosaic.relative_positions()[:, :2], positions)
+    for tile, pos in zip(mosaic.subvol, positions):
+        assert tile.position['relative'] == tuple(pos)
+
+
+def test_fuse_mosaic(jittered, tmpdir):
+    mosaic, truth, truth_pos = jittered
+    for tile, pos in zip(mosaic.subvol, truth_pos.tolist()):
+        tile.position['relative'] = tuple(pos)
+    outfile = str(tmpdir.join('fused.npy'))
+    shape = fusion.fuse_mosaic(mosaic, outfile, block_size=64,
+                               executor='serial')
+    fused = np.load(outfile)
+    assert fused.shape == shape
+    assert fused.dtype == np.uint16
+    # all tiles agree on their overlaps, so blending reproduces the image:
+    origin = truth_pos.min(axis=0).astype(int)
+    expected = truth[origin[1]:origin[1] + shape[1],
+                     origin[0]:origin[0] + shape[2]]
+    covered = np.zeros(shape[1:], dtype=bool)
+    for pos_x, pos_y in (truth_pos - origin).astype(int):
+        covered[pos_y:pos_y + SIZE, pos_x:pos_x + SIZE] = True
+    assert (fused[0][covered] == expected[covered]).all()
+    assert (fused[0][~covered] == 0).all()
+
+
+def test_solve_positions_trivial():
+    empty = np.zeros((0, 2))
+    no_links = np.zeros(0, dtype=np.intp)
+    positions = optimization.solve_positions(empty, no_links, no_links,
+                                             empty, np.zeros(0))
+    assert positions.shape == (0, 2)
+    prior_pos = np.array([[0.0, 0.0], [10.0, 0.0]])
+    positions = optimization.solve_positions(
+        prior_pos, np.array([0]), np.array([1]), np.array([[12.0, 1.0]]),
+        np.array([1.0]), maxiter=0)
+    assert (positions == prior_pos).all()
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import synthetic
+from micrometa import fluoview
+from micrometa.tiletable import TileTable
+
+
+@pytest.fixture
+def mosaic(tmpdir):
+    """A mosaic of 3x2 OIF tiles (16 px), numbered row by row."""
+    project = synthetic.write_fv1000_project(str(tmpdir), 1, 3, 2, 16)
+    return fluoview.FluoViewMosaic(project)[0]
+
+
+def test_index_non_square(mosaic):
+    table = mosaic.tile_table()
+    assert len(table) == 6
+    assert table.grid.shape == (3, 2, 1)
+    for idx, tile in enumerate(mosaic.subvol):
+        tile_x, tile_y = tile.supplement['tileno'][:2]
+        assert table.index(tile_x, tile_y) == idx
+        assert idx == 3 * tile_y + tile_x
+    # outside of the grid, including negative indices:
+    for cell in [(3, 0), (0, 2), (0, 0, 1), (-1, 0), (0, -1)]:
+        assert table.index(*cell) is None
+
+
+def test_index_missing_tile(mosaic):
+    # the tile in the centre of the lower row is missing:
+    table = TileTable(mosaic.subvol[:4] + mosaic.subvol[5:], (3, 2, 1))
+    assert table.index(1, 1) is None
+    assert table.index(2, 1) == 4
+    assert table.neighbours(3) == {'-y': 0}
+    assert table.neighbours(4) == {'-y': 2}
+
+
+def test_grid_enlarged_to_tiles(mosaic):
+    # a shape too small for the tiles doesn't drop any of them:
+    table = TileTable(mosaic.subvol, (1, 1, 1))
+    assert table.grid.shape == (3, 2, 1)
+    assert table.index(2, 1) == 5
+
+
+def test_neighbours_edges(mosaic):
+    table = mosaic.tile_table()
+    # the corners:
+    assert table.neighbours(0) == {'+x': 1, '+y': 3}
+    assert table.neighbours(2) == {'-x': 1, '+y': 5}
+    assert table.neighbours(5) == {'-x': 4, '-y': 2}
+    # the centre of the upper and lower edge:
+    assert table.neighbours(1) == {'-x': 0, '+x': 2, '+y': 4}
+    assert table.neighbours(4) == {'-x': 3, '+x': 5, '-y': 1}
+
+
+def test_adjacent_pairs(mosaic):
+    pairs = mosaic.tile_table().adjacent_pairs()
+    # ordered by the grid position (x, y) of the first tile:
+    assert pairs == [(0, 1), (0, 3), (3, 4), (1, 2), (1, 4), (4, 5), (2, 5)]
+    table = TileTable(mosaic.subvol[:4] + mosaic.subvol[5:], (3, 2, 1))
+    assert table.adjacent_pairs() == [(0, 1), (0, 3), (1, 2), (2, 4)]
+
+
+def test_relative_nan(mosaic):
+    for tile in mosaic.subvol:
+        tile.set_relpos(10)
+    table = TileTable(mosaic.subvol, (3, 2, 1))
+    # deferred positions are not computed while building the table:
+    assert np.isnan(table.rows['relative']).all()
+    mosaic.subvol[0].position['relative'] = (5.0, 7.0, 2.0)
+    mosaic.subvol[1].position['relative'] = (3.0, 4.0)
+    mosaic.subvol[2].position['relative'] = None
+    table = TileTable(mosaic.subvol, (3, 2, 1))
+    relative = table.rows['relative']
+    assert relative[0].tolist() == [5.0, 7.0, 2.0]
+    # a missing z coordinate is unknown:
+    assert relative[1, :2].tolist() == [3.0, 4.0]
+    assert np.isnan(relative[1, 2])
+    assert np.isnan(relative[2:]).all()
+    for tile in mosaic.subvol[3:]:
+        assert 'relative' in tile.position.deferred
+
+
+def test_shared_grid_position(mosaic, caplog):
+    mosaic.subvol[1].set_tilenumbers(0, 0)
+    table = TileTable(mosaic.subvol)
+    assert 'share the same grid position' in caplog.text
+    assert table.index(1, 0) is None